@@ -12,6 +12,82 @@ class Parametres(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    
+    # Délai maximal de propagation d'une révocation entre workers (secondes)
+    REVOCATION_SYNC_SECONDES: float = 5.0
+    
+    # Délai maximal de propagation d'une modification des rôles, permissions et canaux entre workers (secondes)
+    VERSIONS_SYNC_SECONDES: float = 5.0
+    
+    # Limitation des tentatives de connexion (fenêtre glissante)
+    LOGIN_MAX_TENTATIVES_IP: int = 20
+    LOGIN_MAX_ECHECS_UTILISATEUR: int = 5
+    LOGIN_FENETRE_SECONDES: int = 300
+    
+    # Limitation des envois WebSocket (messages/seconde et rafale maximale)
+    WS_DEBIT_UTILISATEUR: float = 5.0
+    WS_RAFALE_UTILISATEUR: int = 10
+    WS_DEBIT_CANAL: float = 50.0
+    WS_RAFALE_CANAL: int = 100
+    
+    # Nombre d'exécutions d'une même instruction SQL à partir duquel on signale un N+1
+    SQL_SEUIL_REPETITIONS: int = 5
+    
+    # Surveillance de la boucle d'événements (secondes)
+    BOUCLE_INTERVALLE_SECONDES: float = 0.1
+    BOUCLE_SEUIL_BLOCAGE_SECONDES: float = 0.1
+    
+    # Sondes de santé : durée de cache du diagnostic et seuils de disponibilité
+    SANTE_CACHE_SECONDES: float = 2.0
+    SANTE_DELAI_BASE_SECONDES: float = 1.0
+    SANTE_RETARD_BOUCLE_MAX_SECONDES: float = 0.5
+    WS_CAPACITE_CONNEXIONS: int = 5000
+    
+    # Journalisation JSON : niveau global, niveaux par logger ("app.sql=WARNING,app.boucle=INFO")
+    LOG_NIVEAU: str = "INFO"
+    LOG_NIVEAUX: str = ""
+    # Loggers à fort volume, limités à N enregistrements par seconde
+    LOG_ECHANTILLONNES: str = "app.websocket.envoi"
+    LOG_ECHANTILLON_PAR_SECONDE: int = 10
+    # Taille de la file d'écriture (au-delà, les enregistrements sont abandonnés)
+    LOG_TAILLE_FILE: int = 10000
+    
+    # Traçage : part des requêtes / trames tracées, anneau mémoire, export OTLP/JSON (URL /v1/traces ou fichier)
+    TRACE_TAUX_ECHANTILLONNAGE: float = 0.01
+    TRACE_TAILLE_MEMOIRE: int = 2000
+    TRACE_OTLP_URL: str = ""
+    TRACE_OTLP_FICHIER: str = ""
+    TRACE_OTLP_PERIODE_SECONDES: float = 5.0
+    
+    # Délestage : seuils de surcharge (requêtes HTTP en cours, attente récente du pool, threads en attente
+    # d'une connexion quand le pool est plein, retard de la boucle) et Retry-After de base (secondes)
+    DELESTAGE_ACTIF: bool = True
+    DELESTAGE_MAX_EN_COURS: int = 200
+    DELESTAGE_ATTENTE_POOL_SECONDES: float = 0.1
+    DELESTAGE_MAX_FILE_POOL: int = 10
+    DELESTAGE_RETARD_BOUCLE_SECONDES: float = 0.25
+    DELESTAGE_RETRY_AFTER_SECONDES: int = 1
+    
+    # Coalescence des lectures simultanées identiques (historique d'un canal, liste et détail des canaux)
+    COALESCENCE_ACTIVE: bool = True
+    
+    # Processus : identifiant du worker (fixé par serveur.py) et délai d'arrêt propre
+    WORKER_ID: str = "0"
+    ARRET_DELAI_SECONDES: float = 30.0
+    # Arrêt : délai maximal du vidage des WebSockets, étalement des reconnexions annoncées aux clients
+    WS_DRAIN_DELAI_SECONDES: float = 10.0
+    WS_RECONNEXION_ETALEMENT_SECONDES: float = 15.0
+    
+    # Cache de l'historique récent : messages gardés par canal, plafond mémoire (octets sérialisés)
+    # et durée de vie d'une entrée (délai maximal de prise en compte des écritures des autres workers)
+    HISTORIQUE_CACHE_MESSAGES: int = 100
+    HISTORIQUE_CACHE_OCTETS: int = 32 * 1024 * 1024
+    HISTORIQUE_CACHE_SECONDES: float = 2.0
+    
+    # Cache des profils des auteurs : nombre de profils gardés et durée de vie (secondes)
+    PROFILS_CACHE_TAILLE: int = 10000
+    PROFILS_CACHE_SECONDES: float = 60.0
     
     # Configuration application
     PROJECT_NAME: str = "Gestion RBAC Chat"
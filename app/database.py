@@ -1,23 +1,99 @@
 """
 Configuration et gestion de la base de données PostgreSQL
 """
+import logging
+import math
+import os
+import threading
+import time
+from sqlalchemy.pool import QueuePool
 from sqlmodel import SQLModel, create_engine, Session
 from app.config import parametres
+from app.metriques import registre, db_attente_pool, lignes_jauge
+from app.requetes_sql import installer_compteur_requetes
+from app.tracage import installer_tracage_requetes
+
+
+class PoolMesure(QueuePool):
+    """
+    Pool de connexions qui mesure le temps d'attente de chaque checkout
+    Expose aussi le nombre de threads en attente et une moyenne récente de l'attente (délestage)
+    """
+    
+    # Constante de temps de la moyenne : une attente compte pour e^-1 au bout d'une seconde
+    CONSTANTE_TEMPS_SECONDES = 1.0
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.en_attente = 0
+        self._verrou_attente = threading.Lock()
+        self._attente_moyenne = 0.0
+        self._mise_a_jour = time.monotonic()
+    
+    def attente_recente(self) -> float:
+        """Moyenne exponentielle de l'attente, qui décroît avec le temps en l'absence de checkout"""
+        ecoule = time.monotonic() - self._mise_a_jour
+        return self._attente_moyenne * math.exp(-ecoule / self.CONSTANTE_TEMPS_SECONDES)
+    
+    def _do_get(self):
+        debut = time.perf_counter()
+        with self._verrou_attente:
+            self.en_attente += 1
+        try:
+            return super()._do_get()
+        finally:
+            with self._verrou_attente:
+                self.en_attente -= 1
+            attente = time.perf_counter() - debut
+            db_attente_pool.observer(attente)
+            # Poids de la nouvelle mesure : 20 % (mise à jour sans verrou : une mesure perdue est sans conséquence)
+            moyenne = self.attente_recente()
+            self._attente_moyenne = moyenne + 0.2 * (attente - moyenne)
+            self._mise_a_jour = time.monotonic()
 
 
 # Création du moteur de base de données
+logger = logging.getLogger("app.database")
+
 moteur = create_engine(
     parametres.DATABASE_URL,
     echo=parametres.DEBUG,
+    poolclass=PoolMesure,
     pool_pre_ping=True,
     pool_size=10,  
     max_overflow=20 
 )
 
 
+# Comptage des requêtes par requête HTTP / trame WebSocket, spans SQL des traces échantillonnées
+installer_compteur_requetes(moteur)
+installer_tracage_requetes(moteur)
+
+
+def _collecter_pool():
+    pool = moteur.pool
+    yield from lignes_jauge("db_pool_taille", "Taille nominale du pool", [("", pool.size())])
+    yield from lignes_jauge("db_pool_connexions_utilisees", "Connexions actuellement empruntées", [("", pool.checkedout())])
+    yield from lignes_jauge("db_pool_debordement", "Connexions ouvertes au-delà de la taille nominale", [("", max(pool.overflow(), 0))])
+
+
+registre.ajouter_collecteur(_collecter_pool)
+
+
+def _apres_fork():
+    """
+    Un processus enfant ne doit pas réutiliser les connexions héritées du parent (socket partagé) :
+    on repart d'un pool vide sans fermer les connexions, qui appartiennent toujours au parent
+    """
+    moteur.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_apres_fork)
+
+
 def creer_tables():
     SQLModel.metadata.create_all(moteur)
-    print("Tables créées avec succès")
+    logger.info("Tables créées avec succès")
 
 
 def obtenir_session():
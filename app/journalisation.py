@@ -0,0 +1,151 @@
+"""
+Journalisation structurée (JSON) non bloquante
+File d'attente bornée côté application, écriture par un thread dédié
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.config import parametres
+from app.metriques import registre
+from app.tracage import span_courant
+
+
+# Identifiants liés automatiquement à chaque enregistrement émis dans ce contexte
+id_requete: ContextVar[Optional[str]] = ContextVar("id_requete", default=None)
+id_connexion: ContextVar[Optional[str]] = ContextVar("id_connexion", default=None)
+
+journal_perdus = registre.compteur(
+    "journal_enregistrements_perdus_total", "Enregistrements de journal abandonnés (file pleine)"
+).enfant()
+journal_echantillonnes = registre.compteur(
+    "journal_enregistrements_echantillonnes_total", "Enregistrements de journal écartés par échantillonnage"
+).enfant()
+
+# Attributs standards d'un LogRecord, exclus des champs supplémentaires
+_ATTRIBUTS_STANDARDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class FormateurJSON(logging.Formatter):
+    """Un objet JSON par ligne"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        donnees = {
+            "horodatage": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "niveau": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for cle, valeur in vars(record).items():
+            if cle not in _ATTRIBUTS_STANDARDS and valeur is not None:
+                donnees[cle] = valeur
+        if record.exc_text:
+            donnees["exception"] = record.exc_text
+        return json.dumps(donnees, ensure_ascii=False, default=str)
+
+
+class FiltreContexte(logging.Filter):
+    """Ajoute l'identifiant du worker et ceux de requête / connexion (et de trace échantillonnée) du contexte courant"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.worker = parametres.WORKER_ID
+        record.id_requete = id_requete.get()
+        record.id_connexion = id_connexion.get()
+        record.id_trace = getattr(span_courant.get(), "id_trace", None)
+        return True
+
+
+class FiltreEchantillonnage(logging.Filter):
+    """
+    Laisse passer au plus `maximum` enregistrements par seconde et par logger
+    Le nombre d'enregistrements écartés est joint au suivant qui passe
+    """
+
+    def __init__(self, maximum: int):
+        super().__init__()
+        self.maximum = maximum
+        # logger -> [seconde courante, émis dans la seconde, écartés depuis le dernier émis]
+        self.etats: Dict[str, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        seconde = int(time.monotonic())
+        etat = self.etats.setdefault(record.name, [seconde, 0, 0])
+        if etat[0] != seconde:
+            etat[0], etat[1] = seconde, 0
+        if etat[1] >= self.maximum:
+            etat[2] += 1
+            journal_echantillonnes.inc()
+            return False
+        etat[1] += 1
+        if etat[2]:
+            record.echantillons_ecartes = etat[2]
+            etat[2] = 0
+        return True
+
+
+class GestionnaireFileNonBloquante(logging.handlers.QueueHandler):
+    """Dépose l'enregistrement dans une file bornée, ou l'abandonne si elle est pleine"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Seul le strict nécessaire est fait dans le thread appelant
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            journal_perdus.inc()
+
+
+_ecouteur: Optional[logging.handlers.QueueListener] = None
+
+
+def configurer_journalisation() -> None:
+    """Installer la file et le thread d'écriture sur le logger "app" (idempotent)"""
+    global _ecouteur
+    if _ecouteur is not None:
+        return
+
+    sortie = logging.StreamHandler(sys.stdout)
+    sortie.setFormatter(FormateurJSON())
+
+    file_attente = queue.Queue(maxsize=parametres.LOG_TAILLE_FILE)
+    gestionnaire = GestionnaireFileNonBloquante(file_attente)
+    gestionnaire.addFilter(FiltreContexte())
+
+    logger_app = logging.getLogger("app")
+    logger_app.handlers = [gestionnaire]
+    logger_app.setLevel(parametres.LOG_NIVEAU.upper())
+    logger_app.propagate = False
+
+    # Niveaux par logger : "app.sql=WARNING,app.boucle=INFO"
+    for definition in filter(None, parametres.LOG_NIVEAUX.split(",")):
+        nom, _, niveau = definition.partition("=")
+        logging.getLogger(nom.strip()).setLevel(niveau.strip().upper())
+
+    # Événements à fort volume : échantillonnés avant la mise en file
+    for nom in filter(None, parametres.LOG_ECHANTILLONNES.split(",")):
+        logging.getLogger(nom.strip()).addFilter(FiltreEchantillonnage(parametres.LOG_ECHANTILLON_PAR_SECONDE))
+
+    _ecouteur = logging.handlers.QueueListener(file_attente, sortie, respect_handler_level=True)
+    _ecouteur.start()
+
+
+def arreter_journalisation() -> None:
+    """Vider la file et arrêter le thread d'écriture"""
+    global _ecouteur
+    if _ecouteur is not None:
+        _ecouteur.stop()
+        _ecouteur = None
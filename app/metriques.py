@@ -0,0 +1,218 @@
+"""
+Métriques de l'application au format d'exposition texte Prometheus
+Compteurs, jauges et histogrammes sans dépendance externe
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.config import parametres
+
+
+BORNES_DUREE = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BORNES_TAILLE = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def formater_labels(noms: Sequence[str], valeurs: Sequence) -> str:
+
+    return ",".join(
+        '{}="{}"'.format(nom, str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for nom, valeur in zip(noms, valeurs)
+    )
+
+
+def _formater_valeur(valeur: float) -> str:
+
+    if valeur == float("inf"):
+        return "+Inf"
+    if isinstance(valeur, float) and valeur.is_integer():
+        return str(int(valeur))
+    return repr(valeur)
+
+
+class Compteur:
+    """Valeur qui ne fait qu'augmenter"""
+
+    __slots__ = ("labels", "valeur")
+
+    def __init__(self, labels: str = ""):
+        self.labels = labels
+        self.valeur = 0.0
+
+    def inc(self, n: float = 1.0) -> None:
+        self.valeur += n
+
+    def lignes(self, nom: str) -> Iterable[str]:
+        yield f"{nom}{{{self.labels}}} {_formater_valeur(self.valeur)}" if self.labels else f"{nom} {_formater_valeur(self.valeur)}"
+
+
+class Jauge(Compteur):
+    """Valeur qui monte et descend"""
+
+    __slots__ = ()
+
+    def dec(self, n: float = 1.0) -> None:
+        self.valeur -= n
+
+    def definir(self, valeur: float) -> None:
+        self.valeur = valeur
+
+
+class Histogramme:
+    """Répartition des observations dans des intervalles cumulés"""
+
+    __slots__ = ("labels", "bornes", "compteurs", "somme", "total")
+
+    def __init__(self, bornes: Sequence[float], labels: str = ""):
+        self.labels = labels
+        self.bornes = tuple(bornes)
+        # Un compteur par borne + le dépassement (+Inf)
+        self.compteurs = [0] * (len(self.bornes) + 1)
+        self.somme = 0.0
+        self.total = 0
+
+    def observer(self, valeur: float) -> None:
+        self.compteurs[bisect_left(self.bornes, valeur)] += 1
+        self.somme += valeur
+        self.total += 1
+
+    def lignes(self, nom: str) -> Iterable[str]:
+        prefixe = self.labels + "," if self.labels else ""
+        cumul = 0
+        for borne, nombre in zip(self.bornes + (float("inf"),), self.compteurs):
+            cumul += nombre
+            yield f'{nom}_bucket{{{prefixe}le="{_formater_valeur(float(borne))}"}} {cumul}'
+        suffixe = f"{{{self.labels}}}" if self.labels else ""
+        yield f"{nom}_sum{suffixe} {_formater_valeur(self.somme)}"
+        yield f"{nom}_count{suffixe} {self.total}"
+
+
+class Famille:
+    """
+    Métrique nommée et ses déclinaisons par valeurs de labels
+    Les déclinaisons sont créées une fois (pré-enregistrement) puis réutilisées telles quelles
+    """
+
+    def __init__(self, nom: str, aide: str, type_metrique: str, labels: Sequence[str] = (), bornes: Optional[Sequence[float]] = None):
+        self.nom = nom
+        self.aide = aide
+        self.type = type_metrique
+        self.noms_labels = tuple(labels)
+        self.bornes = bornes
+        self.enfants: Dict[Tuple, object] = {}
+
+    def enfant(self, *valeurs):
+
+        enfant = self.enfants.get(valeurs)
+        if enfant is None:
+            labels = formater_labels(self.noms_labels, valeurs)
+            if self.type == "histogram":
+                enfant = Histogramme(self.bornes or BORNES_DUREE, labels)
+            elif self.type == "gauge":
+                enfant = Jauge(labels)
+            else:
+                enfant = Compteur(labels)
+            self.enfants[valeurs] = enfant
+        return enfant
+
+    def lignes(self) -> Iterable[str]:
+
+        yield f"# HELP {self.nom} {self.aide}"
+        yield f"# TYPE {self.nom} {self.type}"
+        for enfant in list(self.enfants.values()):
+            yield from enfant.lignes(self.nom)
+
+
+def _ajouter_labels(ligne: str, labels: str) -> str:
+    """Insérer des labels dans une ligne d'exposition (avec ou sans labels existants)"""
+    accolade = ligne.find("{")
+    espace = ligne.find(" ")
+    if accolade != -1 and accolade < espace:
+        return f"{ligne[:accolade + 1]}{labels},{ligne[accolade + 1:]}"
+    return f"{ligne[:espace]}{{{labels}}}{ligne[espace:]}"
+
+
+class RegistreMetriques:
+
+    def __init__(self, labels_communs: str = ""):
+        # Labels ajoutés à chaque série (identifiant du worker : un scrape n'atteint qu'un worker)
+        self.labels_communs = labels_communs
+        self.familles: List[Famille] = []
+        # Fonctions appelées à chaque collecte, pour les valeurs lues à la demande
+        self.collecteurs: List[Callable[[], Iterable[str]]] = []
+
+    def compteur(self, nom: str, aide: str, labels: Sequence[str] = ()) -> Famille:
+        return self._ajouter(Famille(nom, aide, "counter", labels))
+
+    def jauge(self, nom: str, aide: str, labels: Sequence[str] = ()) -> Famille:
+        return self._ajouter(Famille(nom, aide, "gauge", labels))
+
+    def histogramme(self, nom: str, aide: str, labels: Sequence[str] = (), bornes: Sequence[float] = BORNES_DUREE) -> Famille:
+        return self._ajouter(Famille(nom, aide, "histogram", labels, bornes))
+
+    def _ajouter(self, famille: Famille) -> Famille:
+        self.familles.append(famille)
+        return famille
+
+    def ajouter_collecteur(self, collecteur: Callable[[], Iterable[str]]) -> None:
+        self.collecteurs.append(collecteur)
+
+    def exposition(self) -> str:
+
+        lignes: List[str] = []
+        for famille in self.familles:
+            lignes.extend(famille.lignes())
+        for collecteur in self.collecteurs:
+            lignes.extend(collecteur())
+        if self.labels_communs:
+            lignes = [
+                ligne if ligne.startswith("#") else _ajouter_labels(ligne, self.labels_communs)
+                for ligne in lignes
+            ]
+        lignes.append("")
+        return "\n".join(lignes)
+
+
+def lignes_jauge(nom: str, aide: str, valeurs: Iterable[Tuple[str, float]], type_metrique: str = "gauge") -> Iterable[str]:
+    """Lignes d'exposition pour une métrique lue au moment de la collecte"""
+    yield f"# HELP {nom} {aide}"
+    yield f"# TYPE {nom} {type_metrique}"
+    for labels, valeur in valeurs:
+        yield f"{nom}{{{labels}}} {_formater_valeur(valeur)}" if labels else f"{nom} {_formater_valeur(valeur)}"
+
+
+# Registre global (un par worker)
+registre = RegistreMetriques(formater_labels(("worker",), (parametres.WORKER_ID,)))
+
+# Métriques HTTP
+http_duree = registre.histogramme(
+    "http_requete_duree_secondes", "Durée de traitement des requêtes HTTP", ("methode", "route")
+)
+http_reponses = registre.compteur(
+    "http_reponses_total", "Réponses HTTP par classe de statut", ("classe",)
+)
+
+# Métriques base de données
+db_attente_pool = registre.histogramme(
+    "db_pool_attente_secondes", "Temps d'attente pour obtenir une connexion du pool",
+    bornes=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+).enfant()
+
+# Métriques WebSocket
+ws_diffusion_duree = registre.histogramme(
+    "ws_diffusion_duree_secondes", "Durée d'une diffusion à tous les membres d'un canal"
+).enfant()
+ws_diffusion_destinataires = registre.histogramme(
+    "ws_diffusion_destinataires", "Nombre de destinataires par diffusion", bornes=BORNES_TAILLE
+).enfant()
+ws_trames_en_attente = registre.jauge(
+    "ws_trames_en_attente", "Trames sortantes en cours d'envoi"
+).enfant()
+messages_persistes = registre.compteur(
+    "messages_persistes_total", "Messages enregistrés en base", ("source",)
+)
+
+# Pré-enregistrement des déclinaisons connues d'avance
+for _classe in ("1xx", "2xx", "3xx", "4xx", "5xx"):
+    http_reponses.enfant(_classe)
+for _source in ("websocket", "rest"):
+    messages_persistes.enfant(_source)
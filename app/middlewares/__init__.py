@@ -0,0 +1,20 @@
+"""
+Package des middlewares
+Middlewares ASGI appliqués à toute l'application
+"""
+from app.middlewares.metriques import MiddlewareMetriques, enregistrer_routes
+from app.middlewares.requetes_sql import MiddlewareRequetesSQL
+from app.middlewares.contexte import MiddlewareContexte
+from app.middlewares.tracage import MiddlewareTracage
+from app.middlewares.delestage import MiddlewareDelestage
+from app.middlewares.coalescence import MiddlewareCoalescence
+
+__all__ = [
+    "MiddlewareMetriques",
+    "enregistrer_routes",
+    "MiddlewareRequetesSQL",
+    "MiddlewareContexte",
+    "MiddlewareTracage",
+    "MiddlewareDelestage",
+    "MiddlewareCoalescence"
+]
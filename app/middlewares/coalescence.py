@@ -0,0 +1,117 @@
+"""
+Middleware de coalescence des lectures (singleflight)
+Des requêtes GET identiques et simultanées partagent une seule exécution et sa réponse sérialisée
+"""
+import asyncio
+import re
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException
+
+from app.config import parametres
+from app.metriques import registre
+from app.services.auth import decoder_token
+
+
+# Lectures coalescées : leur réponse ne dépend que du chemin, des paramètres, du rôle du demandeur
+# et de l'en-tête If-None-Match
+ROUTES_COALESCEES = (
+    re.compile(r"^/messages/canal/\d+$"),
+    re.compile(r"^/canaux/$"),
+    re.compile(r"^/canaux/\d+$"),
+)
+
+coalescence_requetes = registre.compteur(
+    "coalescence_requetes_total", "Lectures coalescées : exécutées (meneur) ou servies par une exécution en cours (partage)",
+    ("resultat",)
+)
+_meneurs = coalescence_requetes.enfant("meneur")
+_partages = coalescence_requetes.enfant("partage")
+
+
+def _classe_autorisation(scope) -> Optional[int]:
+    """
+    Rôle du token : les routes coalescées n'autorisent et ne filtrent que selon le rôle
+    Le token de chaque requête est vérifié (signature, expiration, révocation) ; None = pas de coalescence
+    """
+    for nom, valeur in scope["headers"]:
+        if nom == b"authorization":
+            schema, _, token = valeur.decode("latin-1").partition(" ")
+            if schema.lower() != "bearer" or not token:
+                return None
+            try:
+                return decoder_token(token).role_id
+            except HTTPException:
+                return None
+    return None
+
+
+class MiddlewareCoalescence:
+
+    def __init__(self, app):
+        self.app = app
+        # Clé -> réponse (statut, en-têtes, corps) de l'exécution en cours ; None si elle a échoué
+        self.en_vol: Dict[Tuple, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not parametres.COALESCENCE_ACTIVE
+            or not any(route.match(scope["path"]) for route in ROUTES_COALESCEES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        role_id = _classe_autorisation(scope)
+        if role_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Une requête conditionnelle peut recevoir 304 : elle ne partage qu'avec le même If-None-Match
+        if_none_match = next((valeur for nom, valeur in scope["headers"] if nom == b"if-none-match"), None)
+        cle = (
+            scope["path"], tuple(sorted(parse_qsl(scope["query_string"].decode("latin-1")))), role_id, if_none_match
+        )
+        en_cours = self.en_vol.get(cle)
+        if en_cours is not None:
+            # shield : l'abandon d'une requête suiveuse n'annule pas la réponse des autres
+            reponse = await asyncio.shield(en_cours)
+            if reponse is not None:
+                _partages.inc()
+                await self._rejouer(send, reponse)
+                return
+            # Le meneur a échoué : exécution normale
+            await self.app(scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.en_vol[cle] = future
+        _meneurs.inc()
+        debut = None
+        morceaux = []
+        termine = False
+
+        async def send_capture(message):
+            nonlocal debut, termine
+            if message["type"] == "http.response.start":
+                debut = message
+            elif message["type"] == "http.response.body":
+                morceaux.append(message.get("body", b""))
+                termine = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_capture)
+        finally:
+            del self.en_vol[cle]
+            # Réponse partagée seulement si elle a été entièrement produite
+            future.set_result((debut["status"], debut.get("headers", []), b"".join(morceaux)) if termine else None)
+
+    @staticmethod
+    async def _rejouer(send, reponse: tuple) -> None:
+        statut, entetes, corps = reponse
+        await send({"type": "http.response.start", "status": statut, "headers": list(entetes)})
+        await send({"type": "http.response.body", "body": corps})
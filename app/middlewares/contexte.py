@@ -0,0 +1,54 @@
+"""
+Middleware de contexte de journalisation
+Identifiant de requête HTTP ou de connexion WebSocket lié à chaque enregistrement
+"""
+import re
+import uuid
+
+from app.journalisation import id_requete, id_connexion
+
+
+# Identifiant fourni par un proxy amont : accepté seulement s'il est court et inoffensif
+_ID_VALIDE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class MiddlewareContexte:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] == "websocket":
+            jeton = id_connexion.set(uuid.uuid4().hex[:16])
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                id_connexion.reset(jeton)
+            return
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        identifiant = None
+        for nom, valeur in scope["headers"]:
+            if nom == b"x-request-id":
+                valeur = valeur.decode("latin-1")
+                if _ID_VALIDE.match(valeur):
+                    identifiant = valeur
+                break
+        identifiant = identifiant or uuid.uuid4().hex[:16]
+
+        async def send_identifiant(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", identifiant.encode())
+                ]
+            await send(message)
+
+        jeton = id_requete.set(identifiant)
+        try:
+            await self.app(scope, receive, send_identifiant)
+        finally:
+            id_requete.reset(jeton)
@@ -0,0 +1,123 @@
+"""
+Middleware de délestage (contrôle d'admission adaptatif)
+503 + Retry-After immédiats quand le pool, les requêtes en cours ou la boucle d'événements saturent
+"""
+import json
+import math
+from typing import Tuple
+
+from app.config import parametres
+from app.database import moteur
+from app.metriques import registre, lignes_jauge
+from app.surveillance_boucle import moniteur_boucle
+
+
+# Classes de priorité et niveau de surcharge (1.0 = un signal atteint son seuil) à partir duquel
+# leurs requêtes sont refusées ; "critique" n'est jamais délestée
+SEUILS_CLASSES = {
+    "basse": 0.5,
+    "normale": 1.0,
+    "haute": 2.0,
+}
+
+# Listes d'administration : premières délestées
+_PREFIXES_BASSE = ("/utilisateurs", "/roles", "/permissions", "/traces", "/profilage", "/ws/", "/docs", "/redoc", "/openapi.json")
+
+CAUSES = ("requetes_en_cours", "attente_pool", "file_pool", "retard_boucle")
+
+delestage_requetes = registre.compteur(
+    "delestage_requetes_total", "Requêtes HTTP refusées par le délestage", ("classe", "cause")
+)
+for _classe in SEUILS_CLASSES:
+    for _cause in CAUSES:
+        delestage_requetes.enfant(_classe, _cause)
+
+
+def classe_priorite(methode: str, chemin: str) -> str:
+
+    if chemin.startswith("/sante") or chemin == "/metrics":
+        return "critique"
+    # Connexion, rafraîchissement et envoi de messages passent avant les lectures
+    if chemin.startswith("/auth") or (methode == "POST" and chemin.startswith("/messages")):
+        return "haute"
+    if methode == "GET" and chemin.startswith(_PREFIXES_BASSE):
+        return "basse"
+    return "normale"
+
+
+class _Admission:
+    """Requêtes HTTP admises et pas encore terminées sur ce worker"""
+
+    __slots__ = ("en_cours",)
+
+    def __init__(self):
+        self.en_cours = 0
+
+
+admission = _Admission()
+
+
+def niveau_surcharge() -> Tuple[float, str]:
+    """Signal le plus chargé, rapporté à son seuil, et sa cause"""
+    pool = moteur.pool
+    niveaux = [
+        (admission.en_cours / parametres.DELESTAGE_MAX_EN_COURS, "requetes_en_cours"),
+        (pool.attente_recente() / parametres.DELESTAGE_ATTENTE_POOL_SECONDES, "attente_pool"),
+        (moniteur_boucle.retard_recent() / parametres.DELESTAGE_RETARD_BOUCLE_SECONDES, "retard_boucle"),
+    ]
+    # Threads qui attendent une connexion alors que le pool est plein
+    if pool.checkedout() >= pool.size() + max(pool._max_overflow, 0):
+        niveaux.append((pool.en_attente / parametres.DELESTAGE_MAX_FILE_POOL, "file_pool"))
+    return max(niveaux)
+
+
+class MiddlewareDelestage:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+
+        # Les WebSockets ne sont pas délestées (leurs envois sont limités par le limiteur de débit)
+        if scope["type"] != "http" or not parametres.DELESTAGE_ACTIF:
+            await self.app(scope, receive, send)
+            return
+
+        classe = classe_priorite(scope["method"], scope["path"])
+        if classe != "critique":
+            niveau, cause = niveau_surcharge()
+            if niveau >= SEUILS_CLASSES[classe]:
+                delestage_requetes.enfant(classe, cause).inc()
+                await _refuser(send, niveau)
+                return
+
+        admission.en_cours += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.en_cours -= 1
+
+
+async def _refuser(send, niveau: float) -> None:
+    # Plus la surcharge est forte, plus le client est invité à patienter
+    attente = min(math.ceil(parametres.DELESTAGE_RETRY_AFTER_SECONDES * niveau), 60)
+    corps = json.dumps({"detail": "Serveur surchargé, réessayer plus tard"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(corps)).encode()),
+            (b"retry-after", str(attente).encode()),
+        ]
+    })
+    await send({"type": "http.response.body", "body": corps})
+
+
+def _collecter_admission():
+    niveau, _ = niveau_surcharge()
+    yield from lignes_jauge("http_requetes_en_cours", "Requêtes HTTP en cours de traitement", [("", admission.en_cours)])
+    yield from lignes_jauge("delestage_niveau_surcharge", "Niveau de surcharge (1 = seuil atteint)", [("", round(niveau, 3))])
+
+
+registre.ajouter_collecteur(_collecter_admission)
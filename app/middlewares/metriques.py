@@ -0,0 +1,52 @@
+"""
+Middleware de mesure des requêtes HTTP
+Histogramme de latence par route, pré-enregistré au démarrage
+"""
+import time
+from typing import Dict, Iterable
+
+from app.metriques import Histogramme, http_duree, http_reponses
+
+
+# id de la route FastAPI -> histogramme de la route (rempli une fois par enregistrer_routes)
+_histogrammes_routes: Dict[int, Histogramme] = {}
+_histogramme_non_route = http_duree.enfant("", "non_routee")
+_reponses_par_classe = [http_reponses.enfant(f"{classe}xx") for classe in range(1, 6)]
+
+
+def enregistrer_routes(routes: Iterable) -> None:
+    """Créer à l'avance un histogramme par route HTTP (aucune allocation de labels par requête)"""
+    for route in routes:
+        methodes = getattr(route, "methods", None)
+        if not methodes:
+            continue
+        _histogrammes_routes[id(route)] = http_duree.enfant(",".join(sorted(methodes)), route.path)
+
+
+class MiddlewareMetriques:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        debut = time.perf_counter()
+        statut = 500
+
+        async def send_mesure(message):
+            nonlocal statut
+            if message["type"] == "http.response.start":
+                statut = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_mesure)
+        finally:
+            # Le routeur FastAPI dépose la route résolue dans le scope
+            histogramme = _histogrammes_routes.get(id(scope.get("route")), _histogramme_non_route)
+            histogramme.observer(time.perf_counter() - debut)
+            _reponses_par_classe[min(max(statut // 100, 1), 5) - 1].inc()
@@ -0,0 +1,37 @@
+"""
+Middleware de comptage des requêtes SQL
+Nombre de requêtes et temps passé en base pour chaque requête HTTP
+"""
+from app.config import parametres
+from app.requetes_sql import mesurer_requetes_sql
+from app.surveillance_boucle import etiqueter_tache_courante
+
+
+class MiddlewareRequetesSQL:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+
+        # Les WebSockets sont mesurées trame par trame dans la route
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        libelle = f"{scope['method']} {scope['path']}"
+        etiqueter_tache_courante(libelle)
+        
+        with mesurer_requetes_sql(libelle) as statistiques:
+
+            async def send_entetes(message):
+                # En debug, exposer les compteurs dans les en-têtes de réponse
+                if message["type"] == "http.response.start" and parametres.DEBUG:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (b"x-requetes-sql", str(statistiques.nombre).encode()),
+                        (b"x-duree-sql-ms", f"{statistiques.duree * 1000:.2f}".encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_entetes)
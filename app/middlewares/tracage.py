@@ -0,0 +1,39 @@
+"""
+Middleware de traçage des requêtes HTTP
+Span racine par requête, nommé d'après la route résolue
+"""
+from app.tracage import demarrer_trace
+
+
+class MiddlewareTracage:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+
+        # Les WebSockets sont tracées trame par trame dans la route
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for nom, valeur in scope["headers"]:
+            if nom == b"traceparent":
+                traceparent = valeur.decode("latin-1")
+                break
+
+        with demarrer_trace(f"{scope['method']} {scope['path']}", traceparent, **{"http.method": scope["method"]}) as racine:
+
+            async def send_statut(message):
+                if message["type"] == "http.response.start":
+                    racine.definir("http.status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_statut)
+            finally:
+                # Nom stable par route (/canaux/{canal_id}) plutôt que par chemin
+                route = scope.get("route")
+                if route is not None and hasattr(racine, "nom"):
+                    racine.nom = f"{scope['method']} {route.path}"
@@ -8,6 +8,10 @@ from app.modeles.permission import Permission
 from app.modeles.role_permission import RolePermission
 from app.modeles.canal import Canal
 from app.modeles.message import Message
+from app.modeles.token_rafraichissement import TokenRafraichissement
+from app.modeles.revocation import Revocation
+from app.modeles.empreinte import EmpreinteBase
+from app.modeles.version_table import VersionTable
 
 __all__ = [
     "Utilisateur",
@@ -15,5 +19,9 @@ __all__ = [
     "Permission",
     "RolePermission",
     "Canal",
-    "Message"
+    "Message",
+    "TokenRafraichissement",
+    "Revocation",
+    "EmpreinteBase",
+    "VersionTable"
 ]
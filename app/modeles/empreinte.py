@@ -0,0 +1,19 @@
+"""
+Modèle EmpreinteBase
+Empreinte du schéma et des données de base déjà appliqués (évite de refaire le seed à chaque démarrage)
+"""
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class EmpreinteBase(SQLModel, table=True):
+   
+    __tablename__ = "empreintes_base"
+    
+    # Une ligne par élément suivi ("seed")
+    cle: str = Field(primary_key=True, max_length=50)
+    
+    # SHA-256 hexadécimal du schéma et des données de base
+    empreinte: str = Field(max_length=64)
+    
+    date_modification: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,27 @@
+"""
+Modèle Revocation
+Journal des révocations de tokens d'accès (un token précis ou tous les tokens d'un utilisateur)
+"""
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+class Revocation(SQLModel, table=True):
+   
+    __tablename__ = "revocations"
+    
+    # L'id auto-incrémenté sert de numéro de version pour la synchronisation incrémentale
+    id: Optional[int] = Field(default=None, primary_key=True)
+    
+    # Révocation d'un token précis (claim "jti")
+    jti: Optional[str] = Field(default=None, max_length=64)
+    
+    # Révocation de tous les tokens d'un utilisateur émis avant date_revocation
+    utilisateur_id: Optional[int] = Field(default=None, index=True)
+    
+    # Timestamp UNIX (comparé au claim "iat" des tokens)
+    date_revocation: float
+    
+    # Au-delà de cette date, tous les tokens concernés ont expiré d'eux-mêmes
+    date_expiration: datetime = Field(index=True)
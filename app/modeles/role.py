@@ -19,6 +19,9 @@ class Role(SQLModel, table=True):
     nom: str = Field(unique=True, index=True, max_length=50)
     description: Optional[str] = Field(default=None, max_length=255)
     
+    # Rang dans la hiérarchie (plus il est élevé, plus le rôle a accès aux canaux restreints)
+    rang: int = Field(default=0, index=True)
+    
     est_actif: bool = Field(default=True)
     
     date_creation: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,28 @@
+"""
+Modèle TokenRafraichissement
+Table des refresh tokens (stockés hachés, rotation à chaque utilisation)
+"""
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+class TokenRafraichissement(SQLModel, table=True):
+   
+    __tablename__ = "tokens_rafraichissement"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    
+    # Empreinte SHA-256 du token (le token en clair n'est jamais stocké)
+    token_hash: str = Field(unique=True, index=True, max_length=64)
+    
+    utilisateur_id: int = Field(foreign_key="utilisateurs.id", index=True)
+    
+    # Identifiant de la chaîne de rotation (toutes les rotations d'une même connexion)
+    famille: str = Field(index=True, max_length=64)
+    
+    # Un token utilisé ou révoqué ne peut plus servir
+    est_revoque: bool = Field(default=False)
+    
+    date_creation: datetime = Field(default_factory=datetime.utcnow)
+    date_expiration: datetime
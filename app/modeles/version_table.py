@@ -0,0 +1,16 @@
+"""
+Modèle VersionTable
+Compteur de modifications par table de référence (ETags, caches invalidés entre workers)
+"""
+from sqlmodel import SQLModel, Field
+
+
+class VersionTable(SQLModel, table=True):
+   
+    __tablename__ = "versions_tables"
+    
+    # Nom de la table suivie ("roles", "permissions"...)
+    nom: str = Field(primary_key=True, max_length=50)
+    
+    # Incrémenté dans la transaction de chaque modification de la table
+    version: int = Field(default=0)
@@ -0,0 +1,143 @@
+"""
+Profilage par échantillonnage à la demande
+Piles de tous les threads et des tâches asyncio, au format "collapsed stacks" (flamegraph)
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from app.surveillance_boucle import libelles_taches
+
+
+# Chemins affichés relativement à la racine du projet ou à site-packages
+_RACINE_PROJET = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ProfilEnCours(Exception):
+    """Un profil est déjà en cours sur ce worker"""
+
+
+def _nom_frame(frame) -> str:
+    code = frame.f_code
+    fichier = code.co_filename
+    if fichier.startswith(_RACINE_PROJET):
+        fichier = os.path.relpath(fichier, _RACINE_PROJET)
+    elif "site-packages" in fichier:
+        fichier = fichier.split("site-packages" + os.sep, 1)[1]
+    else:
+        fichier = os.path.basename(fichier)
+    # Le point-virgule sépare les frames dans le format collapsed
+    return f"{code.co_name} ({fichier})".replace(";", ":")
+
+
+def _pile(frame) -> list:
+    """Noms des frames, de la plus externe à la plus interne"""
+    noms = []
+    while frame is not None:
+        noms.append(_nom_frame(frame))
+        frame = frame.f_back
+    noms.reverse()
+    return noms
+
+
+class ProfileurEchantillonnage:
+    """
+    Aucun coût hors profilage : ni hook ni thread tant que profiler() n'est pas appelé
+    Les threads sont échantillonnés depuis un thread dédié (sys._current_frames),
+    les tâches asyncio depuis la boucle elle-même (seul endroit où leur parcours est sûr)
+    """
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        # Échantillons écrits par le thread d'échantillonnage et par la boucle
+        self._verrou_echantillons = threading.Lock()
+        self.echantillons: Counter = Counter()
+        self.nombre_echantillons = 0
+
+    async def profiler(self, duree: float, frequence: float) -> str:
+        """Échantillonner pendant `duree` secondes à `frequence` Hz et retourner le profil collapsed"""
+        if not self._verrou.acquire(blocking=False):
+            raise ProfilEnCours()
+
+        try:
+            with self._verrou_echantillons:
+                self.echantillons = Counter()
+                self.nombre_echantillons = 0
+            intervalle = 1.0 / frequence
+            boucle = asyncio.get_running_loop()
+            id_thread_boucle = threading.get_ident()
+            arret = threading.Event()
+
+            thread = threading.Thread(
+                target=self._echantillonner_threads,
+                args=(boucle, id_thread_boucle, intervalle, arret),
+                name="profileur",
+                daemon=True
+            )
+            thread.start()
+            try:
+                fin = time.monotonic() + duree
+                while time.monotonic() < fin:
+                    self._echantillonner_taches(boucle)
+                    await asyncio.sleep(intervalle)
+            finally:
+                arret.set()
+                thread.join(timeout=1)
+
+            with self._verrou_echantillons:
+                echantillons = sorted(self.echantillons.items())
+            return "".join(f"{pile} {nombre}\n" for pile, nombre in echantillons)
+        finally:
+            self._verrou.release()
+
+    def _echantillonner_threads(self, boucle, id_thread_boucle: int, intervalle: float, arret: threading.Event):
+
+        noms_threads = {}
+        id_courant = threading.get_ident()
+        while not arret.wait(intervalle):
+            for thread in threading.enumerate():
+                noms_threads[thread.ident] = thread.name
+
+            piles = []
+            for id_thread, frame in sys._current_frames().items():
+                if id_thread == id_courant:
+                    continue
+                racine = f"thread:{noms_threads.get(id_thread, id_thread)}"
+                if id_thread == id_thread_boucle:
+                    # Attribuer l'échantillon à la tâche qui occupe la boucle à cet instant
+                    tache = asyncio.current_task(boucle)
+                    if tache is not None:
+                        racine += ";tache:" + libelles_taches.get(tache, tache.get_name())
+                piles.append(";".join([racine] + _pile(frame)))
+            with self._verrou_echantillons:
+                self.echantillons.update(piles)
+                self.nombre_echantillons += 1
+
+    def _echantillonner_taches(self, boucle):
+        """Piles d'attente des tâches suspendues (où attendent les WebSockets, les requêtes...)"""
+        courante = asyncio.current_task(boucle)
+        piles = []
+        for tache in asyncio.all_tasks(boucle):
+            if tache is courante:
+                continue
+            libelle = libelles_taches.get(tache)
+            if libelle is None:
+                continue
+            # Chaîne des await, de la coroutine de la tâche jusqu'au point de suspension
+            noms = []
+            coroutine = tache.get_coro()
+            while coroutine is not None:
+                frame = getattr(coroutine, "cr_frame", None) or getattr(coroutine, "gi_frame", None)
+                if frame is not None:
+                    noms.append(_nom_frame(frame))
+                coroutine = getattr(coroutine, "cr_await", None) or getattr(coroutine, "gi_yieldfrom", None)
+            piles.append(";".join([f"attente:{libelle}"] + noms))
+        with self._verrou_echantillons:
+            self.echantillons.update(piles)
+
+
+# Instance globale (un profil à la fois par worker)
+profileur = ProfileurEchantillonnage()
@@ -0,0 +1,81 @@
+"""
+Comptage des requêtes SQL par requête HTTP ou trame WebSocket
+Écouteurs d'événements SQLAlchemy et détection des motifs N+1
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import parametres
+from app.metriques import registre, BORNES_TAILLE
+
+
+logger = logging.getLogger("app.sql")
+
+sql_requetes_par_unite = registre.histogramme(
+    "sql_requetes_par_unite", "Requêtes SQL par requête HTTP ou trame WebSocket", bornes=BORNES_TAILLE
+).enfant()
+
+
+class StatistiquesSQL:
+
+    __slots__ = ("libelle", "nombre", "duree", "instructions")
+
+    def __init__(self, libelle: str):
+        self.libelle = libelle
+        self.nombre = 0
+        self.duree = 0.0
+        # Texte SQL paramétré -> nombre d'exécutions (même texte = même motif)
+        self.instructions: Dict[str, int] = {}
+
+    def enregistrer(self, instruction: str, duree: float) -> None:
+        self.nombre += 1
+        self.duree += duree
+        self.instructions[instruction] = self.instructions.get(instruction, 0) + 1
+
+    def terminer(self) -> None:
+        """Publier les compteurs et signaler les instructions répétées (N+1)"""
+        sql_requetes_par_unite.observer(self.nombre)
+        for instruction, repetitions in self.instructions.items():
+            if repetitions >= parametres.SQL_SEUIL_REPETITIONS:
+                logger.warning(
+                    "Instruction SQL répétée %d fois dans %s (N+1 probable) : %s",
+                    repetitions, self.libelle, " ".join(instruction.split())[:300]
+                )
+
+
+statistiques_courantes: ContextVar[Optional[StatistiquesSQL]] = ContextVar("statistiques_sql", default=None)
+
+
+@contextmanager
+def mesurer_requetes_sql(libelle: str):
+    """Compter les requêtes SQL exécutées dans ce bloc (requête HTTP, trame WebSocket...)"""
+    statistiques = StatistiquesSQL(libelle)
+    jeton = statistiques_courantes.set(statistiques)
+    try:
+        yield statistiques
+    finally:
+        statistiques_courantes.reset(jeton)
+        statistiques.terminer()
+
+
+def installer_compteur_requetes(moteur: Engine) -> None:
+
+    @event.listens_for(moteur, "before_cursor_execute")
+    def _avant(conn, cursor, statement, parameters, context, executemany):
+        if statistiques_courantes.get() is not None:
+            conn.info.setdefault("debuts_requetes", []).append(time.perf_counter())
+
+    @event.listens_for(moteur, "after_cursor_execute")
+    def _apres(conn, cursor, statement, parameters, context, executemany):
+        statistiques = statistiques_courantes.get()
+        if statistiques is None:
+            return
+        debuts = conn.info.get("debuts_requetes")
+        if debuts:
+            statistiques.enregistrer(statement, time.perf_counter() - debuts.pop())
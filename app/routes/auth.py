@@ -2,20 +2,37 @@
 Routes d'authentification
 Login, logout, changement de mot de passe
 """
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 
 from app.database import obtenir_session
-from app.schemas.auth import Token, LoginForm, ChangerMotDePasse
+from app.schemas.auth import Token, LoginForm, ChangerMotDePasse, RafraichirToken, TokenData
 from app.schemas.utilisateur import UtilisateurLire
 from app.services.auth import (
     authentifier_utilisateur,
     creer_token_acces,
-    obtenir_utilisateur_courant
+    decoder_token,
+    obtenir_identite_courante,
+    obtenir_utilisateur_courant,
+    oauth2_scheme_optionnel
 )
+from app.services.rafraichissement import (
+    creer_token_rafraichissement,
+    rafraichir_tokens,
+    revoquer_famille,
+    revoquer_tokens_utilisateur,
+    hacher_token
+)
+from app.services.revocation import revoquer_token_acces, revoquer_acces_utilisateur
+from app.services.limitation import limiteur_connexion
+from app.utils.permissions import exiger_role
 from app.services.securite import hacher_mot_de_passe, verifier_mot_de_passe
+from app.modeles.token_rafraichissement import TokenRafraichissement
 from app.config import parametres
 
 router = APIRouter(prefix="/auth", tags=["Authentification"])
@@ -23,19 +40,33 @@ router = APIRouter(prefix="/auth", tags=["Authentification"])
 
 @router.post("/login", response_model=Token)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     session: Session = Depends(obtenir_session)
 ):
     """
     Connexion d'un utilisateur et génération du token JWT
     """
-    utilisateur = authentifier_utilisateur(
+    # Refus immédiat, avant tout hachage, si l'IP ou le compte dépasse sa limite
+    ip = request.client.host if request.client else "inconnue"
+    attente = limiteur_connexion.verifier(ip, form_data.username)
+    if attente is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Trop de tentatives de connexion, réessayez plus tard",
+            headers={"Retry-After": str(math.ceil(attente))},
+        )
+    
+    # Vérification bcrypt hors de la boucle d'événements
+    utilisateur = await run_in_threadpool(
+        authentifier_utilisateur,
         session, 
         form_data.username, 
         form_data.password
     )
     
     if not utilisateur:
+        limiteur_connexion.enregistrer_echec(form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nom d'utilisateur ou mot de passe incorrect",
@@ -48,14 +79,85 @@ async def login(
             detail="Compte désactivé"
         )
     
+    limiteur_connexion.enregistrer_succes(form_data.username)
+    
     # Créer le token JWT
     access_token_expires = timedelta(minutes=parametres.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = creer_token_acces(
-        data={"sub": utilisateur.nom_utilisateur, "user_id": utilisateur.id},
+        data={"sub": utilisateur.nom_utilisateur, "user_id": utilisateur.id, "role_id": utilisateur.role_id},
         expires_delta=access_token_expires
     )
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Créer le refresh token (nouvelle famille de rotation)
+    refresh_token = creer_token_rafraichissement(session, utilisateur.id)
+    session.commit()
+    
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/refresh", response_model=Token)
+async def rafraichir(
+    donnees: RafraichirToken,
+    session: Session = Depends(obtenir_session)
+):
+    """
+    Échanger un refresh token contre un nouveau token d'accès
+    Le refresh token est consommé et remplacé (rotation), sans vérification du mot de passe
+    """
+    utilisateur, refresh_token = rafraichir_tokens(session, donnees.refresh_token)
+    
+    access_token = creer_token_acces(
+        data={"sub": utilisateur.nom_utilisateur, "user_id": utilisateur.id, "role_id": utilisateur.role_id},
+        expires_delta=timedelta(minutes=parametres.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/logout")
+async def logout(
+    donnees: RafraichirToken,
+    token: Optional[str] = Depends(oauth2_scheme_optionnel),
+    session: Session = Depends(obtenir_session)
+):
+    """
+    Déconnexion : révoque la chaîne de refresh tokens de cette session
+    et, s'il est fourni, le token d'accès courant
+    """
+    if token:
+        # Token d'accès expiré, invalide ou déjà révoqué : rien à révoquer, la déconnexion continue
+        try:
+            token_data = decoder_token(token)
+        except HTTPException:
+            token_data = None
+        if token_data is not None:
+            revoquer_token_acces(session, token_data.jti, datetime.utcfromtimestamp(token_data.exp))
+    
+    statement = select(TokenRafraichissement).where(
+        TokenRafraichissement.token_hash == hacher_token(donnees.refresh_token)
+    )
+    token_stocke = session.exec(statement).first()
+    
+    if token_stocke:
+        revoquer_famille(session, token_stocke.famille)
+    session.commit()
+    
+    return {"message": "Déconnexion réussie"}
+
+
+@router.post("/logout-partout")
+async def logout_partout(
+    utilisateur_courant: TokenData = Depends(obtenir_identite_courante),
+    session: Session = Depends(obtenir_session)
+):
+    """
+    Révoque tous les tokens de l'utilisateur connecté (toutes les sessions)
+    """
+    revoquer_tokens_utilisateur(session, utilisateur_courant.id)
+    revoquer_acces_utilisateur(session, utilisateur_courant.id)
+    session.commit()
+    
+    return {"message": "Toutes les sessions ont été révoquées"}
 
 
 @router.get("/moi", response_model=UtilisateurLire)
@@ -78,15 +180,31 @@ async def changer_mot_de_passe(
     Permet à un utilisateur de changer son mot de passe
     """
     # Vérifier l'ancien mot de passe
-    if not verifier_mot_de_passe(donnees.ancien_mot_de_passe, utilisateur_courant.mot_de_passe_hash):
+    # Vérification et hachage bcrypt hors de la boucle d'événements
+    if not await run_in_threadpool(verifier_mot_de_passe, donnees.ancien_mot_de_passe, utilisateur_courant.mot_de_passe_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ancien mot de passe incorrect"
         )
     
     # Hacher et enregistrer le nouveau mot de passe
-    utilisateur_courant.mot_de_passe_hash = hacher_mot_de_passe(donnees.nouveau_mot_de_passe)
+    utilisateur_courant.mot_de_passe_hash = await run_in_threadpool(hacher_mot_de_passe, donnees.nouveau_mot_de_passe)
     session.add(utilisateur_courant)
+    
+    # Invalider les sessions ouvertes avec l'ancien mot de passe
+    revoquer_tokens_utilisateur(session, utilisateur_courant.id)
+    revoquer_acces_utilisateur(session, utilisateur_courant.id)
     session.commit()
     
     return {"message": "Mot de passe modifié avec succès"}
+
+
+@router.get("/limitation")
+async def etat_limitation_connexion(
+    utilisateur_courant: TokenData = Depends(exiger_role("admin"))
+):
+    """
+    État du limiteur de connexion : limites, compteurs et clés bloquées
+    Rôle requis : admin
+    """
+    return limiteur_connexion.etat()
@@ -4,14 +4,18 @@ CRUD complet avec vérification des permissions
 """
 from datetime import datetime
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlmodel import Session, select
 
 from app.database import obtenir_session
-from app.modeles.utilisateur import Utilisateur
 from app.modeles.canal import Canal
 from app.schemas.canal import CanalCreer, CanalLire, CanalModifier
+from app.schemas.auth import TokenData
 from app.services.auth import obtenir_utilisateur_courant
+from app.services.historique import cache_historique
+from app.services.rbac import filtre_canaux_accessibles, verifier_acces_canal
+from app.services.versions import registre_versions
+from app.utils.etag import etag_tables, reponse_conditionnelle
 from app.utils.permissions import exiger_permission
 
 router = APIRouter(prefix="/canaux", tags=["Canaux"])
@@ -21,7 +25,7 @@ router = APIRouter(prefix="/canaux", tags=["Canaux"])
 async def creer_canal(
     canal_data: CanalCreer,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("creer_canaux"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("creer_canaux"))
 ):
     """
     Créer un nouveau canal
@@ -42,6 +46,7 @@ async def creer_canal(
     )
     
     session.add(nouveau_canal)
+    registre_versions.incrementer(session, "canaux")
     session.commit()
     session.refresh(nouveau_canal)
     
@@ -50,16 +55,30 @@ async def creer_canal(
 
 @router.get("/", response_model=List[CanalLire])
 async def lire_canaux(
+    request: Request,
+    response: Response,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("lire_canaux")),
+    utilisateur_courant: TokenData = Depends(exiger_permission("lire_canaux")),
     skip: int = 0,
     limit: int = 100
 ):
     """
-    Récupérer la liste de tous les canaux
+    Récupérer la liste des canaux accessibles au rôle de l'utilisateur
     Permission requise : lire_canaux
     """
-    statement = select(Canal).where(Canal.est_actif == True).offset(skip).limit(limit)
+    # La liste dépend du rang du rôle : l'ETag porte aussi la version des rôles et le rôle du token
+    etag = etag_tables("canaux", "roles", role_id=utilisateur_courant.role_id)
+    non_modifiee = reponse_conditionnelle(request, response, etag)
+    if non_modifiee is not None:
+        return non_modifiee
+    
+    statement = (
+        select(Canal)
+        .where(Canal.est_actif == True)
+        .where(filtre_canaux_accessibles(session, utilisateur_courant))
+        .offset(skip)
+        .limit(limit)
+    )
     canaux = session.exec(statement).all()
     return canaux
 
@@ -67,19 +86,28 @@ async def lire_canaux(
 @router.get("/{canal_id}", response_model=CanalLire)
 async def lire_canal(
     canal_id: int,
+    request: Request,
+    response: Response,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("lire_canaux"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("lire_canaux"))
 ):
     """
     Récupérer un canal par son ID
     Permission requise : lire_canaux
     """
+    # Existence et accès vérifiés avant tout 304 : l'ETag ne doit rien révéler d'un canal inaccessible
     canal = session.get(Canal, canal_id)
     if not canal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Canal introuvable"
         )
+    verifier_acces_canal(session, utilisateur_courant, canal)
+    
+    etag = etag_tables("canaux", "roles", role_id=utilisateur_courant.role_id, ressource_id=canal_id)
+    non_modifiee = reponse_conditionnelle(request, response, etag)
+    if non_modifiee is not None:
+        return non_modifiee
     return canal
 
 
@@ -88,7 +116,7 @@ async def modifier_canal(
     canal_id: int,
     canal_data: CanalModifier,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("modifier_canaux"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("modifier_canaux"))
 ):
     """
     Modifier un canal existant
@@ -108,8 +136,11 @@ async def modifier_canal(
     canal.date_modification = datetime.utcnow()
     
     session.add(canal)
+    registre_versions.incrementer(session, "canaux")
     session.commit()
     session.refresh(canal)
+    # Copie du canal (contrôle d'accès) gardée par l'historique en cache
+    cache_historique.invalider(canal_id)
     
     return canal
 
@@ -118,7 +149,7 @@ async def modifier_canal(
 async def supprimer_canal(
     canal_id: int,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("supprimer_canaux"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("supprimer_canaux"))
 ):
     """
     Supprimer un canal
@@ -132,6 +163,8 @@ async def supprimer_canal(
         )
     
     session.delete(canal)
+    registre_versions.incrementer(session, "canaux")
     session.commit()
+    cache_historique.invalider(canal_id)
     
     return {"message": "Canal supprimé avec succès"}
@@ -5,24 +5,31 @@ CRUD et récupération de l'historique
 from datetime import datetime
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from sqlmodel import Session
 
 from app.database import obtenir_session
-from app.modeles.utilisateur import Utilisateur
 from app.modeles.message import Message
 from app.modeles.canal import Canal
 from app.schemas.message import MessageCreer, MessageLire, MessageModifier, MessageAvecAuteur
+from app.schemas.auth import TokenData
 from app.services.auth import obtenir_utilisateur_courant
+from app.services.rbac import verifier_acces_canal
+from app.services.historique import cache_historique, lire_historique, reponse_historique
 from app.utils.permissions import exiger_permission
+from app.config import parametres
+from app.metriques import messages_persistes
+from app.tracage import span
 
 router = APIRouter(prefix="/messages", tags=["Messages"])
 
+messages_persistes_rest = messages_persistes.enfant("rest")
+
 
 @router.post("/", response_model=MessageLire, status_code=status.HTTP_201_CREATED)
 async def creer_message(
     message_data: MessageCreer,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("envoyer_messages"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("envoyer_messages"))
 ):
     """
     Créer un nouveau message dans un canal
@@ -35,6 +42,7 @@ async def creer_message(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Canal introuvable"
         )
+    verifier_acces_canal(session, utilisateur_courant, canal)
     
     nouveau_message = Message(
         **message_data.model_dump(),
@@ -42,8 +50,13 @@ async def creer_message(
     )
     
     session.add(nouveau_message)
-    session.commit()
+    with span("db.commit"):
+        session.commit()
     session.refresh(nouveau_message)
+    messages_persistes_rest.inc()
+    
+    # Historique récent du canal en cache : le message y est ajouté avec le profil de l'auteur
+    cache_historique.ajouter_si_present(session, message_data.canal_id, nouveau_message, utilisateur_courant.id)
     
     return nouveau_message
 
@@ -52,7 +65,7 @@ async def creer_message(
 async def lire_messages_canal(
     canal_id: int,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("lire_messages")),
+    utilisateur_courant: TokenData = Depends(exiger_permission("lire_messages")),
     skip: int = 0,
     limit: int = 100
 ):
@@ -60,6 +73,19 @@ async def lire_messages_canal(
     Récupérer les messages d'un canal
     Permission requise : lire_messages
     """
+    # Pages récentes : servies depuis le cache de l'historique, déjà sérialisées
+    if skip + limit <= parametres.HISTORIQUE_CACHE_MESSAGES:
+        entree = cache_historique.entree_canal(session, canal_id)
+        if entree is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Canal introuvable"
+            )
+        verifier_acces_canal(session, utilisateur_courant, entree.canal)
+        page = cache_historique.page(entree, skip, limit)
+        if page is not None:
+            return page
+    
     # Vérifier que le canal existe
     canal = session.get(Canal, canal_id)
     if not canal:
@@ -67,38 +93,17 @@ async def lire_messages_canal(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Canal introuvable"
         )
+    verifier_acces_canal(session, utilisateur_courant, canal)
     
-    statement = (
-        select(Message, Utilisateur)
-        .join(Utilisateur, Message.auteur_id == Utilisateur.id)
-        .where(Message.canal_id == canal_id)
-        .where(Message.est_supprime == False)
-        .order_by(Message.date_creation.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    
-    resultats = session.exec(statement).all()
-    
-    messages_avec_auteur = []
-    for message, auteur in resultats:
-        messages_avec_auteur.append(
-            MessageAvecAuteur(
-                **message.model_dump(),
-                auteur_nom_utilisateur=auteur.nom_utilisateur,
-                auteur_prenom=auteur.prenom,
-                auteur_nom=auteur.nom
-            )
-        )
-    
-    return messages_avec_auteur
+    # Colonnes projetées et sérialisation directe : ni objets ORM ni revalidation Pydantic
+    return reponse_historique(lire_historique(session, canal_id, skip, limit))
 
 
 @router.get("/{message_id}", response_model=MessageLire)
 async def lire_message(
     message_id: int,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("lire_messages"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("lire_messages"))
 ):
     """
     Récupérer un message par son ID
@@ -110,6 +115,7 @@ async def lire_message(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Message introuvable"
         )
+    verifier_acces_canal(session, utilisateur_courant, session.get(Canal, message.canal_id))
     return message
 
 
@@ -118,7 +124,7 @@ async def modifier_message(
     message_id: int,
     message_data: MessageModifier,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("modifier_messages"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("modifier_messages"))
 ):
     """
     Modifier un message existant
@@ -148,6 +154,7 @@ async def modifier_message(
     session.add(message)
     session.commit()
     session.refresh(message)
+    cache_historique.invalider(message.canal_id)
     
     return message
 
@@ -156,7 +163,7 @@ async def modifier_message(
 async def supprimer_message(
     message_id: int,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("supprimer_messages"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("supprimer_messages"))
 ):
     """
     Supprimer un message (soft delete)
@@ -175,5 +182,6 @@ async def supprimer_message(
     
     session.add(message)
     session.commit()
+    cache_historique.invalider(message.canal_id)
     
     return {"message": "Message supprimé avec succès"}
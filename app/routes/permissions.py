@@ -4,15 +4,17 @@ CRUD et association avec les rôles
 """
 from datetime import datetime
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlmodel import Session, select, delete
 
 from app.database import obtenir_session
-from app.modeles.utilisateur import Utilisateur
 from app.modeles.permission import Permission
 from app.modeles.role_permission import RolePermission
 from app.schemas.permission import PermissionCreer, PermissionLire, PermissionModifier
 from app.schemas.role_permission import AttribuerPermissions
+from app.schemas.auth import TokenData
+from app.services.versions import registre_versions
+from app.utils.etag import etag_tables, reponse_conditionnelle
 from app.utils.permissions import exiger_permission
 
 router = APIRouter(prefix="/permissions", tags=["Permissions"])
@@ -22,7 +24,7 @@ router = APIRouter(prefix="/permissions", tags=["Permissions"])
 async def creer_permission(
     permission_data: PermissionCreer,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("gerer_permissions"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("gerer_permissions"))
 ):
     """
     Créer une nouvelle permission
@@ -39,6 +41,7 @@ async def creer_permission(
     
     nouvelle_permission = Permission(**permission_data.model_dump())
     session.add(nouvelle_permission)
+    registre_versions.incrementer(session, "permissions")
     session.commit()
     session.refresh(nouvelle_permission)
     
@@ -47,8 +50,10 @@ async def creer_permission(
 
 @router.get("/", response_model=List[PermissionLire])
 async def lire_permissions(
+    request: Request,
+    response: Response,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("lire_permissions")),
+    utilisateur_courant: TokenData = Depends(exiger_permission("lire_permissions")),
     skip: int = 0,
     limit: int = 100
 ):
@@ -56,6 +61,10 @@ async def lire_permissions(
     Récupérer la liste de toutes les permissions
     Permission requise : lire_permissions
     """
+    non_modifiee = reponse_conditionnelle(request, response, etag_tables("permissions"))
+    if non_modifiee is not None:
+        return non_modifiee
+    
     statement = select(Permission).offset(skip).limit(limit)
     permissions = session.exec(statement).all()
     return permissions
@@ -65,7 +74,7 @@ async def lire_permissions(
 async def lire_permission(
     permission_id: int,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("lire_permissions"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("lire_permissions"))
 ):
     """
     Récupérer une permission par son ID
@@ -85,7 +94,7 @@ async def modifier_permission(
     permission_id: int,
     permission_data: PermissionModifier,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("gerer_permissions"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("gerer_permissions"))
 ):
     """
     Modifier une permission existante
@@ -105,6 +114,7 @@ async def modifier_permission(
     permission.date_modification = datetime.utcnow()
     
     session.add(permission)
+    registre_versions.incrementer(session, "permissions")
     session.commit()
     session.refresh(permission)
     
@@ -115,7 +125,7 @@ async def modifier_permission(
 async def supprimer_permission(
     permission_id: int,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("gerer_permissions"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("gerer_permissions"))
 ):
     """
     Supprimer une permission
@@ -128,13 +138,11 @@ async def supprimer_permission(
             detail="Permission introuvable"
         )
     
-    # Supprimer d'abord toutes les associations RolePermission
-    statement = select(RolePermission).where(RolePermission.permission_id == permission_id)
-    associations = session.exec(statement).all()
-    for association in associations:
-        session.delete(association)
+    # Supprimer d'abord toutes les associations RolePermission (une seule requête)
+    session.exec(delete(RolePermission).where(RolePermission.permission_id == permission_id))
     
     session.delete(permission)
+    registre_versions.incrementer(session, "permissions", "roles_permissions")
     session.commit()
     
     return {"message": "Permission supprimée avec succès"}
@@ -144,17 +152,14 @@ async def supprimer_permission(
 async def attribuer_permissions_a_role(
     donnees: AttribuerPermissions,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("gerer_permissions"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("gerer_permissions"))
 ):
     """
     Attribuer plusieurs permissions à un rôle
     Permission requise : gerer_permissions
     """
-    # Supprimer les anciennes associations
-    statement = select(RolePermission).where(RolePermission.role_id == donnees.role_id)
-    anciennes_associations = session.exec(statement).all()
-    for association in anciennes_associations:
-        session.delete(association)
+    # Supprimer les anciennes associations (une seule requête)
+    session.exec(delete(RolePermission).where(RolePermission.role_id == donnees.role_id))
     
     # Créer les nouvelles associations
     for permission_id in donnees.permissions_ids:
@@ -164,6 +169,7 @@ async def attribuer_permissions_a_role(
         )
         session.add(nouvelle_association)
     
+    registre_versions.incrementer(session, "roles_permissions")
     session.commit()
     
     return {"message": f"{len(donnees.permissions_ids)} permission(s) attribuée(s) avec succès"}
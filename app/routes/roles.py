@@ -4,13 +4,16 @@ CRUD complet avec vérification des permissions
 """
 from datetime import datetime
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlmodel import Session, select
 
 from app.database import obtenir_session
 from app.modeles.utilisateur import Utilisateur
 from app.modeles.role import Role
 from app.schemas.role import RoleCreer, RoleLire, RoleModifier
+from app.schemas.auth import TokenData
+from app.services.versions import registre_versions
+from app.utils.etag import etag_tables, reponse_conditionnelle
 from app.utils.permissions import exiger_permission
 
 router = APIRouter(prefix="/roles", tags=["Rôles"])
@@ -20,7 +23,7 @@ router = APIRouter(prefix="/roles", tags=["Rôles"])
 async def creer_role(
     role_data: RoleCreer,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("gerer_roles"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("gerer_roles"))
 ):
     """
     Créer un nouveau rôle
@@ -37,6 +40,7 @@ async def creer_role(
     
     nouveau_role = Role(**role_data.model_dump())
     session.add(nouveau_role)
+    registre_versions.incrementer(session, "roles")
     session.commit()
     session.refresh(nouveau_role)
     
@@ -45,8 +49,10 @@ async def creer_role(
 
 @router.get("/", response_model=List[RoleLire])
 async def lire_roles(
+    request: Request,
+    response: Response,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("lire_roles")),
+    utilisateur_courant: TokenData = Depends(exiger_permission("lire_roles")),
     skip: int = 0,
     limit: int = 100
 ):
@@ -54,6 +60,10 @@ async def lire_roles(
     Récupérer la liste de tous les rôles
     Permission requise : lire_roles
     """
+    non_modifiee = reponse_conditionnelle(request, response, etag_tables("roles"))
+    if non_modifiee is not None:
+        return non_modifiee
+    
     statement = select(Role).offset(skip).limit(limit)
     roles = session.exec(statement).all()
     return roles
@@ -63,7 +73,7 @@ async def lire_roles(
 async def lire_role(
     role_id: int,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("lire_roles"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("lire_roles"))
 ):
     """
     Récupérer un rôle par son ID
@@ -83,7 +93,7 @@ async def modifier_role(
     role_id: int,
     role_data: RoleModifier,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("gerer_roles"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("gerer_roles"))
 ):
     """
     Modifier un rôle existant
@@ -103,6 +113,7 @@ async def modifier_role(
     role.date_modification = datetime.utcnow()
     
     session.add(role)
+    registre_versions.incrementer(session, "roles")
     session.commit()
     session.refresh(role)
     
@@ -113,7 +124,7 @@ async def modifier_role(
 async def supprimer_role(
     role_id: int,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("gerer_roles"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("gerer_roles"))
 ):
     """
     Supprimer un rôle
@@ -136,6 +147,7 @@ async def supprimer_role(
         )
     
     session.delete(role)
+    registre_versions.incrementer(session, "roles")
     session.commit()
     
     return {"message": "Rôle supprimé avec succès"}
@@ -5,18 +5,25 @@ CRUD complet avec vérification des permissions
 from datetime import datetime
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from sqlmodel import Session, select, delete
+from starlette.concurrency import run_in_threadpool
 
 from app.database import obtenir_session
 from app.modeles.utilisateur import Utilisateur
+from app.modeles.token_rafraichissement import TokenRafraichissement
 from app.schemas.utilisateur import (
     UtilisateurCreer,
     UtilisateurLire,
     UtilisateurModifier,
     UtilisateurAvecRole
 )
+from app.schemas.auth import TokenData
 from app.services.auth import obtenir_utilisateur_courant
 from app.services.securite import hacher_mot_de_passe
+from app.services.rafraichissement import revoquer_tokens_utilisateur
+from app.services.revocation import revoquer_acces_utilisateur
+from app.services.historique import cache_historique
+from app.services.profils import cache_profils
 from app.utils.permissions import exiger_permission
 
 router = APIRouter(prefix="/utilisateurs", tags=["Utilisateurs"])
@@ -26,7 +33,7 @@ router = APIRouter(prefix="/utilisateurs", tags=["Utilisateurs"])
 async def creer_utilisateur(
     utilisateur_data: UtilisateurCreer,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("creer_utilisateurs"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("creer_utilisateurs"))
 ):
     """
     Créer un nouvel utilisateur
@@ -50,8 +57,8 @@ async def creer_utilisateur(
             detail="Cet email existe déjà"
         )
     
-    # Créer l'utilisateur
-    mot_de_passe_hash = hacher_mot_de_passe(utilisateur_data.mot_de_passe)
+    # Créer l'utilisateur (hachage bcrypt hors de la boucle d'événements)
+    mot_de_passe_hash = await run_in_threadpool(hacher_mot_de_passe, utilisateur_data.mot_de_passe)
     nouvel_utilisateur = Utilisateur(
         nom_utilisateur=utilisateur_data.nom_utilisateur,
         email=utilisateur_data.email,
@@ -71,7 +78,7 @@ async def creer_utilisateur(
 @router.get("/", response_model=List[UtilisateurLire])
 async def lire_utilisateurs(
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("lire_utilisateurs")),
+    utilisateur_courant: TokenData = Depends(exiger_permission("lire_utilisateurs")),
     skip: int = 0,
     limit: int = 100
 ):
@@ -88,7 +95,7 @@ async def lire_utilisateurs(
 async def lire_utilisateur(
     utilisateur_id: int,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("lire_utilisateurs"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("lire_utilisateurs"))
 ):
     """
     Récupérer un utilisateur par son ID
@@ -108,7 +115,7 @@ async def modifier_utilisateur(
     utilisateur_id: int,
     utilisateur_data: UtilisateurModifier,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("modifier_utilisateurs"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("modifier_utilisateurs"))
 ):
     """
     Modifier un utilisateur existant
@@ -128,10 +135,24 @@ async def modifier_utilisateur(
     
     utilisateur.date_modification = datetime.utcnow()
     
+    # Un compte désactivé perd toutes ses sessions
+    if donnees.get("est_actif") is False:
+        revoquer_tokens_utilisateur(session, utilisateur.id)
+        revoquer_acces_utilisateur(session, utilisateur.id)
+    
+    # Le rôle est embarqué dans le token d'accès : forcer un rafraîchissement
+    elif "role_id" in donnees:
+        revoquer_acces_utilisateur(session, utilisateur.id)
+    
     session.add(utilisateur)
     session.commit()
     session.refresh(utilisateur)
     
+    # Le profil de l'auteur est inclus dans l'historique en cache
+    if donnees.keys() & {"nom_utilisateur", "prenom", "nom"}:
+        cache_profils.invalider(utilisateur.id)
+        cache_historique.vider()
+    
     return utilisateur
 
 
@@ -139,7 +160,7 @@ async def modifier_utilisateur(
 async def supprimer_utilisateur(
     utilisateur_id: int,
     session: Session = Depends(obtenir_session),
-    utilisateur_courant: Utilisateur = Depends(exiger_permission("supprimer_utilisateurs"))
+    utilisateur_courant: TokenData = Depends(exiger_permission("supprimer_utilisateurs"))
 ):
     """
     Supprimer un utilisateur
@@ -159,7 +180,13 @@ async def supprimer_utilisateur(
             detail="Vous ne pouvez pas supprimer votre propre compte"
         )
     
+    # Supprimer ses refresh tokens (clé étrangère vers utilisateurs) et révoquer ses tokens d'accès
+    session.exec(delete(TokenRafraichissement).where(TokenRafraichissement.utilisateur_id == utilisateur_id))
+    revoquer_acces_utilisateur(session, utilisateur_id)
+    
     session.delete(utilisateur)
     session.commit()
+    cache_profils.invalider(utilisateur_id)
+    cache_historique.vider()
     
     return {"message": "Utilisateur supprimé avec succès"}
@@ -2,44 +2,65 @@
 Routes WebSocket pour le chat en temps réel
 Gestion des connexions et diffusion des messages
 """
+import logging
 from datetime import datetime
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query, status
-from sqlmodel import Session, select
-from jose import jwt, JWTError
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query, status
+from sqlmodel import Session
 
 from app.database import obtenir_session
 from app.modeles.utilisateur import Utilisateur
 from app.modeles.canal import Canal
 from app.modeles.message import Message
 from app.services.websocket import gestionnaire
-from app.services.rbac import utilisateur_a_permission
-from app.config import parametres
+from app.services.historique import cache_historique
+from app.services.limitation import limiteur_envoi
+from app.metriques import messages_persistes
+from app.requetes_sql import mesurer_requetes_sql
+from app.surveillance_boucle import etiqueter_tache_courante
+from app.tracage import demarrer_trace, span
+from app.services.auth import decoder_token
+from app.services.rbac import utilisateur_a_permission, canal_accessible
+from app.services.revocation import registre_revocations
+from app.services.versions import registre_versions
+from app.schemas.auth import TokenData
+from app.utils.permissions import exiger_role
 
 router = APIRouter(prefix="/ws", tags=["WebSocket Chat"])
 
+messages_persistes_ws = messages_persistes.enfant("websocket")
+
+logger = logging.getLogger("app.websocket")
+
 
 async def obtenir_utilisateur_depuis_token(token: str, session: Session) -> Utilisateur:
   
     try:
-        payload = jwt.decode(token, parametres.SECRET_KEY, algorithms=[parametres.ALGORITHM])
-        nom_utilisateur: str = payload.get("sub")
-        
-        if nom_utilisateur is None:
-            raise Exception("Token invalide")
-        
-        statement = select(Utilisateur).where(Utilisateur.nom_utilisateur == nom_utilisateur)
-        utilisateur = session.exec(statement).first()
-        
-        if utilisateur is None:
-            raise Exception("Utilisateur introuvable")
-        
-        if not utilisateur.est_actif:
-            raise Exception("Utilisateur inactif")
-        
-        return utilisateur
-        
-    except JWTError:
+        # Signature, expiration et registre des révocations
+        token_data = decoder_token(token)
+    except HTTPException:
         raise Exception("Token invalide")
+    
+    # Une seule lecture par connexion (profil diffusé avec chaque message)
+    utilisateur = session.get(Utilisateur, token_data.user_id)
+    
+    if utilisateur is None:
+        raise Exception("Utilisateur introuvable")
+    
+    if not utilisateur.est_actif:
+        raise Exception("Utilisateur inactif")
+    
+    return utilisateur
+
+
+def versions_acces(utilisateur_id: int) -> tuple:
+    """
+    Signaux de modification des données du contrôle d'accès, sans requête SQL
+    (un changement de rôle ou une désactivation révoque les tokens de l'utilisateur)
+    """
+    return (
+        registre_revocations.date_revocation_utilisateur(utilisateur_id),
+        registre_versions.version_table("canaux")
+    )
 
 
 @router.websocket("/chat/{canal_id}")
@@ -51,6 +72,13 @@ async def websocket_chat(
 ):
    
     
+    etiqueter_tache_courante(f"WS /ws/chat/{canal_id}")
+    
+    # Worker en cours d'arrêt : le client doit se connecter à un autre worker
+    if gestionnaire.en_arret:
+        await websocket.close(code=status.WS_1001_GOING_AWAY)
+        return
+    
     try:
         # Authentifier l'utilisateur via le token
         utilisateur = await obtenir_utilisateur_depuis_token(token, session)
@@ -60,12 +88,15 @@ async def websocket_chat(
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
         
-        # Vérifier que le canal existe
+        # Vérifier que le canal existe et que le rôle de l'utilisateur y donne accès
         canal = session.get(Canal, canal_id)
-        if not canal:
+        if not canal or not canal_accessible(session, utilisateur, canal):
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
         
+        # Utilisateur et canal sont relus à chaque trame suivant un changement de ces versions
+        versions = versions_acces(utilisateur.id)
+        
         # Connecter l'utilisateur au canal
         await gestionnaire.connecter(
             websocket, 
@@ -102,61 +133,119 @@ async def websocket_chat(
         
         # Boucle de réception des messages
         while True:
+            # Rendre la connexion au pool pendant l'attente : une socket inactive ne doit pas
+            # immobiliser une connexion (les objets chargés restent lisibles une fois détachés)
+            session.close()
+            
             # Recevoir un message du client
             data = await websocket.receive_json()
             
-            # Vérifier que l'utilisateur a la permission d'envoyer des messages
-            if not utilisateur_a_permission(session, utilisateur, "envoyer_messages"):
-                await gestionnaire.envoyer_message_personnel(
-                    websocket,
-                    {
-                        "type": "erreur",
-                        "message": "Permission refusée pour envoyer des messages"
-                    }
+            # Compter les requêtes SQL de cette trame (détection des N+1) et la tracer si échantillonnée
+            with gestionnaire.traitement(), mesurer_requetes_sql(f"WS /ws/chat/{canal_id}"), \
+                    demarrer_trace("WS /ws/chat/{canal_id}", canal_id=canal_id, utilisateur_id=utilisateur.id):
+                # Limitation de débit avant tout accès à la base ou diffusion
+                depassement = limiteur_envoi.consommer(utilisateur.id, canal_id)
+                if depassement is not None:
+                    portee, attente = depassement
+                    await gestionnaire.envoyer_message_personnel(
+                        websocket,
+                        {
+                            "type": "erreur",
+                            "message": "Trop de messages envoyés, ralentissez",
+                            "portee": portee,
+                            "retry_after": round(attente, 2)
+                        }
+                    )
+                
+                    # Un canal saturé n'est pas la faute de ce client : on ignore seulement le message
+                    if portee == "canal":
+                        continue
+                
+                    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                    raise WebSocketDisconnect(code=status.WS_1013_TRY_AGAIN_LATER)
+                
+                # Rôle de l'utilisateur ou canal modifiés depuis la connexion : relire les deux
+                versions_actuelles = versions_acces(utilisateur.id)
+                if versions_actuelles != versions:
+                    versions = versions_actuelles
+                    utilisateur_actuel = session.get(Utilisateur, utilisateur.id)
+                    canal = session.get(Canal, canal_id)
+                    if utilisateur_actuel is None or not utilisateur_actuel.est_actif or canal is None:
+                        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                        raise WebSocketDisconnect(code=status.WS_1008_POLICY_VIOLATION)
+                    utilisateur = utilisateur_actuel
+                
+                # Vérifier que l'utilisateur a la permission d'envoyer des messages
+                if not utilisateur_a_permission(session, utilisateur, "envoyer_messages"):
+                    await gestionnaire.envoyer_message_personnel(
+                        websocket,
+                        {
+                            "type": "erreur",
+                            "message": "Permission refusée pour envoyer des messages"
+                        }
+                    )
+                    continue
+                
+                # Revérifier l'accès au canal (rang des rôles mis en cache, comparaison d'entiers)
+                if not canal_accessible(session, utilisateur, canal):
+                    await gestionnaire.envoyer_message_personnel(
+                        websocket,
+                        {
+                            "type": "erreur",
+                            "message": "Accès refusé à ce canal"
+                        }
+                    )
+                    await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                    raise WebSocketDisconnect(code=status.WS_1008_POLICY_VIOLATION)
+                
+                # Extraire le contenu du message
+                contenu = data.get("contenu", "")
+                if not contenu or not contenu.strip():
+                    continue
+                
+                # Sauvegarder le message dans la base de données
+                nouveau_message = Message(
+                    contenu=contenu.strip(),
+                    auteur_id=utilisateur.id,
+                    canal_id=canal_id,
+                    type_message=data.get("type_message", "texte"),
+                    url_fichier=data.get("url_fichier")
                 )
-                continue
-            
-            # Extraire le contenu du message
-            contenu = data.get("contenu", "")
-            if not contenu or not contenu.strip():
-                continue
-            
-            # Sauvegarder le message dans la base de données
-            nouveau_message = Message(
-                contenu=contenu.strip(),
-                auteur_id=utilisateur.id,
-                canal_id=canal_id,
-                type_message=data.get("type_message", "texte"),
-                url_fichier=data.get("url_fichier")
-            )
-            
-            session.add(nouveau_message)
-            session.commit()
-            session.refresh(nouveau_message)
-            
-            # Diffuser le message à tous les utilisateurs du canal
-            await gestionnaire.diffuser_message(
-                {
-                    "type": "message",
-                    "id": nouveau_message.id,
-                    "contenu": nouveau_message.contenu,
-                    "canal_id": canal_id,
-                    "auteur": {
-                        "id": utilisateur.id,
-                        "nom_utilisateur": utilisateur.nom_utilisateur,
-                        "prenom": utilisateur.prenom,
-                        "nom": utilisateur.nom
+                
+                session.add(nouveau_message)
+                with span("db.commit"):
+                    session.commit()
+                session.refresh(nouveau_message)
+                messages_persistes_ws.inc()
+                cache_historique.ajouter(canal_id, nouveau_message, utilisateur)
+                
+                # Diffuser le message à tous les utilisateurs du canal
+                await gestionnaire.diffuser_message(
+                    {
+                        "type": "message",
+                        "id": nouveau_message.id,
+                        "contenu": nouveau_message.contenu,
+                        "canal_id": canal_id,
+                        "auteur": {
+                            "id": utilisateur.id,
+                            "nom_utilisateur": utilisateur.nom_utilisateur,
+                            "prenom": utilisateur.prenom,
+                            "nom": utilisateur.nom
+                        },
+                        "date_creation": nouveau_message.date_creation.isoformat(),
+                        "est_modifie": nouveau_message.est_modifie
                     },
-                    "date_creation": nouveau_message.date_creation.isoformat(),
-                    "est_modifie": nouveau_message.est_modifie
-                },
-                canal_id
-            )
+                    canal_id
+                )
     
     except WebSocketDisconnect:
         # L'utilisateur s'est déconnecté
         gestionnaire.deconnecter(websocket, canal_id)
         
+        # Fermeture par le vidage de l'arrêt : tout le canal part, inutile de notifier
+        if gestionnaire.en_arret:
+            return
+        
         # Notifier les autres utilisateurs
         await gestionnaire.diffuser_message(
             {
@@ -168,8 +257,8 @@ async def websocket_chat(
             canal_id
         )
     
-    except Exception as e:
-        print(f"Erreur WebSocket: {e}")
+    except Exception:
+        logger.exception("Erreur WebSocket", extra={"canal_id": canal_id})
         try:
             await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
         except:
@@ -187,3 +276,14 @@ async def obtenir_utilisateurs_connectes(
         "nombre_utilisateurs": len(utilisateurs),
         "utilisateurs": utilisateurs
     }
+
+
+@router.get("/limitation")
+async def etat_limitation_envoi(
+    utilisateur_courant: TokenData = Depends(exiger_role("admin"))
+):
+    """
+    Compteurs de limitation des envois WebSocket
+    Rôle requis : admin
+    """
+    return limiteur_envoi.etat()
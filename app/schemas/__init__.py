@@ -45,6 +45,7 @@ from app.schemas.message import (
 from app.schemas.auth import (
     LoginForm,
     Token,
+    RafraichirToken,
     TokenData,
     ChangerMotDePasse
 )
@@ -87,6 +88,7 @@ __all__ = [
     # Auth
     "LoginForm",
     "Token",
+    "RafraichirToken",
     "TokenData",
     "ChangerMotDePasse"
 ]
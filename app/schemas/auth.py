@@ -16,12 +16,26 @@ class Token(BaseModel):
     """Schéma pour le token JWT"""
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+
+class RafraichirToken(BaseModel):
+    """Schéma pour échanger un refresh token contre un nouveau token d'accès"""
+    refresh_token: str
 
 
 class TokenData(BaseModel):
     """Schéma pour les données contenues dans le token"""
     nom_utilisateur: Optional[str] = None
     user_id: Optional[int] = None
+    role_id: Optional[int] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
+
+    @property
+    def id(self) -> Optional[int]:
+        """Alias de user_id, pour s'utiliser comme un Utilisateur dans les routes et le RBAC"""
+        return self.user_id
 
 
 class ChangerMotDePasse(BaseModel):
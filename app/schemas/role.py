@@ -11,6 +11,7 @@ class RoleBase(BaseModel):
     """Schéma de base pour Role"""
     nom: str = Field(min_length=2, max_length=50)
     description: Optional[str] = None
+    rang: int = 0
 
 
 class RoleCreer(RoleBase):
@@ -22,6 +23,7 @@ class RoleModifier(BaseModel):
     """Schéma pour modifier un rôle"""
     nom: Optional[str] = Field(None, min_length=2, max_length=50)
     description: Optional[str] = None
+    rang: Optional[int] = None
     est_actif: Optional[bool] = None
 
 
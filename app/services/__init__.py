@@ -2,41 +2,108 @@
 Package des services
 Logique métier de l'application
 """
-from app.services.securite import hacher_mot_de_passe, verifier_mot_de_passe
+from app.services.securite import (
+    hacher_mot_de_passe,
+    verifier_mot_de_passe,
+    verifier_mot_de_passe_factice
+)
 from app.services.auth import (
     creer_token_acces,
     decoder_token,
     authentifier_utilisateur,
+    obtenir_identite_courante,
     obtenir_utilisateur_courant,
     obtenir_utilisateur_courant_actif,
     oauth2_scheme
 )
+from app.services.rafraichissement import (
+    creer_token_rafraichissement,
+    rafraichir_tokens,
+    revoquer_famille,
+    revoquer_tokens_utilisateur
+)
+from app.services.revocation import (
+    registre_revocations,
+    revoquer_token_acces,
+    revoquer_acces_utilisateur
+)
+from app.services.limitation import (
+    BackendLimiteur,
+    BackendMemoire,
+    LimiteurConnexion,
+    LimiteurEnvoi,
+    SeauJetons,
+    limiteur_connexion,
+    limiteur_envoi
+)
+from app.services.versions import registre_versions
 from app.services.rbac import (
     obtenir_permissions_utilisateur,
+    cache_permissions_roles,
     utilisateur_a_permission,
     verifier_permission,
     utilisateur_a_role,
-    verifier_role
+    verifier_role,
+    index_rangs_roles,
+    canal_accessible,
+    verifier_acces_canal,
+    filtre_canaux_accessibles
 )
 from app.services.websocket import gestionnaire
+from app.services.profils import ProfilUtilisateur, cache_profils
+from app.services.historique import cache_historique
+from app.services.sante import VerificateurSante, verificateur_sante
 
 __all__ = [
     # Sécurité
     "hacher_mot_de_passe",
     "verifier_mot_de_passe",
+    "verifier_mot_de_passe_factice",
     # Authentification
     "creer_token_acces",
     "decoder_token",
     "authentifier_utilisateur",
+    "obtenir_identite_courante",
     "obtenir_utilisateur_courant",
     "obtenir_utilisateur_courant_actif",
     "oauth2_scheme",
+    # Refresh tokens
+    "creer_token_rafraichissement",
+    "rafraichir_tokens",
+    "revoquer_famille",
+    "revoquer_tokens_utilisateur",
+    # Révocations
+    "registre_revocations",
+    "revoquer_token_acces",
+    "revoquer_acces_utilisateur",
+    # Limitation de débit
+    "BackendLimiteur",
+    "BackendMemoire",
+    "LimiteurConnexion",
+    "LimiteurEnvoi",
+    "SeauJetons",
+    "limiteur_connexion",
+    "limiteur_envoi",
+    # Versions des tables de référence
+    "registre_versions",
     # RBAC
     "obtenir_permissions_utilisateur",
+    "cache_permissions_roles",
     "utilisateur_a_permission",
     "verifier_permission",
     "utilisateur_a_role",
     "verifier_role",
+    "index_rangs_roles",
+    "canal_accessible",
+    "verifier_acces_canal",
+    "filtre_canaux_accessibles",
     # WebSocket
-    "gestionnaire"
+    "gestionnaire",
+    # Profils des auteurs et historique récent des canaux
+    "ProfilUtilisateur",
+    "cache_profils",
+    "cache_historique",
+    # Santé
+    "VerificateurSante",
+    "verificateur_sante"
 ]
@@ -2,6 +2,8 @@
 Service d'authentification JWT
 Gestion des tokens JWT et authentification des utilisateurs
 """
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -13,11 +15,14 @@ from app.config import parametres
 from app.database import obtenir_session
 from app.modeles.utilisateur import Utilisateur
 from app.schemas.auth import TokenData
-from app.services.securite import verifier_mot_de_passe
+from app.services.securite import verifier_mot_de_passe, verifier_mot_de_passe_factice
+from app.services.revocation import registre_revocations
+from app.tracage import span
 
 
 # Schéma OAuth2 pour récupérer le token depuis le header Authorization
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+oauth2_scheme_optionnel = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 
 def creer_token_acces(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -29,7 +34,8 @@ def creer_token_acces(data: dict, expires_delta: Optional[timedelta] = None) ->
     else:
         expire = datetime.utcnow() + timedelta(minutes=parametres.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # jti : identifiant unique pour la révocation, iat : date d'émission précise
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, parametres.SECRET_KEY, algorithm=parametres.ALGORITHM)
     
     return encoded_jwt
@@ -44,18 +50,30 @@ def decoder_token(token: str) -> TokenData:
     )
     
     try:
-        payload = jwt.decode(token, parametres.SECRET_KEY, algorithms=[parametres.ALGORITHM])
+        with span("jwt.decoder"):
+            payload = jwt.decode(token, parametres.SECRET_KEY, algorithms=[parametres.ALGORITHM])
         nom_utilisateur: str = payload.get("sub")
         user_id: int = payload.get("user_id")
         
-        if nom_utilisateur is None:
+        # Les tokens sans role_id/jti (anciens formats) ne sont plus acceptés
+        if nom_utilisateur is None or user_id is None or "role_id" not in payload or "jti" not in payload:
             raise credentials_exception
-            
-        token_data = TokenData(nom_utilisateur=nom_utilisateur, user_id=user_id)
-        return token_data
         
     except JWTError:
         raise credentials_exception
+    
+    # Vérification O(1) contre la copie locale du registre des révocations
+    if registre_revocations.est_revoque(payload["jti"], user_id, payload.get("iat")):
+        raise credentials_exception
+    
+    token_data = TokenData(
+        nom_utilisateur=nom_utilisateur,
+        user_id=user_id,
+        role_id=payload["role_id"],
+        jti=payload["jti"],
+        exp=payload.get("exp")
+    )
+    return token_data
 
 
 def authentifier_utilisateur(
@@ -68,6 +86,8 @@ def authentifier_utilisateur(
     utilisateur = session.exec(statement).first()
     
     if not utilisateur:
+        # Temps constant : on paie le même hachage que pour un utilisateur existant
+        verifier_mot_de_passe_factice(mot_de_passe)
         return None
     
     if not verifier_mot_de_passe(mot_de_passe, utilisateur.mot_de_passe_hash):
@@ -76,6 +96,16 @@ def authentifier_utilisateur(
     return utilisateur
 
 
+async def obtenir_identite_courante(
+    token: str = Depends(oauth2_scheme)
+) -> TokenData:
+    """
+    Identité de l'utilisateur connecté lue depuis le token, sans requête SQL
+    Les désactivations et changements de rôle passent par le registre des révocations
+    """
+    return decoder_token(token)
+
+
 async def obtenir_utilisateur_courant(
     token: str = Depends(oauth2_scheme),
     session: Session = Depends(obtenir_session)
@@ -91,8 +121,7 @@ async def obtenir_utilisateur_courant(
     token_data = decoder_token(token)
     
     # Récupérer l'utilisateur depuis la base de données
-    statement = select(Utilisateur).where(Utilisateur.nom_utilisateur == token_data.nom_utilisateur)
-    utilisateur = session.exec(statement).first()
+    utilisateur = session.get(Utilisateur, token_data.user_id)
     
     if utilisateur is None:
         raise credentials_exception
@@ -0,0 +1,224 @@
+"""
+Historique des canaux
+Lecture par colonnes sans objets ORM, sérialisation JSON directe, cache des derniers messages par canal (LRU par worker)
+"""
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlmodel import Session, select
+
+from app.config import parametres
+from app.metriques import registre, lignes_jauge
+from app.modeles.canal import Canal
+from app.modeles.message import Message
+from app.modeles.utilisateur import Utilisateur
+from app.schemas.message import MessageLire
+from app.services.profils import ProfilUtilisateur, cache_profils
+from app.services.versions import registre_versions
+
+
+# Colonnes lues, dans l'ordre des champs du schéma MessageLire (MessageAvecAuteur y ajoute l'auteur)
+CHAMPS_MESSAGE = tuple(MessageLire.model_fields)
+COLONNES_MESSAGE = tuple(getattr(Message, champ) for champ in CHAMPS_MESSAGE)
+_INDICE_AUTEUR = CHAMPS_MESSAGE.index("auteur_id")
+
+# Données lues en base, donc déjà valides : sérialisées sans passer par les modèles Pydantic
+# (mêmes formats JSON que MessageAvecAuteur, datetimes ISO 8601 compris)
+_serialiseur_message = TypeAdapter(Dict[str, Any])
+_serialiseur_page = TypeAdapter(List[Dict[str, Any]])
+
+historique_cache_requetes = registre.compteur(
+    "historique_cache_requetes_total", "Premières pages d'historique servies depuis le cache ou lues en base",
+    ("resultat",)
+)
+_succes = historique_cache_requetes.enfant("succes")
+_echecs = historique_cache_requetes.enfant("echec")
+
+
+class EntreeHistorique:
+    """Derniers messages d'un canal, du plus récent au plus ancien"""
+
+    __slots__ = ("canal", "version_canaux", "messages", "octets", "complet", "date_chargement")
+
+    def __init__(self, canal: Canal, version_canaux: tuple, messages: List[Tuple[int, bytes]], complet: bool):
+        # Copie détachée du canal (contrôle d'accès sans relecture)
+        self.canal = canal
+        self.version_canaux = version_canaux
+        # (id du message, JSON de MessageAvecAuteur)
+        self.messages: Deque[Tuple[int, bytes]] = deque(messages)
+        self.octets = sum(len(corps) for _, corps in messages)
+        # Vrai si le canal ne contient pas plus de messages que l'entrée
+        self.complet = complet
+        self.date_chargement = time.time()
+
+
+class CacheHistorique:
+
+    def __init__(self):
+        # canal_id -> entrée, du moins au plus récemment utilisé
+        self.entrees: "OrderedDict[int, EntreeHistorique]" = OrderedDict()
+        self.octets = 0
+
+    def _valide(self, entree: EntreeHistorique) -> bool:
+        # Les autres workers écrivent aussi : une entrée n'est gardée que HISTORIQUE_CACHE_SECONDES
+        return (
+            time.time() - entree.date_chargement < parametres.HISTORIQUE_CACHE_SECONDES
+            and entree.version_canaux == registre_versions.version("canaux")
+        )
+
+    def obtenir(self, canal_id: int) -> Optional[EntreeHistorique]:
+
+        entree = self.entrees.get(canal_id)
+        if entree is None:
+            return None
+        if not self._valide(entree):
+            self.invalider(canal_id)
+            return None
+        self.entrees.move_to_end(canal_id)
+        return entree
+
+    def entree_canal(self, session: Session, canal_id: int) -> Optional[EntreeHistorique]:
+        """Entrée du canal, chargée si absente ; None si le canal n'existe pas"""
+        entree = self.obtenir(canal_id)
+        if entree is not None:
+            _succes.inc()
+            return entree
+
+        _echecs.inc()
+        canal = session.get(Canal, canal_id)
+        if canal is None:
+            return None
+        return self.charger(session, canal)
+
+    def charger(self, session: Session, canal: Canal) -> EntreeHistorique:
+        """Lire les derniers messages du canal et les mettre en cache"""
+        version_canaux = registre_versions.version("canaux")
+        taille = parametres.HISTORIQUE_CACHE_MESSAGES
+        messages = [
+            (message["id"], _serialiseur_message.dump_json(message))
+            for message in lire_historique(session, canal.id, 0, taille)
+        ]
+
+        self.invalider(canal.id)
+        entree = EntreeHistorique(
+            Canal(id=canal.id, nom=canal.nom, role_minimum_requis=canal.role_minimum_requis),
+            version_canaux, messages, len(messages) < taille
+        )
+        self.entrees[canal.id] = entree
+        self.octets += entree.octets
+        self._limiter()
+        return entree
+
+    def ajouter(self, canal_id: int, message: Message, auteur: Union[Utilisateur, ProfilUtilisateur]) -> None:
+        """Nouveau message enregistré : ajouté en tête de l'entrée du canal si elle existe"""
+        entree = self.entrees.get(canal_id)
+        if entree is None:
+            return
+
+        corps = serialiser(message, auteur)
+        entree.messages.appendleft((message.id, corps))
+        entree.octets += len(corps)
+        self.octets += len(corps)
+        while len(entree.messages) > parametres.HISTORIQUE_CACHE_MESSAGES:
+            _, ancien = entree.messages.pop()
+            entree.octets -= len(ancien)
+            self.octets -= len(ancien)
+            entree.complet = False
+        self._limiter()
+
+    def ajouter_si_present(self, session: Session, canal_id: int, message: Message, auteur_id: int) -> None:
+        """Comme ajouter, le profil de l'auteur n'étant lu que si l'entrée du canal existe"""
+        if canal_id not in self.entrees:
+            return
+        auteur = cache_profils.obtenir(session, auteur_id)
+        if auteur is not None:
+            self.ajouter(canal_id, message, auteur)
+
+    def invalider(self, canal_id: int) -> None:
+
+        entree = self.entrees.pop(canal_id, None)
+        if entree is not None:
+            self.octets -= entree.octets
+
+    def vider(self) -> None:
+
+        self.entrees.clear()
+        self.octets = 0
+
+    def _limiter(self) -> None:
+        # Éviction des canaux les moins récemment lus au-delà du plafond mémoire
+        while self.octets > parametres.HISTORIQUE_CACHE_OCTETS and self.entrees:
+            _, entree = self.entrees.popitem(last=False)
+            self.octets -= entree.octets
+
+    @staticmethod
+    def page(entree: EntreeHistorique, skip: int, limit: int) -> Optional[Response]:
+        """Réponse JSON de la page si l'entrée la contient entièrement, sinon None"""
+        if skip < 0 or limit < 0:
+            return None
+        if skip + limit > len(entree.messages) and not entree.complet:
+            return None
+        morceaux = [corps for _, corps in islice(entree.messages, skip, skip + limit)]
+        return Response(content=b"[" + b",".join(morceaux) + b"]", media_type="application/json")
+
+
+def _avec_auteur(champs: Dict[str, Any], auteur: Union[Utilisateur, ProfilUtilisateur]) -> Dict[str, Any]:
+
+    champs["auteur_nom_utilisateur"] = auteur.nom_utilisateur
+    champs["auteur_prenom"] = auteur.prenom
+    champs["auteur_nom"] = auteur.nom
+    return champs
+
+
+def lire_historique(session: Session, canal_id: int, skip: int, limit: int) -> List[Dict[str, Any]]:
+    """
+    Messages du canal (du plus récent au plus ancien) au format de MessageAvecAuteur
+    Colonnes des messages seulement, auteurs tirés du cache des profils ; ceux d'auteurs supprimés sont omis
+    """
+    statement = (
+        select(*COLONNES_MESSAGE)
+        .where(Message.canal_id == canal_id)
+        .where(Message.est_supprime == False)
+        .order_by(Message.date_creation.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    lignes = session.exec(statement).all()
+    profils = cache_profils.obtenir_plusieurs(session, (ligne[_INDICE_AUTEUR] for ligne in lignes))
+    return [
+        _avec_auteur(dict(zip(CHAMPS_MESSAGE, ligne)), profils[ligne[_INDICE_AUTEUR]])
+        for ligne in lignes if ligne[_INDICE_AUTEUR] in profils
+    ]
+
+
+def reponse_historique(messages: List[Dict[str, Any]]) -> Response:
+    """Page sérialisée en un seul appel, sans revalidation par response_model"""
+    return Response(content=_serialiseur_page.dump_json(messages), media_type="application/json")
+
+
+def serialiser(message: Message, auteur: Union[Utilisateur, ProfilUtilisateur]) -> bytes:
+    """Message qui vient d'être enregistré (objet ORM) au format JSON de MessageAvecAuteur"""
+    champs = {champ: getattr(message, champ) for champ in CHAMPS_MESSAGE}
+    return _serialiseur_message.dump_json(_avec_auteur(champs, auteur))
+
+
+# Instance globale du cache (une par worker)
+cache_historique = CacheHistorique()
+
+
+def _collecter_historique():
+    yield from lignes_jauge(
+        "historique_cache_canaux", "Canaux dont l'historique récent est en cache",
+        [("", len(cache_historique.entrees))]
+    )
+    yield from lignes_jauge(
+        "historique_cache_octets", "Taille des messages sérialisés en cache",
+        [("", cache_historique.octets)]
+    )
+
+
+registre.ajouter_collecteur(_collecter_historique)
@@ -0,0 +1,286 @@
+"""
+Limitation de débit
+Tentatives de connexion (fenêtre glissante par IP et par nom d'utilisateur)
+et envois WebSocket (seaux à jetons par utilisateur et par canal)
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from app.config import parametres
+from app.metriques import registre, lignes_jauge
+
+
+class BackendLimiteur(ABC):
+    """
+    Stockage des horodatages par clé
+    Implémenter cette interface (Redis, base partagée...) pour partager les compteurs entre workers
+    """
+
+    @abstractmethod
+    def compter(self, cle: str, depuis: float) -> int:
+        ...
+
+    @abstractmethod
+    def plus_ancien(self, cle: str, depuis: float) -> Optional[float]:
+        ...
+
+    @abstractmethod
+    def ajouter(self, cle: str, horodatage: float, depuis: float) -> None:
+        ...
+
+    @abstractmethod
+    def reinitialiser(self, cle: str) -> None:
+        ...
+
+    @abstractmethod
+    def compteurs(self, depuis: float) -> Dict[str, int]:
+        ...
+
+
+class BackendMemoire(BackendLimiteur):
+    """Backend en mémoire, propre à chaque worker"""
+
+    # Nettoyage complet des clés inactives toutes les N insertions
+    PERIODE_NETTOYAGE = 1000
+
+    def __init__(self):
+        self.entrees: Dict[str, Deque[float]] = {}
+        self._verrou = threading.Lock()
+        self._insertions = 0
+
+    def _elaguer(self, cle: str, depuis: float) -> Optional[Deque[float]]:
+        horodatages = self.entrees.get(cle)
+        if horodatages is None:
+            return None
+        while horodatages and horodatages[0] < depuis:
+            horodatages.popleft()
+        if not horodatages:
+            del self.entrees[cle]
+            return None
+        return horodatages
+
+    def compter(self, cle: str, depuis: float) -> int:
+        with self._verrou:
+            horodatages = self._elaguer(cle, depuis)
+            return len(horodatages) if horodatages else 0
+
+    def plus_ancien(self, cle: str, depuis: float) -> Optional[float]:
+        with self._verrou:
+            horodatages = self._elaguer(cle, depuis)
+            return horodatages[0] if horodatages else None
+
+    def ajouter(self, cle: str, horodatage: float, depuis: float) -> None:
+        with self._verrou:
+            self.entrees.setdefault(cle, deque()).append(horodatage)
+            self._insertions += 1
+            if self._insertions % self.PERIODE_NETTOYAGE == 0:
+                for autre_cle in list(self.entrees):
+                    self._elaguer(autre_cle, depuis)
+
+    def reinitialiser(self, cle: str) -> None:
+        with self._verrou:
+            self.entrees.pop(cle, None)
+
+    def compteurs(self, depuis: float) -> Dict[str, int]:
+        with self._verrou:
+            for cle in list(self.entrees):
+                self._elaguer(cle, depuis)
+            return {cle: len(horodatages) for cle, horodatages in self.entrees.items()}
+
+
+class LimiteurConnexion:
+
+    def __init__(self, backend: BackendLimiteur):
+        self.backend = backend
+        self.limite_ip = parametres.LOGIN_MAX_TENTATIVES_IP
+        self.limite_utilisateur = parametres.LOGIN_MAX_ECHECS_UTILISATEUR
+        self.fenetre = parametres.LOGIN_FENETRE_SECONDES
+        # Compteurs cumulés depuis le démarrage du worker
+        self.tentatives = 0
+        self.echecs = 0
+        self.rejets = 0
+
+    def _attente(self, cle: str, limite: int, maintenant: float) -> Optional[float]:
+        depuis = maintenant - self.fenetre
+        if self.backend.compter(cle, depuis) < limite:
+            return None
+        plus_ancien = self.backend.plus_ancien(cle, depuis)
+        return max(1.0, (plus_ancien or maintenant) + self.fenetre - maintenant)
+
+    def verifier(self, ip: str, nom_utilisateur: str) -> Optional[float]:
+        """
+        Retourne le délai d'attente (secondes) si la tentative doit être refusée
+        Sinon comptabilise la tentative pour l'IP et retourne None
+        """
+        maintenant = time.time()
+        attente = (
+            self._attente(f"ip:{ip}", self.limite_ip, maintenant)
+            or self._attente(f"utilisateur:{nom_utilisateur}", self.limite_utilisateur, maintenant)
+        )
+        if attente is not None:
+            self.rejets += 1
+            return attente
+
+        self.tentatives += 1
+        self.backend.ajouter(f"ip:{ip}", maintenant, maintenant - self.fenetre)
+        return None
+
+    def enregistrer_echec(self, nom_utilisateur: str) -> None:
+        maintenant = time.time()
+        self.echecs += 1
+        self.backend.ajouter(f"utilisateur:{nom_utilisateur}", maintenant, maintenant - self.fenetre)
+
+    def enregistrer_succes(self, nom_utilisateur: str) -> None:
+        self.backend.reinitialiser(f"utilisateur:{nom_utilisateur}")
+
+    def etat(self) -> dict:
+        compteurs = self.backend.compteurs(time.time() - self.fenetre)
+        bloques: List[str] = [
+            cle for cle, nombre in compteurs.items()
+            if nombre >= (self.limite_ip if cle.startswith("ip:") else self.limite_utilisateur)
+        ]
+        return {
+            "limites": {
+                "tentatives_par_ip": self.limite_ip,
+                "echecs_par_utilisateur": self.limite_utilisateur,
+                "fenetre_secondes": self.fenetre
+            },
+            "totaux": {
+                "tentatives": self.tentatives,
+                "echecs": self.echecs,
+                "rejets": self.rejets
+            },
+            "compteurs": compteurs,
+            "cles_bloquees": bloques
+        }
+
+
+class SeauJetons:
+    """Seau à jetons : débit moyen `debit` par seconde, rafale maximale `capacite`"""
+
+    __slots__ = ("debit", "capacite", "jetons", "horodatage")
+
+    def __init__(self, debit: float, capacite: float, maintenant: float):
+        self.debit = debit
+        self.capacite = capacite
+        self.jetons = capacite
+        self.horodatage = maintenant
+
+    def remplir(self, maintenant: float) -> None:
+        self.jetons = min(self.capacite, self.jetons + (maintenant - self.horodatage) * self.debit)
+        self.horodatage = maintenant
+
+    def attente(self) -> float:
+        """Délai avant qu'un jeton soit disponible (0 si disponible)"""
+        if self.jetons >= 1:
+            return 0.0
+        return (1 - self.jetons) / self.debit
+
+
+class LimiteurEnvoi:
+
+    # Suppression des seaux pleins (inactifs) toutes les N consommations
+    PERIODE_NETTOYAGE = 1000
+
+    def __init__(self):
+        self.seaux_utilisateurs: Dict[int, SeauJetons] = {}
+        self.seaux_canaux: Dict[int, SeauJetons] = {}
+        self.consommations = 0
+        # Compteurs cumulés depuis le démarrage du worker
+        self.rejets_utilisateur = 0
+        self.rejets_canal = 0
+
+    def _seau(self, seaux: Dict[int, SeauJetons], cle: int, debit: float, capacite: float, maintenant: float) -> SeauJetons:
+        seau = seaux.get(cle)
+        if seau is None:
+            seau = seaux[cle] = SeauJetons(debit, capacite, maintenant)
+        else:
+            seau.remplir(maintenant)
+        return seau
+
+    def _nettoyer(self, maintenant: float) -> None:
+        for seaux in (self.seaux_utilisateurs, self.seaux_canaux):
+            for seau in seaux.values():
+                seau.remplir(maintenant)
+            for cle in [cle for cle, seau in seaux.items() if seau.jetons >= seau.capacite]:
+                del seaux[cle]
+
+    def consommer(self, utilisateur_id: int, canal_id: int) -> Optional[tuple]:
+        """
+        Consomme un jeton utilisateur et un jeton canal
+        Retourne None si l'envoi est autorisé, sinon ("utilisateur" | "canal", délai en secondes)
+        """
+        maintenant = time.monotonic()
+
+        seau_utilisateur = self._seau(
+            self.seaux_utilisateurs, utilisateur_id,
+            parametres.WS_DEBIT_UTILISATEUR, parametres.WS_RAFALE_UTILISATEUR, maintenant
+        )
+        seau_canal = self._seau(
+            self.seaux_canaux, canal_id,
+            parametres.WS_DEBIT_CANAL, parametres.WS_RAFALE_CANAL, maintenant
+        )
+
+        attente = seau_utilisateur.attente()
+        if attente:
+            self.rejets_utilisateur += 1
+            return "utilisateur", attente
+
+        attente = seau_canal.attente()
+        if attente:
+            self.rejets_canal += 1
+            return "canal", attente
+
+        # Les deux seaux ont un jeton : on ne débite qu'une fois la décision prise
+        seau_utilisateur.jetons -= 1
+        seau_canal.jetons -= 1
+
+        self.consommations += 1
+        if self.consommations % self.PERIODE_NETTOYAGE == 0:
+            self._nettoyer(maintenant)
+
+        return None
+
+    def etat(self) -> dict:
+        return {
+            "limites": {
+                "debit_utilisateur": parametres.WS_DEBIT_UTILISATEUR,
+                "rafale_utilisateur": parametres.WS_RAFALE_UTILISATEUR,
+                "debit_canal": parametres.WS_DEBIT_CANAL,
+                "rafale_canal": parametres.WS_RAFALE_CANAL
+            },
+            "totaux": {
+                "envois_acceptes": self.consommations,
+                "rejets_utilisateur": self.rejets_utilisateur,
+                "rejets_canal": self.rejets_canal
+            },
+            "seaux_actifs": {
+                "utilisateurs": len(self.seaux_utilisateurs),
+                "canaux": len(self.seaux_canaux)
+            }
+        }
+
+
+# Instance globale du limiteur (remplacer le backend pour un déploiement multi-workers)
+limiteur_connexion = LimiteurConnexion(BackendMemoire())
+
+# Instance globale du limiteur d'envoi WebSocket (un état par worker)
+limiteur_envoi = LimiteurEnvoi()
+
+
+def _collecter_limitations():
+    yield from lignes_jauge(
+        "login_tentatives_rejetees_total", "Tentatives de connexion refusées par le limiteur",
+        [("", limiteur_connexion.rejets)], "counter"
+    )
+    yield from lignes_jauge(
+        "ws_envois_rejetes_total", "Envois WebSocket refusés par le limiteur",
+        [('portee="utilisateur"', limiteur_envoi.rejets_utilisateur), ('portee="canal"', limiteur_envoi.rejets_canal)],
+        "counter"
+    )
+
+
+registre.ajouter_collecteur(_collecter_limitations)
@@ -0,0 +1,98 @@
+"""
+Cache des profils utilisateurs
+Nom d'utilisateur, prénom et nom des auteurs, pour enrichir les messages sans relire les lignes Utilisateur
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from sqlmodel import Session, select
+
+from app.config import parametres
+from app.metriques import registre, lignes_jauge
+from app.modeles.utilisateur import Utilisateur
+
+
+profils_cache_requetes = registre.compteur(
+    "profils_cache_requetes_total", "Profils d'auteurs trouvés en cache ou lus en base", ("resultat",)
+)
+_succes = profils_cache_requetes.enfant("succes")
+_echecs = profils_cache_requetes.enfant("echec")
+
+
+class ProfilUtilisateur:
+    """Champs publics d'un utilisateur (mêmes noms que sur Utilisateur)"""
+
+    __slots__ = ("id", "nom_utilisateur", "prenom", "nom", "date_chargement")
+
+    def __init__(self, id: int, nom_utilisateur: str, prenom: Optional[str], nom: Optional[str]):
+        self.id = id
+        self.nom_utilisateur = nom_utilisateur
+        self.prenom = prenom
+        self.nom = nom
+        self.date_chargement = time.time()
+
+
+class CacheProfils:
+
+    def __init__(self):
+        # utilisateur_id -> profil, du moins au plus récemment utilisé
+        self.profils: "OrderedDict[int, ProfilUtilisateur]" = OrderedDict()
+
+    def obtenir_plusieurs(self, session: Session, ids: Iterable[int]) -> Dict[int, ProfilUtilisateur]:
+        """Profils des utilisateurs demandés (une requête pour tous les absents) ; les inexistants sont omis"""
+        trouves: Dict[int, ProfilUtilisateur] = {}
+        manquants = set()
+        limite = time.time() - parametres.PROFILS_CACHE_SECONDES
+        for utilisateur_id in ids:
+            if utilisateur_id in trouves or utilisateur_id in manquants:
+                continue
+            profil = self.profils.get(utilisateur_id)
+            # Les modifications faites sur un autre worker sont prises en compte à l'expiration
+            if profil is None or profil.date_chargement < limite:
+                manquants.add(utilisateur_id)
+                continue
+            self.profils.move_to_end(utilisateur_id)
+            trouves[utilisateur_id] = profil
+
+        _succes.inc(len(trouves))
+        if manquants:
+            _echecs.inc(len(manquants))
+            statement = select(
+                Utilisateur.id, Utilisateur.nom_utilisateur, Utilisateur.prenom, Utilisateur.nom
+            ).where(Utilisateur.id.in_(manquants))
+            for ligne in session.exec(statement).all():
+                profil = ProfilUtilisateur(*ligne)
+                self.profils[profil.id] = profil
+                self.profils.move_to_end(profil.id)
+                trouves[profil.id] = profil
+            self._limiter()
+        return trouves
+
+    def obtenir(self, session: Session, utilisateur_id: int) -> Optional[ProfilUtilisateur]:
+
+        return self.obtenir_plusieurs(session, (utilisateur_id,)).get(utilisateur_id)
+
+    def invalider(self, utilisateur_id: int) -> None:
+
+        self.profils.pop(utilisateur_id, None)
+
+    def vider(self) -> None:
+
+        self.profils.clear()
+
+    def _limiter(self) -> None:
+        while len(self.profils) > parametres.PROFILS_CACHE_TAILLE:
+            self.profils.popitem(last=False)
+
+
+# Instance globale du cache (une par worker)
+cache_profils = CacheProfils()
+
+
+def _collecter_profils():
+    yield from lignes_jauge(
+        "profils_cache_taille", "Profils d'utilisateurs en cache", [("", len(cache_profils.profils))]
+    )
+
+
+registre.ajouter_collecteur(_collecter_profils)
@@ -0,0 +1,119 @@
+"""
+Service des refresh tokens
+Émission, rotation et révocation des tokens de rafraîchissement
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlmodel import Session, select, update
+
+from app.config import parametres
+from app.modeles.utilisateur import Utilisateur
+from app.modeles.token_rafraichissement import TokenRafraichissement
+
+
+def hacher_token(token: str) -> str:
+    """Empreinte SHA-256 d'un refresh token (entropie suffisante, pas besoin de bcrypt)"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def creer_token_rafraichissement(
+    session: Session,
+    utilisateur_id: int,
+    famille: Optional[str] = None
+) -> str:
+    """Créer un refresh token et enregistrer son empreinte (sans commit)"""
+    token = secrets.token_urlsafe(48)
+
+    session.add(
+        TokenRafraichissement(
+            token_hash=hacher_token(token),
+            utilisateur_id=utilisateur_id,
+            famille=famille or secrets.token_hex(16),
+            date_expiration=datetime.utcnow() + timedelta(days=parametres.REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+    )
+
+    return token
+
+
+def revoquer_famille(session: Session, famille: str) -> None:
+    """Révoquer toute une chaîne de rotation (sans commit)"""
+    session.exec(
+        update(TokenRafraichissement)
+        .where(TokenRafraichissement.famille == famille)
+        .where(TokenRafraichissement.est_revoque == False)
+        .values(est_revoque=True)
+    )
+
+
+def revoquer_tokens_utilisateur(session: Session, utilisateur_id: int) -> None:
+    """Révoquer tous les refresh tokens d'un utilisateur (sans commit)"""
+    session.exec(
+        update(TokenRafraichissement)
+        .where(TokenRafraichissement.utilisateur_id == utilisateur_id)
+        .where(TokenRafraichissement.est_revoque == False)
+        .values(est_revoque=True)
+    )
+
+
+def rafraichir_tokens(session: Session, token: str) -> Tuple[Utilisateur, str]:
+    """
+    Consommer un refresh token et en émettre un nouveau de la même famille
+    La réutilisation d'un token déjà consommé révoque toute la famille
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token invalide",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    # Une seule requête indexée : token + utilisateur
+    statement = (
+        select(TokenRafraichissement, Utilisateur)
+        .join(Utilisateur, TokenRafraichissement.utilisateur_id == Utilisateur.id)
+        .where(TokenRafraichissement.token_hash == hacher_token(token))
+    )
+    resultat = session.exec(statement).first()
+
+    if resultat is None:
+        raise credentials_exception
+
+    token_stocke, utilisateur = resultat
+
+    if token_stocke.est_revoque:
+        # Token déjà utilisé : probablement volé, on coupe toute la chaîne
+        revoquer_famille(session, token_stocke.famille)
+        session.commit()
+        raise credentials_exception
+
+    if token_stocke.date_expiration < datetime.utcnow():
+        raise credentials_exception
+
+    if not utilisateur.est_actif:
+        revoquer_tokens_utilisateur(session, utilisateur.id)
+        session.commit()
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Compte désactivé"
+        )
+
+    # Rotation : consommation atomique de l'ancien token (deux rafraîchissements
+    # concurrents avec le même token ne peuvent pas réussir tous les deux)
+    consommation = session.exec(
+        update(TokenRafraichissement)
+        .where(TokenRafraichissement.id == token_stocke.id)
+        .where(TokenRafraichissement.est_revoque == False)
+        .values(est_revoque=True)
+    )
+    if consommation.rowcount != 1:
+        revoquer_famille(session, token_stocke.famille)
+        session.commit()
+        raise credentials_exception
+
+    nouveau_token = creer_token_rafraichissement(session, utilisateur.id, token_stocke.famille)
+    session.commit()
+
+    return utilisateur, nouveau_token
@@ -2,46 +2,95 @@
 Service RBAC (Role-Based Access Control)
 Gestion des permissions et vérification des accès
 """
-from typing import List, Optional
-from sqlmodel import Session, select
+import threading
+from typing import Dict, FrozenSet, List, Optional, Tuple, Union
+from sqlmodel import Session, select, func, or_
 from fastapi import HTTPException, status
 
 from app.modeles.utilisateur import Utilisateur
 from app.modeles.role import Role
+from app.modeles.canal import Canal
 from app.modeles.permission import Permission
 from app.modeles.role_permission import RolePermission
+from app.schemas.auth import TokenData
+from app.services.versions import registre_versions
+from app.tracage import span
 
 
-def obtenir_permissions_utilisateur(session: Session, utilisateur: Utilisateur) -> List[str]:
+# Tables dont dépendent les permissions d'un rôle
+TABLES_PERMISSIONS = ("roles", "permissions", "roles_permissions")
+
+
+class CachePermissionsRoles:
+    """Permissions par rôle, valables tant que les versions des tables RBAC n'ont pas changé"""
    
-    if not utilisateur.role_id:
-        return []
+    def __init__(self):
+        # role_id -> (versions au chargement, codes des permissions, ensemble pour les tests d'appartenance)
+        self.par_role: Dict[int, Tuple[tuple, List[str], FrozenSet[str]]] = {}
+    
+    def obtenir(self, role_id: int, versions: tuple) -> Optional[Tuple[tuple, List[str], FrozenSet[str]]]:
+        
+        entree = self.par_role.get(role_id)
+        if entree is None or entree[0] != versions:
+            return None
+        return entree
+    
+    def enregistrer(self, role_id: int, versions: tuple, permissions: List[str]) -> Tuple[tuple, List[str], FrozenSet[str]]:
+        
+        entree = (versions, permissions, frozenset(permissions))
+        self.par_role[role_id] = entree
+        return entree
+    
+    def invalider(self):
+        
+        self.par_role = {}
+
+
+# Instance globale du cache (une par worker)
+cache_permissions_roles = CachePermissionsRoles()
+
+
+def _permissions_role(session: Session, role_id: int) -> Tuple[tuple, List[str], FrozenSet[str]]:
+    
+    versions = registre_versions.version(*TABLES_PERMISSIONS)
+    entree = cache_permissions_roles.obtenir(role_id, versions)
+    if entree is not None:
+        return entree
     
     # Requête pour récupérer toutes les permissions du rôle de l'utilisateur
     statement = (
         select(Permission.code)
         .join(RolePermission, RolePermission.permission_id == Permission.id)
-        .where(RolePermission.role_id == utilisateur.role_id)
+        .where(RolePermission.role_id == role_id)
         .where(Permission.est_actif == True)
     )
     
-    permissions = session.exec(statement).all()
-    return list(permissions)
+    with span("rbac.permissions", role_id=role_id):
+        permissions = list(session.exec(statement).all())
+    return cache_permissions_roles.enregistrer(role_id, versions, permissions)
+
+
+def obtenir_permissions_utilisateur(session: Session, utilisateur: Union[Utilisateur, TokenData]) -> List[str]:
+   
+    if not utilisateur.role_id:
+        return []
+    return _permissions_role(session, utilisateur.role_id)[1]
 
 
 def utilisateur_a_permission(
     session: Session, 
-    utilisateur: Utilisateur, 
+    utilisateur: Union[Utilisateur, TokenData], 
     permission_requise: str
 ) -> bool:
    
-    permissions = obtenir_permissions_utilisateur(session, utilisateur)
-    return permission_requise in permissions
+    if not utilisateur.role_id:
+        return False
+    return permission_requise in _permissions_role(session, utilisateur.role_id)[2]
 
 
 def verifier_permission(
     session: Session, 
-    utilisateur: Utilisateur, 
+    utilisateur: Union[Utilisateur, TokenData], 
     permission_requise: str
 ) -> None:
     
@@ -52,13 +101,14 @@ def verifier_permission(
         )
 
 
-def utilisateur_a_role(utilisateur: Utilisateur, nom_role: str, session: Session) -> bool:
+def utilisateur_a_role(utilisateur: Union[Utilisateur, TokenData], nom_role: str, session: Session) -> bool:
    
     if not utilisateur.role_id:
         return False
     
     statement = select(Role).where(Role.id == utilisateur.role_id)
-    role = session.exec(statement).first()
+    with span("rbac.role", role_requis=nom_role):
+        role = session.exec(statement).first()
     
     if not role:
         return False
@@ -66,10 +116,120 @@ def utilisateur_a_role(utilisateur: Utilisateur, nom_role: str, session: Session
     return role.nom.lower() == nom_role.lower()
 
 
-def verifier_role(utilisateur: Utilisateur, nom_role: str, session: Session) -> None:
+def verifier_role(utilisateur: Union[Utilisateur, TokenData], nom_role: str, session: Session) -> None:
    
     if not utilisateur_a_role(utilisateur, nom_role, session):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Accès refusé. Rôle requis : {nom_role}"
         )
+
+
+# Rang d'un utilisateur sans rôle : seuls les canaux sans restriction lui sont ouverts
+RANG_AUCUN = -1
+
+# Rang exigé par un canal dont le rôle minimum est inconnu : personne n'y accède
+RANG_INACCESSIBLE = 2 ** 31
+
+
+class IndexRangsRoles:
+    """Rangs des rôles, valables tant que la version de la table roles n'a pas changé"""
+   
+    def __init__(self):
+        # role_id -> rang
+        self.par_id: Dict[int, int] = {}
+        # nom du rôle (minuscules) -> rang
+        self.par_nom: Dict[str, int] = {}
+        # Version de la table roles au chargement (None : à charger)
+        self.version: Optional[int] = None
+        self._verrou = threading.Lock()
+    
+    def charger(self, session: Session, version: Optional[int] = None):
+        
+        roles = session.exec(select(Role.id, Role.nom, Role.rang)).all()
+        self.par_id = {role_id: rang for role_id, nom, rang in roles}
+        self.par_nom = {nom.lower(): rang for role_id, nom, rang in roles}
+        self.version = version
+    
+    def invalider(self):
+        
+        self.version = None
+    
+    def actualiser(self, session: Session):
+        
+        # Modifications des autres workers prises en compte à la synchronisation des versions
+        version = registre_versions.version_table("roles")
+        if version == self.version:
+            return
+        with self._verrou:
+            if version != self.version:
+                self.charger(session, version)
+    
+    def rang_role(self, session: Session, role_id: Optional[int]) -> int:
+        
+        self.actualiser(session)
+        if role_id is None:
+            return RANG_AUCUN
+        return self.par_id.get(role_id, RANG_AUCUN)
+    
+    def rang_minimum(self, session: Session, nom_role: Optional[str]) -> int:
+        
+        if not nom_role:
+            return RANG_AUCUN
+        self.actualiser(session)
+        return self.par_nom.get(nom_role.lower(), RANG_INACCESSIBLE)
+    
+    def rang_suffisant(self, session: Session, role_id: Optional[int], nom_role: str) -> bool:
+        
+        # Une seule vérification de version pour les deux rangs
+        self.actualiser(session)
+        rang = self.par_id.get(role_id, RANG_AUCUN) if role_id is not None else RANG_AUCUN
+        return rang >= self.par_nom.get(nom_role.lower(), RANG_INACCESSIBLE)
+    
+    def noms_accessibles(self, session: Session, rang: int) -> List[str]:
+        
+        self.actualiser(session)
+        return [nom for nom, rang_role in self.par_nom.items() if rang_role <= rang]
+
+
+# Instance globale de l'index (une par worker)
+index_rangs_roles = IndexRangsRoles()
+
+
+def canal_accessible(
+    session: Session, 
+    utilisateur: Union[Utilisateur, TokenData], 
+    canal: Canal
+) -> bool:
+    
+    if not canal.role_minimum_requis:
+        return True
+    
+    with span("rbac.canal", canal_id=canal.id):
+        return index_rangs_roles.rang_suffisant(session, utilisateur.role_id, canal.role_minimum_requis)
+
+
+def verifier_acces_canal(
+    session: Session, 
+    utilisateur: Union[Utilisateur, TokenData], 
+    canal: Canal
+) -> None:
+    
+    if not canal_accessible(session, utilisateur, canal):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Accès refusé. Rôle minimum requis : {canal.role_minimum_requis}"
+        )
+
+
+def filtre_canaux_accessibles(session: Session, utilisateur: Union[Utilisateur, TokenData]):
+    
+    # Clause SQL : canaux sans restriction ou dont le rôle minimum a un rang inférieur ou égal
+    rang = index_rangs_roles.rang_role(session, utilisateur.role_id)
+    noms = index_rangs_roles.noms_accessibles(session, rang)
+    
+    return or_(
+        Canal.role_minimum_requis == None,
+        Canal.role_minimum_requis == "",
+        func.lower(Canal.role_minimum_requis).in_(noms)
+    )
@@ -0,0 +1,157 @@
+"""
+Registre des révocations de tokens d'accès
+Table en base + copie en mémoire par worker, synchronisée de façon incrémentale
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlmodel import Session, select, delete, or_
+
+from app.config import parametres
+from app.database import moteur
+from app.modeles.revocation import Revocation
+
+
+# Les transactions concurrentes peuvent valider un id inférieur à la version déjà vue :
+# on relit donc aussi les révocations récentes sur cette fenêtre (secondes)
+MARGE_RELECTURE = 60.0
+
+
+class RegistreRevocations:
+
+    def __init__(self):
+        # jti -> timestamp d'expiration de l'entrée
+        self.jtis: Dict[str, float] = {}
+        # utilisateur_id -> (timestamp de révocation, timestamp d'expiration de l'entrée)
+        self.utilisateurs: Dict[int, tuple] = {}
+        # Plus grand id de Revocation déjà appliqué
+        self.version = 0
+        self.derniere_synchronisation = 0.0
+        self._verrou = threading.Lock()
+
+    def appliquer(self, revocation: Revocation):
+
+        # Les dates sont stockées en UTC naïf (datetime.utcnow)
+        expiration = revocation.date_expiration.replace(tzinfo=timezone.utc).timestamp()
+
+        if revocation.jti:
+            self.jtis[revocation.jti] = expiration
+
+        if revocation.utilisateur_id is not None:
+            actuelle = self.utilisateurs.get(revocation.utilisateur_id)
+            if actuelle is None or actuelle[0] < revocation.date_revocation:
+                self.utilisateurs[revocation.utilisateur_id] = (revocation.date_revocation, expiration)
+
+        if revocation.id and revocation.id > self.version:
+            self.version = revocation.id
+
+    def synchroniser(self, session: Session):
+
+        maintenant = time.time()
+        statement = select(Revocation).where(Revocation.date_expiration > datetime.utcnow())
+
+        if self.version:
+            statement = statement.where(
+                or_(
+                    Revocation.id > self.version,
+                    Revocation.date_revocation >= self.derniere_synchronisation - MARGE_RELECTURE
+                )
+            )
+
+        for revocation in session.exec(statement).all():
+            self.appliquer(revocation)
+
+        # Oublier les entrées dont les tokens ont de toute façon expiré
+        self.jtis = {jti: exp for jti, exp in self.jtis.items() if exp > maintenant}
+        self.utilisateurs = {uid: v for uid, v in self.utilisateurs.items() if v[1] > maintenant}
+
+        self.derniere_synchronisation = maintenant
+
+    def synchroniser_si_necessaire(self):
+
+        if time.time() - self.derniere_synchronisation < parametres.REVOCATION_SYNC_SECONDES:
+            return
+
+        # Un seul thread synchronise, les autres continuent avec la copie actuelle
+        if not self._verrou.acquire(blocking=False):
+            return
+        try:
+            with Session(moteur) as session:
+                self.synchroniser(session)
+        finally:
+            self._verrou.release()
+
+    def est_revoque(self, jti: Optional[str], utilisateur_id: Optional[int], iat: Optional[float]) -> bool:
+
+        self.synchroniser_si_necessaire()
+
+        if jti is not None and jti in self.jtis:
+            return True
+
+        revocation_utilisateur = self.utilisateurs.get(utilisateur_id)
+        if revocation_utilisateur is not None and (iat is None or iat <= revocation_utilisateur[0]):
+            return True
+
+        return False
+
+    def date_revocation_utilisateur(self, utilisateur_id: int) -> Optional[float]:
+        """Date de la dernière révocation de tous les tokens de l'utilisateur (None si aucune en cours)"""
+        self.synchroniser_si_necessaire()
+        revocation_utilisateur = self.utilisateurs.get(utilisateur_id)
+        return revocation_utilisateur[0] if revocation_utilisateur is not None else None
+
+
+def _enregistrer(session: Session, revocation: Revocation) -> None:
+
+    # Purge des révocations devenues inutiles (écritures rares, coût négligeable)
+    session.exec(delete(Revocation).where(Revocation.date_expiration < datetime.utcnow()))
+    session.add(revocation)
+
+    # Effet immédiat sur ce worker au commit, les autres suivent à la prochaine synchronisation
+    # (copie non attachée : les attributs de l'objet enregistré expirent au commit)
+    session.info.setdefault("revocations_en_attente", []).append(
+        Revocation(
+            jti=revocation.jti,
+            utilisateur_id=revocation.utilisateur_id,
+            date_revocation=revocation.date_revocation,
+            date_expiration=revocation.date_expiration
+        )
+    )
+
+
+def revoquer_token_acces(session: Session, jti: str, date_expiration: datetime) -> None:
+    """Révoquer un token d'accès précis (sans commit)"""
+    _enregistrer(
+        session,
+        Revocation(jti=jti, date_revocation=time.time(), date_expiration=date_expiration)
+    )
+
+
+def revoquer_acces_utilisateur(session: Session, utilisateur_id: int) -> None:
+    """Révoquer tous les tokens d'accès déjà émis pour un utilisateur (sans commit)"""
+    _enregistrer(
+        session,
+        Revocation(
+            utilisateur_id=utilisateur_id,
+            date_revocation=time.time(),
+            date_expiration=datetime.utcnow() + timedelta(minutes=parametres.ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+    )
+
+
+# Instance globale du registre (une par worker)
+registre_revocations = RegistreRevocations()
+
+
+@event.listens_for(Session, "after_commit")
+def _appliquer_apres_commit(session):
+    # Une révocation annulée avec sa transaction ne doit pas bloquer de token sur ce worker
+    for revocation in session.info.pop("revocations_en_attente", []):
+        registre_revocations.appliquer(revocation)
+
+
+@event.listens_for(Session, "after_rollback")
+def _oublier_apres_annulation(session):
+    session.info.pop("revocations_en_attente", None)
@@ -0,0 +1,103 @@
+"""
+Sondes de santé du worker
+Vivacité (processus et boucle) et disponibilité (base, pool, boucle, WebSockets)
+"""
+import asyncio
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.config import parametres
+from app.database import moteur
+from app.metriques import ws_trames_en_attente
+from app.surveillance_boucle import moniteur_boucle
+from app.services.websocket import gestionnaire
+
+
+def _aller_retour_base() -> None:
+    with moteur.connect() as connexion:
+        connexion.execute(text("SELECT 1"))
+
+
+class VerificateurSante:
+
+    def __init__(self):
+        self.resultat: Optional[dict] = None
+        self.horodatage = 0.0
+        # Une seule vérification à la fois : les sondes concurrentes attendent le même résultat
+        self._verrou = asyncio.Lock()
+
+    async def disponibilite(self) -> dict:
+        """Diagnostic de disponibilité, mis en cache SANTE_CACHE_SECONDES"""
+        # Worker en cours d'arrêt : retiré immédiatement, sans attendre l'expiration du cache
+        if gestionnaire.en_arret:
+            return {"status": "arret", "pret": False, "verifications": {"arret": {"ok": False}}}
+        
+        if self.resultat is not None and time.monotonic() - self.horodatage < parametres.SANTE_CACHE_SECONDES:
+            return self.resultat
+
+        async with self._verrou:
+            if self.resultat is None or time.monotonic() - self.horodatage >= parametres.SANTE_CACHE_SECONDES:
+                self.resultat = await self._verifier()
+                self.horodatage = time.monotonic()
+        return self.resultat
+
+    async def _verifier(self) -> dict:
+
+        verifications = {}
+
+        # Pool de connexions : un pool épuisé ne doit plus recevoir de trafic (ni d'upgrades WebSocket)
+        pool = moteur.pool
+        capacite_pool = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        utilisees = pool.checkedout()
+        pool_ok = utilisees < capacite_pool
+        verifications["pool"] = {
+            "ok": pool_ok,
+            "connexions_utilisees": utilisees,
+            "capacite": capacite_pool
+        }
+
+        # Aller-retour en base, hors de la boucle et borné dans le temps
+        # (inutile si le pool est épuisé : on attendrait seulement un checkout)
+        if pool_ok:
+            debut = time.perf_counter()
+            try:
+                await asyncio.wait_for(run_in_threadpool(_aller_retour_base), parametres.SANTE_DELAI_BASE_SECONDES)
+                verifications["base"] = {"ok": True, "duree_ms": round((time.perf_counter() - debut) * 1000, 2)}
+            except asyncio.TimeoutError:
+                verifications["base"] = {"ok": False, "erreur": "délai dépassé"}
+            except Exception as e:
+                verifications["base"] = {"ok": False, "erreur": type(e).__name__}
+        else:
+            verifications["base"] = {"ok": False, "erreur": "pool épuisé"}
+
+        # Retard de la boucle d'événements
+        retard = moniteur_boucle.retard_courant()
+        verifications["boucle"] = {
+            "ok": retard <= parametres.SANTE_RETARD_BOUCLE_MAX_SECONDES,
+            "retard_ms": round(retard * 1000, 2)
+        }
+
+        # WebSockets ouvertes par rapport à la capacité du worker
+        sockets = sum(len(connexions) for connexions in list(gestionnaire.connexions_actives.values()))
+        verifications["websockets"] = {
+            "ok": sockets < parametres.WS_CAPACITE_CONNEXIONS,
+            "connexions": sockets,
+            "capacite": parametres.WS_CAPACITE_CONNEXIONS
+        }
+
+        # Diffusion : trames en cours d'envoi (pas de bus pub/sub externe dans ce déploiement)
+        verifications["diffusion"] = {"ok": True, "trames_en_attente": int(ws_trames_en_attente.valeur)}
+
+        pret = all(verification["ok"] for verification in verifications.values())
+        return {
+            "status": "pret" if pret else "indisponible",
+            "pret": pret,
+            "verifications": verifications
+        }
+
+
+# Instance globale (une par worker)
+verificateur_sante = VerificateurSante()
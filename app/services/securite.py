@@ -17,3 +17,16 @@ def hacher_mot_de_passe(mot_de_passe: str) -> str:
 def verifier_mot_de_passe(mot_de_passe_clair: str, mot_de_passe_hash: str) -> bool:
    
     return contexte_pwd.verify(mot_de_passe_clair, mot_de_passe_hash)
+
+
+# Hash de référence pour les utilisateurs inconnus (calculé à la première utilisation)
+_hash_factice = None
+
+
+def verifier_mot_de_passe_factice(mot_de_passe_clair: str) -> bool:
+    """Même coût qu'une vraie vérification : un nom inconnu ne se distingue pas au temps de réponse"""
+    global _hash_factice
+    if _hash_factice is None:
+        _hash_factice = contexte_pwd.hash("mot-de-passe-factice")
+    contexte_pwd.verify(mot_de_passe_clair, _hash_factice)
+    return False
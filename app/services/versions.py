@@ -0,0 +1,93 @@
+"""
+Versions des tables de référence
+Compteurs en base incrémentés par les routes de modification, copie en mémoire par worker synchronisée périodiquement
+"""
+import threading
+import time
+from typing import Dict, Tuple
+from sqlalchemy import event
+from sqlmodel import Session, select, update
+
+from app.config import parametres
+from app.database import moteur
+from app.modeles.version_table import VersionTable
+
+
+# Tables dont les modifications sont suivies
+TABLES_VERSIONNEES = ("roles", "permissions", "roles_permissions", "canaux")
+
+
+class RegistreVersions:
+
+    def __init__(self):
+        # nom de table -> dernière version connue
+        self.versions: Dict[str, int] = {}
+        self.derniere_synchronisation = 0.0
+        self._verrou = threading.Lock()
+
+    def synchroniser(self, session: Session):
+
+        for nom, version in session.exec(select(VersionTable.nom, VersionTable.version)).all():
+            self.appliquer(nom, version)
+        self.derniere_synchronisation = time.time()
+
+    def appliquer(self, nom: str, version: int):
+
+        # Les versions ne font que croître : une lecture antérieure à un commit de ce worker ne la fait pas reculer
+        if version > self.versions.get(nom, -1):
+            self.versions[nom] = version
+
+    def synchroniser_si_necessaire(self):
+
+        if time.time() - self.derniere_synchronisation < parametres.VERSIONS_SYNC_SECONDES:
+            return
+
+        # Un seul thread synchronise, les autres continuent avec la copie actuelle
+        if not self._verrou.acquire(blocking=False):
+            return
+        try:
+            with Session(moteur) as session:
+                self.synchroniser(session)
+        finally:
+            self._verrou.release()
+
+    def version(self, *tables: str) -> Tuple[int, ...]:
+        """Versions des tables demandées (aucune requête SQL hors synchronisation périodique)"""
+        self.synchroniser_si_necessaire()
+        return tuple(self.versions.get(table, 0) for table in tables)
+
+    def version_table(self, table: str) -> int:
+        """Version d'une seule table, sans construire de tuple (chemins chauds)"""
+        self.synchroniser_si_necessaire()
+        return self.versions.get(table, 0)
+
+    def incrementer(self, session: Session, *tables: str) -> None:
+        """
+        Incrémenter les compteurs dans la transaction de la modification (sans commit)
+        Appliqué sur ce worker au commit, les autres suivent à la prochaine synchronisation
+        """
+        en_attente = session.info.setdefault("versions_en_attente", {})
+        for table in tables:
+            resultat = session.execute(
+                update(VersionTable).where(VersionTable.nom == table).values(version=VersionTable.version + 1)
+            )
+            if resultat.rowcount == 0:
+                session.add(VersionTable(nom=table, version=1))
+                session.flush()
+            en_attente[table] = session.exec(select(VersionTable.version).where(VersionTable.nom == table)).one()
+
+
+# Instance globale du registre (une par worker)
+registre_versions = RegistreVersions()
+
+
+@event.listens_for(Session, "after_commit")
+def _appliquer_apres_commit(session):
+    # Une transaction annulée ne doit pas changer les ETags : seules les versions validées sont appliquées
+    for nom, version in session.info.pop("versions_en_attente", {}).items():
+        registre_versions.appliquer(nom, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _oublier_apres_annulation(session):
+    session.info.pop("versions_en_attente", None)
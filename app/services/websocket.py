@@ -2,8 +2,29 @@
 Gestionnaire de connexions WebSocket
 Gère les connexions actives et la diffusion des messages
 """
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
 from typing import Dict, List
-from fastapi import WebSocket
+from fastapi import WebSocket, status
+
+from app.metriques import (
+    registre,
+    formater_labels,
+    lignes_jauge,
+    ws_diffusion_duree,
+    ws_diffusion_destinataires,
+    ws_trames_en_attente
+)
+from app.tracage import span
+
+
+logger = logging.getLogger("app.websocket")
+
+# Les échecs d'envoi peuvent survenir par milliers lors d'une diffusion : logger échantillonné
+logger_envoi = logging.getLogger("app.websocket.envoi")
 
 
 class GestionnaireConnexions:
@@ -13,6 +34,10 @@ class GestionnaireConnexions:
         self.connexions_actives: Dict[int, List[WebSocket]] = {}
         # Dictionnaire : WebSocket -> utilisateur info
         self.utilisateurs_connectes: Dict[WebSocket, dict] = {}
+        # Arrêt en cours : plus de nouvelles connexions, les sockets ouvertes sont vidées
+        self.en_arret = False
+        # Trames reçues en cours de traitement (enregistrement et diffusion)
+        self.traitements_en_cours = 0
     
     async def connecter(self, websocket: WebSocket, canal_id: int, utilisateur: dict):
       
@@ -51,20 +76,86 @@ class GestionnaireConnexions:
         # Copier la liste pour éviter les modifications pendant l'itération
         connexions = self.connexions_actives[canal_id].copy()
         
-        for connexion in connexions:
-            try:
-                await connexion.send_json(message)
-            except Exception as e:
-                print(f"Erreur lors de l'envoi du message: {e}")
-                # Retirer la connexion si elle est fermée
-                self.deconnecter(connexion, canal_id)
+        debut = time.perf_counter()
+        ws_diffusion_destinataires.observer(len(connexions))
+        
+        with span("ws.diffusion", canal_id=canal_id, destinataires=len(connexions)):
+            for connexion in connexions:
+                ws_trames_en_attente.inc()
+                try:
+                    await connexion.send_json(message)
+                except Exception as e:
+                    logger_envoi.warning(
+                        "Erreur lors de l'envoi du message : %s", e,
+                        extra={"canal_id": canal_id, "utilisateur_id": self.utilisateurs_connectes.get(connexion, {}).get("id")}
+                    )
+                    # Retirer la connexion si elle est fermée
+                    self.deconnecter(connexion, canal_id)
+                finally:
+                    ws_trames_en_attente.dec()
+        
+        ws_diffusion_duree.observer(time.perf_counter() - debut)
     
     async def envoyer_message_personnel(self, websocket: WebSocket, message: dict):
       
         try:
             await websocket.send_json(message)
         except Exception as e:
-            print(f"Erreur lors de l'envoi du message personnel: {e}")
+            logger_envoi.warning("Erreur lors de l'envoi du message personnel : %s", e)
+    
+    @contextmanager
+    def traitement(self):
+        """Encadre le traitement d'une trame reçue, attendu par drainer() avant la fermeture"""
+        self.traitements_en_cours += 1
+        try:
+            yield
+        finally:
+            self.traitements_en_cours -= 1
+    
+    async def drainer(self, delai: float, etalement: float):
+        """
+        Vidage avant l'arrêt du worker : annonce de reconnexion avec un délai aléatoire par client
+        (les clients ne se reconnectent pas tous au même instant), attente des trames en cours
+        d'enregistrement ou d'envoi, puis fermeture en 1001 ; le tout borné par `delai`
+        """
+        # Déjà vidé par le lanceur (serveur.py) : l'appel du lifespan n'a plus rien à faire
+        if self.en_arret:
+            return
+        self.en_arret = True
+        connexions = list(self.utilisateurs_connectes)
+        if not connexions:
+            return
+        
+        fin = time.monotonic() + delai
+        logger.info("Vidage de %d WebSockets avant l'arrêt", len(connexions))
+        
+        async def annoncer(connexion: WebSocket):
+            await connexion.send_json({
+                "type": "reconnexion",
+                "message": "Le serveur redémarre, reconnexion automatique",
+                "delai_ms": int(random.uniform(0, etalement) * 1000)
+            })
+        
+        await asyncio.gather(
+            *(asyncio.wait_for(annoncer(connexion), max(fin - time.monotonic(), 0.1)) for connexion in connexions),
+            return_exceptions=True
+        )
+        
+        while (self.traitements_en_cours or ws_trames_en_attente.valeur > 0) and time.monotonic() < fin:
+            await asyncio.sleep(0.05)
+        
+        resultats = await asyncio.gather(
+            *(
+                asyncio.wait_for(connexion.close(code=status.WS_1001_GOING_AWAY), max(fin - time.monotonic(), 0.5))
+                for connexion in connexions
+            ),
+            return_exceptions=True
+        )
+        logger.info(
+            "WebSockets fermées (%d sur %d), %d trames encore en cours",
+            sum(1 for resultat in resultats if not isinstance(resultat, BaseException)), len(connexions),
+            self.traitements_en_cours
+        )
     
     def obtenir_nombre_utilisateurs(self, canal_id: int) -> int:
         
@@ -87,3 +178,17 @@ class GestionnaireConnexions:
 
 # Instance globale du gestionnaire
 gestionnaire = GestionnaireConnexions()
+
+
+def _collecter_connexions():
+    yield from lignes_jauge(
+        "ws_connexions_ouvertes",
+        "WebSockets ouvertes par canal",
+        [
+            (formater_labels(("canal_id",), (canal_id,)), len(connexions))
+            for canal_id, connexions in list(gestionnaire.connexions_actives.items())
+        ]
+    )
+
+
+registre.ajouter_collecteur(_collecter_connexions)
@@ -0,0 +1,173 @@
+"""
+Surveillance de la boucle d'événements asyncio
+Mesure continue du retard d'ordonnancement et capture de la pile des appels bloquants
+"""
+import asyncio
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import Optional
+
+from app.config import parametres
+from app.metriques import registre
+
+
+logger = logging.getLogger("app.boucle")
+
+boucle_retard = registre.histogramme(
+    "boucle_retard_secondes", "Retard d'ordonnancement de la boucle d'événements",
+    bornes=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+).enfant()
+boucle_blocages = registre.compteur(
+    "boucle_blocages_total", "Blocages de la boucle au-delà du seuil"
+).enfant()
+
+# Tâche asyncio -> libellé lisible (route HTTP ou WebSocket qui l'exécute)
+libelles_taches: "weakref.WeakKeyDictionary[asyncio.Task, str]" = weakref.WeakKeyDictionary()
+
+# Seules les frames du projet sont utiles pour désigner le coupable
+_RACINE_PROJET = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def etiqueter_tache_courante(libelle: str) -> None:
+    """Associer un libellé à la tâche courante (affiché si elle bloque la boucle)"""
+    try:
+        tache = asyncio.current_task()
+    except RuntimeError:
+        return
+    if tache is not None:
+        libelles_taches[tache] = libelle
+
+
+class MoniteurBoucle:
+
+    # Constante de temps de la moyenne du retard : un retard compte pour e^-1 au bout d'une seconde
+    CONSTANTE_TEMPS_SECONDES = 1.0
+    # Poids d'une nouvelle mesure dans la moyenne
+    POIDS_MESURE = 0.2
+
+    def __init__(self):
+        # Horodatage (perf_counter) du dernier passage de la sonde dans la boucle
+        self.battement = 0.0
+        self.battement_signale: Optional[float] = None
+        # Retard mesuré au dernier passage de la sonde (secondes)
+        self.dernier_retard = 0.0
+        # Moyenne exponentielle du retard et date (monotonic) de sa dernière mise à jour
+        self._retard_moyen = 0.0
+        self._mise_a_jour = time.monotonic()
+        self.boucle: Optional[asyncio.AbstractEventLoop] = None
+        self.id_thread_boucle: Optional[int] = None
+        self.tache: Optional[asyncio.Task] = None
+        self.thread: Optional[threading.Thread] = None
+        self.arret = threading.Event()
+        # Derniers blocages détectés (libellé, durée, pile)
+        self.blocages = deque(maxlen=20)
+
+    def demarrer(self):
+
+        self.boucle = asyncio.get_running_loop()
+        self.id_thread_boucle = threading.get_ident()
+        self.battement = time.perf_counter()
+        self.arret.clear()
+        self.tache = self.boucle.create_task(self._sonder())
+        self.thread = threading.Thread(target=self._surveiller, name="moniteur-boucle", daemon=True)
+        self.thread.start()
+
+    async def arreter(self):
+
+        self.arret.set()
+        if self.tache is not None:
+            self.tache.cancel()
+            try:
+                await self.tache
+            except asyncio.CancelledError:
+                pass
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+    async def _sonder(self):
+
+        intervalle = parametres.BOUCLE_INTERVALLE_SECONDES
+        while True:
+            debut = time.perf_counter()
+            self.battement = debut
+            await asyncio.sleep(intervalle)
+            self._mesurer(max(0.0, time.perf_counter() - debut - intervalle))
+
+    def _mesurer(self, retard: float):
+
+        self.dernier_retard = retard
+        boucle_retard.observer(retard)
+        moyenne = self._retard_decroissant()
+        self._retard_moyen = moyenne + self.POIDS_MESURE * (retard - moyenne)
+        self._mise_a_jour = time.monotonic()
+
+    def retard_courant(self) -> float:
+        """Retard actuel : dernier retard mesuré, ou durée du blocage en cours s'il est plus long"""
+        if self.tache is None:
+            return 0.0
+        en_cours = time.perf_counter() - self.battement - parametres.BOUCLE_INTERVALLE_SECONDES
+        return max(self.dernier_retard, en_cours, 0.0)
+
+    def _retard_decroissant(self) -> float:
+        ecoule = time.monotonic() - self._mise_a_jour
+        return self._retard_moyen * math.exp(-ecoule / self.CONSTANTE_TEMPS_SECONDES)
+
+    def retard_recent(self) -> float:
+        """
+        Moyenne exponentielle du retard, qui décroît avec le temps (signal de délestage)
+        Un blocage en cours y compte comme une mesure : un pic isolé (hachage bcrypt) ne suffit pas à délester
+        """
+        if self.tache is None:
+            return 0.0
+        moyenne = self._retard_decroissant()
+        en_cours = time.perf_counter() - self.battement - parametres.BOUCLE_INTERVALLE_SECONDES
+        if en_cours > moyenne:
+            return moyenne + self.POIDS_MESURE * (en_cours - moyenne)
+        return moyenne
+
+    def _surveiller(self):
+
+        seuil = parametres.BOUCLE_SEUIL_BLOCAGE_SECONDES
+        intervalle = parametres.BOUCLE_INTERVALLE_SECONDES
+        while not self.arret.wait(seuil / 2):
+            battement = self.battement
+            bloque = time.perf_counter() - battement - intervalle
+            # Un seul signalement par blocage, pris pendant qu'il est en cours
+            if bloque > seuil and battement != self.battement_signale:
+                self.battement_signale = battement
+                self._signaler(bloque)
+
+    def _signaler(self, duree: float):
+
+        frame = sys._current_frames().get(self.id_thread_boucle)
+        if frame is None:
+            return
+
+        pile = [
+            f for f in traceback.extract_stack(frame)
+            if f.filename.startswith(_RACINE_PROJET) and "site-packages" not in f.filename
+        ] or traceback.extract_stack(frame)[-5:]
+
+        tache = asyncio.current_task(self.boucle)
+        libelle = libelles_taches.get(tache) if tache is not None else None
+        if libelle is None:
+            libelle = tache.get_name() if tache is not None else "hors tâche"
+
+        boucle_blocages.inc()
+        pile_formatee = "".join(traceback.format_list(pile[-15:]))
+        self.blocages.append({"libelle": libelle, "duree": round(duree, 3), "pile": pile_formatee})
+        logger.warning(
+            "Boucle d'événements bloquée depuis %.0f ms par %s\n%s",
+            duree * 1000, libelle, pile_formatee
+        )
+
+
+# Instance globale du moniteur (une par worker)
+moniteur_boucle = MoniteurBoucle()
@@ -0,0 +1,321 @@
+"""
+Traçage léger des requêtes (spans)
+Route → JWT → RBAC → base → diffusion, exporté en mémoire et au format OTLP/JSON
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import parametres
+
+
+logger = logging.getLogger("app.tracage")
+
+
+def _identifiant(octets: int) -> str:
+    return os.urandom(octets).hex()
+
+
+class Span:
+
+    __slots__ = ("nom", "id_trace", "id_span", "id_parent", "debut", "fin", "attributs", "erreur", "_jeton")
+
+    def __init__(self, nom: str, id_trace: str, id_parent: Optional[str], attributs: dict):
+        self.nom = nom
+        self.id_trace = id_trace
+        self.id_span = _identifiant(8)
+        self.id_parent = id_parent
+        self.debut = time.time_ns()
+        self.fin = 0
+        self.attributs = attributs
+        self.erreur: Optional[str] = None
+        self._jeton = None
+
+    def definir(self, cle: str, valeur) -> None:
+        self.attributs[cle] = valeur
+
+    def terminer(self) -> None:
+        self.fin = time.time_ns()
+        traceur.exporter(self)
+
+    def __enter__(self):
+        self._jeton = span_courant.set(self)
+        return self
+
+    def __exit__(self, type_exception, exception, trace):
+        if exception is not None and self.erreur is None:
+            self.erreur = f"{type_exception.__name__}: {exception}"
+        span_courant.reset(self._jeton)
+        self.terminer()
+        return False
+
+    def en_dict(self) -> dict:
+        return {
+            "nom": self.nom,
+            "id_trace": self.id_trace,
+            "id_span": self.id_span,
+            "id_parent": self.id_parent,
+            "duree_ms": round((self.fin - self.debut) / 1e6, 3),
+            "attributs": self.attributs,
+            "erreur": self.erreur
+        }
+
+
+class _SpanInerte:
+    """Span sans effet : enfant d'une trace non échantillonnée ou appel hors trace"""
+
+    __slots__ = ()
+
+    def definir(self, cle: str, valeur) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_exception, exception, trace):
+        return False
+
+
+class _RacineNonEchantillonnee(_SpanInerte):
+    """Marque le contexte comme non échantillonné : les spans enfants deviennent inertes sans tirage"""
+
+    __slots__ = ("_jeton",)
+
+    def __init__(self):
+        self._jeton = None
+
+    def __enter__(self):
+        self._jeton = span_courant.set(self)
+        return self
+
+    def __exit__(self, type_exception, exception, trace):
+        span_courant.reset(self._jeton)
+        return False
+
+
+SPAN_INERTE = _SpanInerte()
+
+# Span actif de la tâche courante (copié automatiquement dans les tâches asyncio créées)
+span_courant: ContextVar[Union[Span, _SpanInerte, None]] = ContextVar("span_courant", default=None)
+
+
+def _lire_traceparent(traceparent: Optional[str]) -> Optional[tuple]:
+    """En-tête W3C "00-<trace>-<parent>-<drapeaux>" -> (id_trace, id_parent, échantillonné)"""
+    if not traceparent:
+        return None
+    morceaux = traceparent.strip().split("-")
+    if len(morceaux) != 4 or len(morceaux[1]) != 32 or len(morceaux[2]) != 16:
+        return None
+    try:
+        drapeaux = int(morceaux[3], 16)
+        int(morceaux[1], 16), int(morceaux[2], 16)
+    except ValueError:
+        return None
+    return morceaux[1], morceaux[2], bool(drapeaux & 1)
+
+
+def demarrer_trace(nom: str, traceparent: Optional[str] = None, **attributs) -> Union[Span, _SpanInerte]:
+    """
+    Span racine d'une requête HTTP ou d'une trame WebSocket
+    Le tirage d'échantillonnage n'a lieu qu'ici ; un traceparent amont impose sa décision
+    """
+    amont = _lire_traceparent(traceparent)
+    if amont is not None:
+        id_trace, id_parent, echantillonne = amont
+    else:
+        id_trace, id_parent = None, None
+        echantillonne = random.random() < parametres.TRACE_TAUX_ECHANTILLONNAGE
+
+    if not echantillonne:
+        return _RacineNonEchantillonnee()
+    return Span(nom, id_trace or _identifiant(16), id_parent, attributs)
+
+
+def span(nom: str, **attributs) -> Union[Span, _SpanInerte]:
+    """Span enfant du span courant (inerte hors trace ou si la trace n'est pas échantillonnée)"""
+    parent = span_courant.get()
+    if parent is None or parent.__class__ is not Span:
+        return SPAN_INERTE
+    return Span(nom, parent.id_trace, parent.id_span, attributs)
+
+
+class ExportateurMemoire:
+    """Anneau des derniers spans terminés (tests, consultation par /traces)"""
+
+    def __init__(self, taille: int):
+        self.spans: Deque[Span] = deque(maxlen=taille)
+
+    def exporter(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def traces(self, limite: int = 20) -> List[dict]:
+        """Dernières traces, spans regroupés par identifiant de trace"""
+        par_trace: Dict[str, List[dict]] = {}
+        for span in reversed(list(self.spans)):
+            if span.id_trace not in par_trace:
+                if len(par_trace) >= limite:
+                    continue
+                par_trace[span.id_trace] = []
+            par_trace[span.id_trace].append(span.en_dict())
+        return [
+            {"id_trace": id_trace, "spans": sorted(spans, key=lambda s: s["id_parent"] is not None)}
+            for id_trace, spans in par_trace.items()
+        ]
+
+
+def _attribut_otlp(cle: str, valeur) -> dict:
+    if isinstance(valeur, bool):
+        return {"key": cle, "value": {"boolValue": valeur}}
+    if isinstance(valeur, int):
+        return {"key": cle, "value": {"intValue": str(valeur)}}
+    if isinstance(valeur, float):
+        return {"key": cle, "value": {"doubleValue": valeur}}
+    return {"key": cle, "value": {"stringValue": str(valeur)}}
+
+
+class ExportateurOTLP:
+    """
+    Lots au format OTLP/JSON (ExportTraceServiceRequest), écrits par un thread dédié
+    vers un collecteur HTTP (/v1/traces) et/ou un fichier (une requête JSON par ligne)
+    """
+
+    def __init__(self, url: str, fichier: str, periode: float):
+        self.url = url
+        self.fichier = fichier
+        self.periode = periode
+        self.en_attente: Deque[Span] = deque(maxlen=10000)
+        self._arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._verrou_demarrage = threading.Lock()
+
+    def exporter(self, span: Span) -> None:
+        self.en_attente.append(span)
+        if self._thread is None:
+            self._demarrer()
+
+    def _demarrer(self) -> None:
+        # Spans terminés depuis plusieurs threads (pool de la base, boucle) : un seul thread d'export
+        with self._verrou_demarrage:
+            if self._thread is None:
+                thread = threading.Thread(target=self._boucle, name="exportateur-otlp", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _boucle(self) -> None:
+        while not self._arret.wait(self.periode):
+            self.vider()
+
+    def arreter(self) -> None:
+        self._arret.set()
+        self.vider()
+
+    def vider(self) -> None:
+        spans = []
+        while self.en_attente:
+            spans.append(self.en_attente.popleft())
+        if not spans:
+            return
+
+        corps = json.dumps(self.requete_otlp(spans), separators=(",", ":"))
+        try:
+            if self.fichier:
+                with open(self.fichier, "a", encoding="utf-8") as sortie:
+                    sortie.write(corps + "\n")
+            if self.url:
+                requete = urllib.request.Request(
+                    self.url, data=corps.encode(), headers={"Content-Type": "application/json"}, method="POST"
+                )
+                urllib.request.urlopen(requete, timeout=5).close()
+        except Exception as e:
+            logger.warning("Export OTLP impossible (%d spans perdus) : %s", len(spans), e)
+
+    @staticmethod
+    def requete_otlp(spans: List[Span]) -> dict:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _attribut_otlp("service.name", parametres.PROJECT_NAME),
+                    _attribut_otlp("service.instance.id", parametres.WORKER_ID),
+                    _attribut_otlp("process.pid", os.getpid())
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.tracage"},
+                    "spans": [
+                        {
+                            "traceId": span.id_trace,
+                            "spanId": span.id_span,
+                            "parentSpanId": span.id_parent or "",
+                            "name": span.nom,
+                            # 2 = SERVER pour les racines, 1 = INTERNAL pour les étapes
+                            "kind": 2 if span.id_parent is None else 1,
+                            "startTimeUnixNano": str(span.debut),
+                            "endTimeUnixNano": str(span.fin),
+                            "attributes": [_attribut_otlp(cle, valeur) for cle, valeur in span.attributs.items()],
+                            "status": {"code": 2, "message": span.erreur} if span.erreur else {"code": 0}
+                        }
+                        for span in spans
+                    ]
+                }]
+            }]
+        }
+
+
+class Traceur:
+
+    def __init__(self):
+        self.memoire = ExportateurMemoire(parametres.TRACE_TAILLE_MEMOIRE)
+        self.otlp: Optional[ExportateurOTLP] = None
+        if parametres.TRACE_OTLP_URL or parametres.TRACE_OTLP_FICHIER:
+            self.otlp = ExportateurOTLP(
+                parametres.TRACE_OTLP_URL, parametres.TRACE_OTLP_FICHIER, parametres.TRACE_OTLP_PERIODE_SECONDES
+            )
+
+    def exporter(self, span: Span) -> None:
+        self.memoire.exporter(span)
+        if self.otlp is not None:
+            self.otlp.exporter(span)
+
+    def arreter(self) -> None:
+        if self.otlp is not None:
+            self.otlp.arreter()
+
+
+# Instance globale du traceur (une par worker)
+traceur = Traceur()
+
+
+def installer_tracage_requetes(moteur: Engine) -> None:
+    """Un span par instruction SQL exécutée dans une trace échantillonnée"""
+
+    @event.listens_for(moteur, "before_cursor_execute")
+    def _avant(conn, cursor, statement, parameters, context, executemany):
+        parent = span_courant.get()
+        if parent is not None and parent.__class__ is Span:
+            conn.info.setdefault("spans_sql", []).append(
+                Span("db.requete", parent.id_trace, parent.id_span, {"db.statement": " ".join(statement.split())[:200]})
+            )
+
+    @event.listens_for(moteur, "after_cursor_execute")
+    def _apres(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("spans_sql")
+        if spans:
+            spans.pop().terminer()
+
+    @event.listens_for(moteur, "handle_error")
+    def _erreur(contexte):
+        connexion = contexte.connection
+        spans = connexion.info.get("spans_sql") if connexion is not None else None
+        if spans:
+            span = spans.pop()
+            span.erreur = type(contexte.original_exception).__name__
+            span.terminer()
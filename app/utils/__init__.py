@@ -7,9 +7,12 @@ from app.utils.permissions import (
     exiger_role,
     exiger_plusieurs_permissions
 )
+from app.utils.etag import etag_tables, reponse_conditionnelle
 
 __all__ = [
     "exiger_permission",
     "exiger_role",
-    "exiger_plusieurs_permissions"
+    "exiger_plusieurs_permissions",
+    "etag_tables",
+    "reponse_conditionnelle"
 ]
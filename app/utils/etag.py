@@ -0,0 +1,52 @@
+"""
+Requêtes conditionnelles (ETag / If-None-Match)
+ETags faibles dérivés des versions des tables, réponse 304 sans accès à la base
+"""
+from typing import Optional
+from fastapi import Request, Response, status
+
+from app.services.versions import registre_versions
+
+
+# Le client doit revalider à chaque fois (réponse dépendant du token, jamais partagée par un proxy)
+CACHE_CONTROL = "private, no-cache"
+
+
+def etag_tables(*tables: str, role_id: Optional[int] = None, ressource_id: Optional[int] = None) -> str:
+    """
+    ETag faible des tables, du rôle (réponses filtrées selon le rôle)
+    et de la ressource (réponses d'un seul élément)
+    """
+    parties = [str(version) for version in registre_versions.version(*tables)]
+    if role_id is not None:
+        parties.append(f"r{role_id}")
+    if ressource_id is not None:
+        parties.append(f"i{ressource_id}")
+    return f'W/"{"-".join(parties)}"'
+
+
+def _comparer(if_none_match: str, etag: str) -> bool:
+    """Comparaison faible (RFC 9110) : le préfixe W/ est ignoré"""
+    if if_none_match.strip() == "*":
+        return True
+    valeur = etag[2:] if etag.startswith("W/") else etag
+    for candidat in if_none_match.split(","):
+        candidat = candidat.strip()
+        if candidat.startswith("W/"):
+            candidat = candidat[2:]
+        if candidat == valeur:
+            return True
+    return False
+
+
+def reponse_conditionnelle(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Réponse 304 si le client possède déjà cette version, sinon None
+    (les en-têtes de cache sont alors ajoutés à la réponse de la route)
+    """
+    entetes = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _comparer(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=entetes)
+    response.headers.update(entetes)
+    return None
@@ -3,21 +3,21 @@ Dépendances FastAPI pour la vérification des permissions
 À utiliser avec Depends() dans les routes
 """
 from typing import Callable
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
 from sqlmodel import Session
 
 from app.database import obtenir_session
-from app.modeles.utilisateur import Utilisateur
-from app.services.auth import obtenir_utilisateur_courant
-from app.services.rbac import verifier_permission, verifier_role
+from app.schemas.auth import TokenData
+from app.services.auth import obtenir_identite_courante
+from app.services.rbac import obtenir_permissions_utilisateur, verifier_permission, verifier_role
 
 
 def exiger_permission(permission_requise: str) -> Callable:
     
     async def verification_permission(
-        utilisateur: Utilisateur = Depends(obtenir_utilisateur_courant),
+        utilisateur: TokenData = Depends(obtenir_identite_courante),
         session: Session = Depends(obtenir_session)
-    ) -> Utilisateur:
+    ) -> TokenData:
         verifier_permission(session, utilisateur, permission_requise)
         return utilisateur
     
@@ -27,9 +27,9 @@ def exiger_permission(permission_requise: str) -> Callable:
 def exiger_role(nom_role: str) -> Callable:
    
     async def verification_role(
-        utilisateur: Utilisateur = Depends(obtenir_utilisateur_courant),
+        utilisateur: TokenData = Depends(obtenir_identite_courante),
         session: Session = Depends(obtenir_session)
-    ) -> Utilisateur:
+    ) -> TokenData:
         verifier_role(utilisateur, nom_role, session)
         return utilisateur
     
@@ -39,11 +39,17 @@ def exiger_role(nom_role: str) -> Callable:
 def exiger_plusieurs_permissions(*permissions_requises: str) -> Callable:
    
     async def verification_permissions_multiples(
-        utilisateur: Utilisateur = Depends(obtenir_utilisateur_courant),
+        utilisateur: TokenData = Depends(obtenir_identite_courante),
         session: Session = Depends(obtenir_session)
-    ) -> Utilisateur:
+    ) -> TokenData:
+        # Une seule requête RBAC pour toutes les permissions demandées
+        permissions = set(obtenir_permissions_utilisateur(session, utilisateur))
         for permission in permissions_requises:
-            verifier_permission(session, utilisateur, permission)
+            if permission not in permissions:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f"Permission refusée. Permission requise : {permission}"
+                )
         return utilisateur
     
     return verification_permissions_multiples
@@ -0,0 +1,4 @@
+"""
+Package des benchmarks
+Outils de mesure de performance lancés contre une instance locale de l'application
+"""
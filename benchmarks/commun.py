@@ -0,0 +1,172 @@
+"""
+Outils communs aux benchmarks
+Démarrage d'une instance locale, génération des données, statistiques et rapports JSON
+"""
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+RACINE_PROJET = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOSSIER_RESULTATS = os.path.join(RACINE_PROJET, "benchmarks", "resultats")
+
+# Identifiants des données synthétiques (voir seed.generer_donnees_synthetiques)
+ADMIN = ("admin", "admin123")
+MOT_DE_PASSE_SYNTHETIQUE = "motdepasse123"
+
+
+def nom_utilisateur_synthetique(graine: int, indice: int) -> str:
+    return f"synth{graine}_{indice:07d}"
+
+
+def url_base_par_defaut() -> str:
+    """PostgreSQL si DATABASE_URL est défini, sinon une base SQLite jetable"""
+    if os.environ.get("DATABASE_URL"):
+        return os.environ["DATABASE_URL"]
+    dossier = tempfile.mkdtemp(prefix="bench-")
+    return f"sqlite:///{os.path.join(dossier, 'bench.sqlite')}"
+
+
+def _port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServeurLocal:
+    """
+    Instance uvicorn lancée dans un sous-processus (un worker)
+    Les limiteurs de connexion sont relâchés : le benchmark se connecte depuis une seule IP
+    """
+
+    def __init__(self, database_url: str, variables: Optional[Dict[str, str]] = None, port: Optional[int] = None):
+        self.database_url = database_url
+        self.port = port or _port_libre()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.variables = {
+            "DATABASE_URL": database_url,
+            "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark"),
+            "LOGIN_MAX_TENTATIVES_IP": "1000000000",
+            "LOGIN_MAX_ECHECS_UTILISATEUR": "1000000000",
+            "LOG_NIVEAU": "WARNING",
+            **(variables or {})
+        }
+        self.processus: Optional[subprocess.Popen] = None
+
+    def environnement(self) -> dict:
+        return {**os.environ, **self.variables}
+
+    def __enter__(self):
+        self.processus = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=RACINE_PROJET, env=self.environnement(),
+            stdout=subprocess.DEVNULL
+        )
+        limite = time.monotonic() + 120
+        while time.monotonic() < limite:
+            if self.processus.poll() is not None:
+                raise RuntimeError(f"Le serveur s'est arrêté au démarrage (code {self.processus.returncode})")
+            try:
+                with urllib.request.urlopen(f"{self.url}/sante/vivant", timeout=1):
+                    return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError("Le serveur n'a pas répondu dans les délais")
+
+    def __exit__(self, type_exception, exception, trace):
+        if self.processus is not None and self.processus.poll() is None:
+            self.processus.terminate()
+            try:
+                self.processus.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.processus.kill()
+        return False
+
+    def memoire_rss(self) -> Optional[int]:
+        """Mémoire résidente du serveur en octets (Linux uniquement)"""
+        if self.processus is None:
+            return None
+        try:
+            with open(f"/proc/{self.processus.pid}/status") as statut:
+                for ligne in statut:
+                    if ligne.startswith("VmRSS:"):
+                        return int(ligne.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+
+def generer_donnees(database_url: str, utilisateurs: int, canaux: int, messages_par_canal: int, graine: int) -> float:
+    """Lancer le générateur de seed.py ; retourne la durée en secondes"""
+    debut = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "seed.py", "--generer",
+         "--utilisateurs", str(utilisateurs), "--canaux", str(canaux),
+         "--messages-par-canal", str(messages_par_canal), "--graine", str(graine)],
+        cwd=RACINE_PROJET, env={**os.environ, "DATABASE_URL": database_url,
+                                "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark")},
+        check=True, stdout=subprocess.DEVNULL
+    )
+    return time.perf_counter() - debut
+
+
+def centiles(latences: List[float]) -> dict:
+    """p50/p95/p99 (rang le plus proche), en millisecondes"""
+    if not latences:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None, "moyenne_ms": None}
+    triees = sorted(latences)
+
+    def rang(p: float) -> float:
+        return round(triees[min(len(triees) - 1, max(0, int(round(p / 100 * len(triees))) - 1))] * 1000, 3)
+
+    return {
+        "p50_ms": rang(50),
+        "p95_ms": rang(95),
+        "p99_ms": rang(99),
+        "max_ms": round(triees[-1] * 1000, 3),
+        "moyenne_ms": round(sum(triees) / len(triees) * 1000, 3)
+    }
+
+
+def _commit_courant() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RACINE_PROJET,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def contexte_execution(database_url: str) -> dict:
+    """Informations permettant de comparer deux rapports"""
+    return {
+        "commit": _commit_courant(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processeurs": os.cpu_count(),
+        "base": database_url.split(":", 1)[0]
+    }
+
+
+def ecrire_rapport(nom: str, rapport: dict, chemin: Optional[str] = None) -> str:
+    """Écrire le rapport JSON (par défaut benchmarks/resultats/<nom>-<commit>.json)"""
+    if chemin is None:
+        os.makedirs(DOSSIER_RESULTATS, exist_ok=True)
+        commit = rapport.get("contexte", {}).get("commit") or "local"
+        chemin = os.path.join(DOSSIER_RESULTATS, f"{nom}-{commit}.json")
+    with open(chemin, "w", encoding="utf-8") as sortie:
+        json.dump(rapport, sortie, indent=2, ensure_ascii=False)
+        sortie.write("\n")
+    return chemin
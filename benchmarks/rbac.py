@@ -0,0 +1,247 @@
+"""
+Micro-benchmark de l'autorisation (RBAC, dépendances exiger_*, décodage des tokens)
+SQLite en mémoire, de 4 rôles à plusieurs milliers de permissions, comparé à une référence enregistrée
+
+Exemple :
+    python -m benchmarks.rbac                      # mesurer et afficher
+    python -m benchmarks.rbac --enregistrer        # remplacer la référence
+    python -m benchmarks.rbac --verifier           # code de sortie 1 si une régression dépasse le seuil
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+# Configuration minimale avant l'import de l'application (aucune base réelle n'est utilisée)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("LOG_NIVEAU", "WARNING")
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine  # noqa: E402
+
+from app.modeles import Canal, Permission, Role, RolePermission  # noqa: E402
+from app.schemas.auth import TokenData  # noqa: E402
+from app.services.auth import creer_token_acces, decoder_token  # noqa: E402
+from app.services.rbac import (  # noqa: E402
+    canal_accessible,
+    cache_permissions_roles,
+    index_rangs_roles,
+    obtenir_permissions_utilisateur,
+    utilisateur_a_permission
+)
+from app.services.revocation import registre_revocations  # noqa: E402
+from app.services.versions import registre_versions  # noqa: E402
+from app.utils.permissions import exiger_permission, exiger_plusieurs_permissions  # noqa: E402
+from benchmarks.commun import RACINE_PROJET, contexte_execution  # noqa: E402
+
+
+REFERENCE = os.path.join(RACINE_PROJET, "benchmarks", "references", "rbac.json")
+
+# (nom, nombre de rôles, nombre de permissions)
+ECHELLES = [
+    ("4_roles_17_permissions", 4, 17),
+    ("20_roles_500_permissions", 20, 500),
+    ("100_roles_5000_permissions", 100, 5000),
+]
+
+# Durée minimale d'une mesure et nombre de répétitions (on garde la meilleure)
+DUREE_MESURE = 0.1
+REPETITIONS = 7
+
+
+def construire_base(nb_roles: int, nb_permissions: int) -> Session:
+    """Base SQLite en mémoire : rôle 1 = admin (toutes les permissions), les autres ont les 3 courantes et une sur deux"""
+    moteur = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(moteur)
+    session = Session(moteur)
+
+    codes = ["lire_messages", "envoyer_messages", "lire_canaux"] + [
+        f"permission_{i:05d}" for i in range(nb_permissions - 3)
+    ]
+    session.execute(insert(Permission.__table__), [
+        {"code": code, "nom": code, "categorie": "benchmark", "est_actif": True} for code in codes
+    ])
+    session.execute(insert(Role.__table__), [
+        {"nom": "admin" if i == 0 else f"role_{i:04d}", "rang": 100 - i, "est_actif": True}
+        for i in range(nb_roles)
+    ])
+    session.execute(insert(RolePermission.__table__), [
+        {"role_id": role_id, "permission_id": permission_id}
+        for role_id in range(1, nb_roles + 1)
+        for permission_id in range(1, nb_permissions + 1)
+        if role_id == 1 or permission_id <= 3 or permission_id % 2 == 1
+    ])
+    session.add(Canal(nom="restreint", role_minimum_requis="admin"))
+    session.commit()
+    return session
+
+
+def mesurer(fonction: Callable[[], object]) -> float:
+    """
+    ns/op de la meilleure répétition, le nombre d'itérations étant calibré sur DUREE_MESURE
+    Le ramasse-miettes est suspendu pendant la mesure (comme timeit) pour limiter le bruit
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        return _mesurer(fonction)
+    finally:
+        gc.enable()
+
+
+def _mesurer(fonction: Callable[[], object]) -> float:
+    iterations = 1
+    while True:
+        debut = time.perf_counter_ns()
+        for _ in range(iterations):
+            fonction()
+        duree = time.perf_counter_ns() - debut
+        if duree >= DUREE_MESURE * 1e9:
+            break
+        iterations *= 2
+
+    meilleure = duree / iterations
+    for _ in range(REPETITIONS - 1):
+        debut = time.perf_counter_ns()
+        for _ in range(iterations):
+            fonction()
+        meilleure = min(meilleure, (time.perf_counter_ns() - debut) / iterations)
+    return meilleure
+
+
+def en_synchrone(fabrique: Callable[[], object]) -> Callable[[], object]:
+    """Exécuter une dépendance asynchrone (coroutine sans véritable attente) sans passer par une boucle"""
+
+    def appel():
+        coroutine = fabrique()
+        try:
+            coroutine.send(None)
+        except StopIteration as fin:
+            return fin.value
+        raise RuntimeError("La dépendance a suspendu son exécution")
+
+    return appel
+
+
+def executer() -> Dict[str, float]:
+    # Les registres des révocations et des versions ne doivent pas se synchroniser pendant la mesure
+    registre_revocations.derniere_synchronisation = float("inf")
+    registre_versions.derniere_synchronisation = float("inf")
+    resultats: Dict[str, float] = {}
+
+    token = creer_token_acces({"sub": "benchmark", "user_id": 2, "role_id": 2})
+    resultats["jeton/decoder_token"] = mesurer(lambda: decoder_token(token))
+
+    for nom, nb_roles, nb_permissions in ECHELLES:
+        session = construire_base(nb_roles, nb_permissions)
+        index_rangs_roles.invalider()
+        cache_permissions_roles.invalider()
+        admin = TokenData(nom_utilisateur="admin", user_id=1, role_id=1, jti="a")
+        standard = TokenData(nom_utilisateur="benchmark", user_id=2, role_id=2, jti="b")
+        canal = session.get(Canal, 1)
+
+        dependance = exiger_permission("lire_messages")
+        dependance_multiple = exiger_plusieurs_permissions("lire_messages", "envoyer_messages", "lire_canaux")
+
+        cas = {
+            "permissions_admin": lambda: obtenir_permissions_utilisateur(session, admin),
+            "a_permission_accordee": lambda: utilisateur_a_permission(session, standard, "lire_messages"),
+            "a_permission_refusee": lambda: utilisateur_a_permission(session, standard, "permission_00000"),
+            "exiger_permission": en_synchrone(lambda: dependance(utilisateur=standard, session=session)),
+            "exiger_plusieurs_permissions": en_synchrone(
+                lambda: dependance_multiple(utilisateur=standard, session=session)
+            ),
+            "chaine_token_et_permission": en_synchrone(
+                lambda: dependance(utilisateur=decoder_token(token), session=session)
+            ),
+            "canal_accessible": lambda: canal_accessible(session, standard, canal),
+        }
+        for nom_cas, fonction in cas.items():
+            resultats[f"{nom}/{nom_cas}"] = mesurer(fonction)
+            print(f"   {nom}/{nom_cas:<30} {resultats[f'{nom}/{nom_cas}'] / 1000:10.1f} µs/op")
+
+        session.close()
+
+    return {cle: round(valeur) for cle, valeur in resultats.items()}
+
+
+def charger_reference() -> Optional[Dict[str, float]]:
+    if not os.path.exists(REFERENCE):
+        return None
+    with open(REFERENCE, encoding="utf-8") as fichier:
+        return json.load(fichier)["resultats_ns_op"]
+
+
+def regressions(resultats: Dict[str, float], reference: Dict[str, float], seuil: float) -> List[str]:
+    return [
+        cle for cle, valeur in resultats.items()
+        if reference.get(cle) and valeur / reference[cle] - 1 > seuil
+    ]
+
+
+def comparer(resultats: Dict[str, float], reference: Dict[str, float], seuil: float) -> int:
+    """Afficher l'écart à la référence ; retourne le code de sortie (1 si régression au-delà du seuil)"""
+    print(f"\nComparaison avec la référence (seuil +{seuil:.0%}) :")
+    for cle, valeur in resultats.items():
+        ancienne = reference.get(cle)
+        if not ancienne:
+            print(f"   {cle:<58} nouveau")
+            continue
+        ecart = valeur / ancienne - 1
+        marque = "RÉGRESSION" if ecart > seuil else ""
+        print(f"   {cle:<58} {ancienne:>10} → {valeur:>10} ns/op  {ecart:+7.1%}  {marque}")
+
+    en_regression = regressions(resultats, reference, seuil)
+    if en_regression:
+        print(f"\n{len(en_regression)} régression(s) au-delà de +{seuil:.0%}")
+        return 1
+    print("\nAucune régression")
+    return 0
+
+
+def main():
+    analyseur = argparse.ArgumentParser(description="Micro-benchmark RBAC")
+    analyseur.add_argument("--enregistrer", action="store_true", help="Écrire les mesures comme nouvelle référence")
+    analyseur.add_argument("--verifier", action="store_true", help="Échouer si une mesure régresse au-delà du seuil")
+    analyseur.add_argument("--seuil", type=float, default=0.25, help="Régression tolérée (0.25 = +25 %%)")
+    analyseur.add_argument("--essais", type=int, default=3, help="Mesures au plus avant de conclure à une régression")
+    arguments = analyseur.parse_args()
+
+    print("Mesure de l'autorisation (ns/op, meilleure de 7 répétitions)...")
+    resultats = executer()
+
+    if arguments.enregistrer:
+        os.makedirs(os.path.dirname(REFERENCE), exist_ok=True)
+        with open(REFERENCE, "w", encoding="utf-8") as sortie:
+            json.dump({
+                "contexte": contexte_execution("sqlite://"),
+                "resultats_ns_op": resultats
+            }, sortie, indent=2, ensure_ascii=False)
+            sortie.write("\n")
+        print(f"\nRéférence écrite dans {REFERENCE}")
+
+    if arguments.verifier:
+        reference = charger_reference()
+        if reference is None:
+            print(f"Aucune référence ({REFERENCE}) : lancer d'abord avec --enregistrer")
+            sys.exit(1)
+
+        # Une régression apparente est re-mesurée : on garde le meilleur temps de chaque cas,
+        # pour qu'un pic de charge passager sur la machine ne fasse pas échouer la vérification
+        for _ in range(arguments.essais - 1):
+            if not regressions(resultats, reference, arguments.seuil):
+                break
+            print("\nRégression apparente, nouvelle mesure pour confirmer...")
+            nouveaux = executer()
+            resultats = {cle: min(valeur, nouveaux.get(cle, valeur)) for cle, valeur in resultats.items()}
+
+        sys.exit(comparer(resultats, reference, arguments.seuil))
+
+
+if __name__ == "__main__":
+    main()
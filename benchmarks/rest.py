@@ -0,0 +1,195 @@
+"""
+Benchmark des routes REST les plus sollicitées
+Charge en boucle fermée (httpx asynchrone), rapport p50/p95/p99 et débit en JSON
+
+Exemple :
+    python -m benchmarks.rest --utilisateurs 20000 --canaux 200 --messages-par-canal 1000
+    python -m benchmarks.rest --url http://127.0.0.1:8000 --sans-generation --comparer ancien.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+
+import httpx
+
+from benchmarks.commun import (
+    ADMIN,
+    MOT_DE_PASSE_SYNTHETIQUE,
+    ServeurLocal,
+    centiles,
+    contexte_execution,
+    ecrire_rapport,
+    generer_donnees,
+    nom_utilisateur_synthetique,
+    url_base_par_defaut
+)
+
+
+async def _connecter(client: httpx.AsyncClient, nom: str, mot_de_passe: str) -> str:
+    reponse = await client.post("/auth/login", data={"username": nom, "password": mot_de_passe})
+    reponse.raise_for_status()
+    return reponse.json()["access_token"]
+
+
+async def mesurer_scenario(
+    client: httpx.AsyncClient,
+    fabrique_requete: Callable[[int], tuple],
+    concurrence: int,
+    duree: float,
+    echauffement: float
+) -> dict:
+    """
+    `concurrence` clients enchaînent les requêtes pendant `echauffement` + `duree` secondes
+    Seules les réponses reçues après l'échauffement sont comptées
+    """
+    latences: List[float] = []
+    statuts: Counter = Counter()
+    erreurs = 0
+    compteur = itertools.count()
+    debut_mesure = time.perf_counter() + echauffement
+    fin = debut_mesure + duree
+
+    async def client_virtuel():
+        nonlocal erreurs
+        while True:
+            methode, chemin, options = fabrique_requete(next(compteur))
+            debut = time.perf_counter()
+            if debut >= fin:
+                return
+            try:
+                reponse = await client.request(methode, chemin, **options)
+                statut = reponse.status_code
+            except httpx.HTTPError:
+                statut = None
+            arrivee = time.perf_counter()
+            if debut < debut_mesure:
+                continue
+            if statut is None or statut >= 400:
+                erreurs += 1
+            statuts[str(statut)] += 1
+            latences.append(arrivee - debut)
+
+    await asyncio.gather(*(client_virtuel() for _ in range(concurrence)))
+
+    return {
+        "requetes": len(latences),
+        "debit_rps": round(len(latences) / duree, 2),
+        "erreurs": erreurs,
+        "statuts": dict(statuts),
+        **centiles(latences)
+    }
+
+
+async def executer(arguments, url: str) -> Dict[str, dict]:
+
+    limites = httpx.Limits(max_connections=arguments.concurrence, max_keepalive_connections=arguments.concurrence)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30) as client:
+        token = await _connecter(client, *ADMIN)
+        entetes = {"Authorization": f"Bearer {token}"}
+
+        # Canal le plus volumineux : premier canal synthétique (rang 1 de la loi de Zipf)
+        canaux = (await client.get("/canaux/", params={"limit": 1000}, headers=entetes)).json()
+        synthetiques = [canal["id"] for canal in canaux if canal["nom"].startswith(f"synth{arguments.graine}-")]
+        canal_chaud = synthetiques[0] if synthetiques else canaux[0]["id"]
+
+        scenarios: Dict[str, Callable[[int], tuple]] = {
+            "auth_login": lambda i: ("POST", "/auth/login", {"data": {
+                "username": nom_utilisateur_synthetique(arguments.graine, i % max(arguments.utilisateurs, 1)),
+                "password": MOT_DE_PASSE_SYNTHETIQUE
+            }}),
+            "canaux": lambda i: ("GET", "/canaux/", {"headers": entetes}),
+            "utilisateurs": lambda i: ("GET", "/utilisateurs/", {"headers": entetes}),
+        }
+        for page in arguments.pages:
+            scenarios[f"messages_page_{page}"] = (
+                lambda i, skip=page * arguments.taille_page: (
+                    "GET", f"/messages/canal/{canal_chaud}",
+                    {"headers": entetes, "params": {"skip": skip, "limit": arguments.taille_page}}
+                )
+            )
+
+        resultats = {}
+        for nom, fabrique in scenarios.items():
+            if arguments.scenarios and nom not in arguments.scenarios:
+                continue
+            print(f"▶ {nom} ({arguments.concurrence} clients, {arguments.duree} s)...")
+            resultats[nom] = await mesurer_scenario(
+                client, fabrique, arguments.concurrence, arguments.duree, arguments.echauffement
+            )
+            r = resultats[nom]
+            print(f"   {r['debit_rps']} req/s  p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms  erreurs {r['erreurs']}")
+        return resultats
+
+
+def comparer(rapport: dict, chemin_reference: str) -> None:
+    """Afficher l'évolution du débit et du p95 par rapport à un rapport précédent"""
+    with open(chemin_reference, encoding="utf-8") as fichier:
+        reference = json.load(fichier)
+    print(f"\nComparaison avec {reference['contexte'].get('commit')} :")
+    for nom, resultat in rapport["scenarios"].items():
+        ancien = reference.get("scenarios", {}).get(nom)
+        if not ancien or not ancien.get("p95_ms") or not resultat.get("p95_ms"):
+            continue
+        print(
+            f"   {nom:<22} débit {resultat['debit_rps'] / max(ancien['debit_rps'], 1e-9) - 1:+.1%}"
+            f"  p95 {resultat['p95_ms'] / ancien['p95_ms'] - 1:+.1%}"
+        )
+
+
+def main():
+    analyseur = argparse.ArgumentParser(description="Benchmark des routes REST")
+    analyseur.add_argument("--url", help="Instance déjà démarrée (sinon une instance locale est lancée)")
+    analyseur.add_argument("--database-url", help="Base de l'instance locale (défaut : $DATABASE_URL ou SQLite jetable)")
+    analyseur.add_argument("--sans-generation", action="store_true", help="Ne pas générer de données synthétiques")
+    analyseur.add_argument("--utilisateurs", type=int, default=5000)
+    analyseur.add_argument("--canaux", type=int, default=100)
+    analyseur.add_argument("--messages-par-canal", type=int, default=500)
+    analyseur.add_argument("--graine", type=int, default=42)
+    analyseur.add_argument("--concurrence", type=int, default=32, help="Clients simultanés")
+    analyseur.add_argument("--duree", type=float, default=15.0, help="Durée mesurée par scénario (secondes)")
+    analyseur.add_argument("--echauffement", type=float, default=2.0, help="Durée non mesurée avant chaque scénario")
+    analyseur.add_argument("--pages", type=int, nargs="+", default=[0, 10, 100], help="Profondeurs de page de l'historique")
+    analyseur.add_argument("--taille-page", type=int, default=50)
+    analyseur.add_argument("--scenarios", nargs="*", help="Limiter aux scénarios nommés")
+    analyseur.add_argument("--sortie", help="Fichier du rapport JSON")
+    analyseur.add_argument("--comparer", help="Rapport JSON de référence")
+    arguments = analyseur.parse_args()
+
+    database_url = arguments.database_url or url_base_par_defaut()
+    rapport = {
+        "contexte": contexte_execution(database_url if not arguments.url else arguments.url),
+        "parametres": {
+            "utilisateurs": arguments.utilisateurs,
+            "canaux": arguments.canaux,
+            "messages_par_canal": arguments.messages_par_canal,
+            "graine": arguments.graine,
+            "concurrence": arguments.concurrence,
+            "duree": arguments.duree,
+            "taille_page": arguments.taille_page
+        }
+    }
+
+    if arguments.url:
+        rapport["scenarios"] = asyncio.run(executer(arguments, arguments.url))
+    else:
+        with ServeurLocal(database_url) as serveur:
+            if not arguments.sans_generation:
+                print("Génération des données synthétiques...")
+                rapport["generation_secondes"] = round(generer_donnees(
+                    database_url, arguments.utilisateurs, arguments.canaux,
+                    arguments.messages_par_canal, arguments.graine
+                ), 1)
+            rapport["scenarios"] = asyncio.run(executer(arguments, serveur.url))
+
+    chemin = ecrire_rapport("rest", rapport, arguments.sortie)
+    print(f"\nRapport écrit dans {chemin}")
+    if arguments.comparer:
+        comparer(rapport, arguments.comparer)
+
+
+if __name__ == "__main__":
+    main()
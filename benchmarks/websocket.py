@@ -0,0 +1,295 @@
+"""
+Test de charge WebSocket : milliers de clients de chat dans un seul processus
+Latence de livraison de bout en bout, trames perdues, temps de connexion, mémoire serveur par socket
+
+Exemple :
+    python -m benchmarks.websocket benchmarks/scenarios/ws-diffusion.json
+    python -m benchmarks.websocket benchmarks/scenarios/ws-petit.json --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+from benchmarks.commun import (
+    ADMIN,
+    MOT_DE_PASSE_SYNTHETIQUE,
+    ServeurLocal,
+    centiles,
+    contexte_execution,
+    ecrire_rapport,
+    generer_donnees,
+    url_base_par_defaut
+)
+
+
+# Valeurs par défaut d'un fichier de scénario
+SCENARIO_DEFAUT = {
+    "sockets": 200,
+    "canaux": 4,
+    "comptes": 50,
+    "ratio_emetteurs": 0.1,
+    "messages_par_seconde": 1.0,
+    "duree": 20,
+    "connexions_par_seconde": 200,
+    "vidage_secondes": 3,
+    "graine": 42,
+    "donnees": {"utilisateurs": 1000, "canaux": 20, "messages_par_canal": 10},
+    "serveur": {}
+}
+
+PREFIXE_CONTENU = "bench"
+
+
+class ClientChat:
+
+    def __init__(self, numero: int, canal_id: int, token: str, emetteur: bool):
+        self.numero = numero
+        self.canal_id = canal_id
+        self.token = token
+        self.emetteur = emetteur
+        self.connexion = None
+        self.temps_connexion: Optional[float] = None
+        self.envoyes = 0
+        self.recus = 0
+        self.erreurs: Counter = Counter()
+        self.fermeture: Optional[int] = None
+
+
+class TestChargeWebSocket:
+
+    def __init__(self, scenario: dict, url: str):
+        self.scenario = scenario
+        self.url = url
+        self.url_ws = "ws" + url[len("http"):]
+        self.rng = random.Random(scenario["graine"])
+        self.clients: List[ClientChat] = []
+        self.ouverts_par_canal: Counter = Counter()
+        self.latences: List[float] = []
+        # Livraisons attendues : une par socket ouverte du canal au moment de l'envoi
+        self.livraisons_attendues = 0
+        self.livraisons_annulees = 0
+        self.echecs_connexion: Counter = Counter()
+
+    async def preparer(self) -> tuple:
+        """Canaux ouverts à tous et comptes autorisés à envoyer, choisis via l'API"""
+        async with httpx.AsyncClient(base_url=self.url, timeout=60) as client:
+            reponse = await client.post("/auth/login", data={"username": ADMIN[0], "password": ADMIN[1]})
+            reponse.raise_for_status()
+            entetes = {"Authorization": f"Bearer {reponse.json()['access_token']}"}
+
+            roles = {role["nom"]: role["id"] for role in (await client.get("/roles/", headers=entetes)).json()}
+            canaux = [
+                canal["id"] for canal in (await client.get("/canaux/", params={"limit": 10000}, headers=entetes)).json()
+                if not canal.get("role_minimum_requis") and canal.get("est_actif", True)
+            ][:self.scenario["canaux"]]
+
+            utilisateurs = (await client.get(
+                "/utilisateurs/", params={"limit": self.scenario["comptes"] * 4}, headers=entetes
+            )).json()
+            comptes = [
+                u["nom_utilisateur"] for u in utilisateurs
+                if u["est_actif"] and u["role_id"] == roles.get("utilisateur")
+                and u["nom_utilisateur"].startswith("synth")
+            ][:self.scenario["comptes"]]
+            if not comptes:
+                raise RuntimeError("Aucun compte synthétique : générer les données (seed.py --generer)")
+
+            # Connexions en parallèle limité : bcrypt est coûteux côté serveur
+            semaphore = asyncio.Semaphore(8)
+
+            async def connecter(nom: str) -> str:
+                async with semaphore:
+                    r = await client.post("/auth/login", data={"username": nom, "password": MOT_DE_PASSE_SYNTHETIQUE})
+                    r.raise_for_status()
+                    return r.json()["access_token"]
+
+            tokens = await asyncio.gather(*(connecter(nom) for nom in comptes))
+        return canaux, tokens
+
+    async def ouvrir(self, client: ClientChat) -> None:
+        debut = time.perf_counter()
+        try:
+            client.connexion = await websockets.connect(
+                f"{self.url_ws}/ws/chat/{client.canal_id}?token={client.token}",
+                open_timeout=30, max_queue=None
+            )
+            # La connexion est utilisable à la réception du message de bienvenue
+            while json.loads(await client.connexion.recv()).get("type") != "connexion":
+                pass
+        except Exception as e:
+            self.echecs_connexion[type(e).__name__] += 1
+            client.connexion = None
+            return
+        client.temps_connexion = time.perf_counter() - debut
+        self.ouverts_par_canal[client.canal_id] += 1
+
+    async def recevoir(self, client: ClientChat) -> None:
+        try:
+            async for brut in client.connexion:
+                trame = json.loads(brut)
+                genre = trame.get("type")
+                if genre == "message":
+                    morceaux = trame.get("contenu", "").split(" ")
+                    if len(morceaux) == 4 and morceaux[0] == PREFIXE_CONTENU:
+                        client.recus += 1
+                        self.latences.append((time.perf_counter_ns() - int(morceaux[3])) / 1e9)
+                elif genre == "erreur":
+                    client.erreurs[trame.get("portee") or "autre"] += 1
+                    # Message refusé : aucune des livraisons prévues n'aura lieu
+                    self.livraisons_annulees += self.ouverts_par_canal[client.canal_id]
+        except websockets.ConnectionClosed as e:
+            client.fermeture = e.rcvd.code if e.rcvd else None
+        finally:
+            if client.fermeture is not None:
+                self.ouverts_par_canal[client.canal_id] -= 1
+
+    async def emettre(self, client: ClientChat, fin: float) -> None:
+        intervalle = 1.0 / self.scenario["messages_par_seconde"]
+        # Décalage initial aléatoire pour ne pas synchroniser tous les émetteurs
+        await asyncio.sleep(self.rng.random() * intervalle)
+        while time.perf_counter() < fin and client.fermeture is None:
+            contenu = f"{PREFIXE_CONTENU} {client.numero} {client.envoyes} {time.perf_counter_ns()}"
+            try:
+                await client.connexion.send(json.dumps({"contenu": contenu}))
+            except websockets.ConnectionClosed:
+                return
+            client.envoyes += 1
+            self.livraisons_attendues += self.ouverts_par_canal[client.canal_id]
+            await asyncio.sleep(intervalle)
+
+    async def executer(self, serveur: Optional[ServeurLocal]) -> dict:
+        s = self.scenario
+        canaux, tokens = await self.preparer()
+        if not canaux:
+            raise RuntimeError("Aucun canal accessible à tous")
+
+        nb_emetteurs = int(round(s["sockets"] * s["ratio_emetteurs"]))
+        emetteurs = set(self.rng.sample(range(s["sockets"]), nb_emetteurs))
+        self.clients = [
+            ClientChat(i, canaux[i % len(canaux)], tokens[i % len(tokens)], i in emetteurs)
+            for i in range(s["sockets"])
+        ]
+
+        memoire_avant = serveur.memoire_rss() if serveur else None
+
+        # Montée en charge au rythme connexions_par_seconde
+        print(f"Ouverture de {s['sockets']} sockets sur {len(canaux)} canaux...")
+        debut_connexions = time.perf_counter()
+        ouvertures = []
+        for indice, client in enumerate(self.clients):
+            ouvertures.append(asyncio.create_task(self.ouvrir(client)))
+            attente = debut_connexions + (indice + 1) / s["connexions_par_seconde"] - time.perf_counter()
+            if attente > 0:
+                await asyncio.sleep(attente)
+        await asyncio.gather(*ouvertures)
+        duree_connexions = time.perf_counter() - debut_connexions
+        connectes = [client for client in self.clients if client.connexion is not None]
+
+        # Laisser passer les notifications d'arrivée avant de mesurer
+        receptions = [asyncio.create_task(self.recevoir(client)) for client in connectes]
+        await asyncio.sleep(1)
+        memoire_apres = serveur.memoire_rss() if serveur else None
+
+        print(f"Envoi pendant {s['duree']} s ({nb_emetteurs} émetteurs, {s['messages_par_seconde']} msg/s chacun)...")
+        debut_envoi = time.perf_counter()
+        fin = debut_envoi + s["duree"]
+        await asyncio.gather(*(self.emettre(client, fin) for client in connectes if client.emetteur))
+        await asyncio.sleep(s["vidage_secondes"])
+
+        for client in connectes:
+            await client.connexion.close()
+        await asyncio.gather(*receptions, return_exceptions=True)
+
+        envoyes = sum(client.envoyes for client in connectes)
+        recus = sum(client.recus for client in connectes)
+        attendues = self.livraisons_attendues - self.livraisons_annulees
+        erreurs = Counter()
+        for client in connectes:
+            erreurs.update(client.erreurs)
+        fermetures = Counter(str(client.fermeture) for client in connectes if client.fermeture not in (None, 1000))
+
+        memoire_par_socket = None
+        if memoire_avant is not None and memoire_apres is not None and connectes:
+            memoire_par_socket = round((memoire_apres - memoire_avant) / len(connectes))
+
+        return {
+            "connexions": {
+                "demandees": s["sockets"],
+                "reussies": len(connectes),
+                "echecs": dict(self.echecs_connexion),
+                "duree_montee_secondes": round(duree_connexions, 2),
+                **{f"temps_{cle}": valeur for cle, valeur in centiles(
+                    [client.temps_connexion for client in connectes]
+                ).items()}
+            },
+            "livraison": {
+                "messages_envoyes": envoyes,
+                "debit_envoi_mps": round(envoyes / s["duree"], 2),
+                "livraisons_attendues": attendues,
+                "livraisons_recues": recus,
+                "trames_perdues": max(attendues - recus, 0),
+                "debit_livraison_fps": round(recus / s["duree"], 2),
+                "refus_limiteur": dict(erreurs),
+                "fermetures_anormales": dict(fermetures),
+                **{f"latence_{cle}": valeur for cle, valeur in centiles(self.latences).items()}
+            },
+            "memoire_serveur": {
+                "rss_avant_octets": memoire_avant,
+                "rss_apres_octets": memoire_apres,
+                "octets_par_socket": memoire_par_socket
+            }
+        }
+
+
+def charger_scenario(chemin: str) -> dict:
+    with open(chemin, encoding="utf-8") as fichier:
+        scenario = {**SCENARIO_DEFAUT, **json.load(fichier)}
+    scenario.setdefault("nom", os.path.splitext(os.path.basename(chemin))[0])
+    return scenario
+
+
+def main():
+    analyseur = argparse.ArgumentParser(description="Test de charge WebSocket")
+    analyseur.add_argument("scenario", help="Fichier de scénario JSON (voir benchmarks/scenarios/)")
+    analyseur.add_argument("--url", help="Instance déjà démarrée (sinon une instance locale est lancée)")
+    analyseur.add_argument("--database-url", help="Base de l'instance locale (défaut : $DATABASE_URL ou SQLite jetable)")
+    analyseur.add_argument("--sans-generation", action="store_true", help="Ne pas générer de données synthétiques")
+    analyseur.add_argument("--sortie", help="Fichier du rapport JSON")
+    arguments = analyseur.parse_args()
+
+    scenario = charger_scenario(arguments.scenario)
+    database_url = arguments.database_url or url_base_par_defaut()
+    rapport = {
+        "contexte": contexte_execution(database_url if not arguments.url else arguments.url),
+        "scenario": scenario
+    }
+
+    if arguments.url:
+        rapport["resultats"] = asyncio.run(TestChargeWebSocket(scenario, arguments.url).executer(None))
+    else:
+        variables = {cle: str(valeur) for cle, valeur in scenario["serveur"].items()}
+        with ServeurLocal(database_url, variables) as serveur:
+            if not arguments.sans_generation:
+                donnees = scenario["donnees"]
+                print("Génération des données synthétiques...")
+                generer_donnees(
+                    database_url, donnees["utilisateurs"], donnees["canaux"],
+                    donnees["messages_par_canal"], scenario["graine"]
+                )
+            rapport["resultats"] = asyncio.run(TestChargeWebSocket(scenario, serveur.url).executer(serveur))
+
+    print(json.dumps(rapport["resultats"], indent=2, ensure_ascii=False))
+    chemin = ecrire_rapport(f"ws-{scenario['nom']}", rapport, arguments.sortie)
+    print(f"\nRapport écrit dans {chemin}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,34 @@
 Point d'entrée principal de l'application FastAPI
 Gestion RBAC et Chat en temps réel
 """
-from fastapi import FastAPI
+import logging
+import os
+
+from fastapi import FastAPI, Depends, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
+from sqlalchemy.engine import make_url
 
 from app.config import parametres
-from app.database import creer_tables
+from app.metriques import registre
+from app.journalisation import configurer_journalisation, arreter_journalisation
+from app.middlewares import (
+    MiddlewareCoalescence,
+    MiddlewareContexte,
+    MiddlewareDelestage,
+    MiddlewareMetriques,
+    MiddlewareRequetesSQL,
+    MiddlewareTracage,
+    enregistrer_routes
+)
+from app.surveillance_boucle import moniteur_boucle
+from app.services.sante import verificateur_sante
+from app.services.websocket import gestionnaire
+from app.profilage import profileur, ProfilEnCours
+from app.tracage import traceur
+from app.schemas.auth import TokenData
+from app.utils.permissions import exiger_permission, exiger_role
 from app.routes import (
     router_auth,
     router_utilisateurs,
@@ -18,6 +40,8 @@ from app.routes import (
     router_websocket
 )
 
+logger = logging.getLogger("app")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -25,22 +49,33 @@ async def lifespan(app: FastAPI):
     Gestionnaire du cycle de vie de l'application
     Exécuté au démarrage et à l'arrêt
     """
-    # Démarrage : création des tables
-    print(" Démarrage de l'application...")
-    creer_tables()
-    print(f" Base de données : {parametres.DATABASE_URL.split('@')[1]}")
+    # Journalisation JSON (thread d'écriture dédié)
+    configurer_journalisation()
     
-    # Exécuter le seed automatiquement au premier démarrage
-    try:
-        from seed import executer_seed
-        executer_seed()
-    except Exception as e:
-        print(f"⚠  Seed déjà exécuté ou erreur: {e}")
+    # Démarrage : création des tables et seed, ignorés si l'empreinte du schéma et du seed n'a pas changé
+    logger.info("Démarrage de l'application...")
+    logger.info("Base de données : %s", make_url(parametres.DATABASE_URL).render_as_string(hide_password=True))
+    from seed import initialiser_base
+    initialiser_base()
+    
+    # Surveillance du retard de la boucle d'événements
+    moniteur_boucle.demarrer()
     
     yield
     
     # Arrêt : nettoyage si nécessaire
-    print(" Arrêt de l'application...")
+    logger.info("Arrêt de l'application...")
+    
+    # Repli hors de serveur.py (qui vide plus tôt) : WebSockets encore ouvertes à l'arrêt du lifespan
+    # (uvicorn lancé seul les ferme déjà en 1012 avant cette étape)
+    await gestionnaire.drainer(parametres.WS_DRAIN_DELAI_SECONDES, parametres.WS_RECONNEXION_ETALEMENT_SECONDES)
+    await moniteur_boucle.arreter()
+    
+    # Exporter les derniers spans en attente
+    traceur.arreter()
+    
+    # Vider la file de journalisation avant de quitter
+    arreter_journalisation()
 
 
 # Création de l'application FastAPI
@@ -51,7 +86,21 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Span racine de chaque requête HTTP (les étapes JWT, RBAC, SQL et diffusion s'y rattachent)
+app.add_middleware(MiddlewareTracage)
+
+# Comptage des requêtes SQL par requête HTTP (en-têtes X-Requetes-SQL en debug)
+app.add_middleware(MiddlewareRequetesSQL)
+
+# Délestage avant tout travail (JWT, base) ; les refus restent comptés par les métriques HTTP
+app.add_middleware(MiddlewareDelestage)
+
+# Lectures identiques simultanées servies par une seule exécution (les suiveuses ne sont pas délestées)
+app.add_middleware(MiddlewareCoalescence)
+
 # Configuration CORS (pour permettre les requêtes depuis un front-end)
+# Ajouté après le délestage et la coalescence pour les envelopper : refus 503 et réponses partagées
+# reçoivent les en-têtes CORS de leur propre requête
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # En production, spécifier les domaines autorisés
@@ -60,6 +109,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Mesure de la latence par route (en dehors de CORS pour compter toute la requête)
+app.add_middleware(MiddlewareMetriques)
+
+# Identifiant de requête / connexion lié aux journaux (le plus externe, pour tout couvrir)
+app.add_middleware(MiddlewareContexte)
+
 # Inclusion des routers
 app.include_router(router_auth)
 app.include_router(router_utilisateurs)
@@ -92,16 +147,79 @@ async def racine():
     }
 
 
+@app.get("/sante/vivant", tags=["Santé"])
+async def verification_vivacite():
+    """
+    Sonde de vivacité : le processus répond et sa boucle d'événements tourne
+    Aucune dépendance externe n'est consultée
+    """
+    return {"status": "vivant"}
+
+
 @app.get("/sante", tags=["Santé"])
+@app.get("/sante/pret", tags=["Santé"])
 async def verification_sante():
     """
-    Endpoint pour vérifier l'état de l'API
+    Sonde de disponibilité : base, pool de connexions, retard de la boucle et WebSockets
+    Résultat mis en cache quelques secondes ; 503 si le worker ne doit plus recevoir de trafic
     """
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "message": "L'API fonctionne correctement"
-    }
+    resultat = await verificateur_sante.disponibilite()
+    return JSONResponse(
+        resultat,
+        status_code=status.HTTP_200_OK if resultat["pret"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+@app.get("/metrics", tags=["Santé"], response_class=PlainTextResponse)
+async def metriques():
+    """
+    Métriques du worker au format d'exposition texte Prometheus
+    """
+    return PlainTextResponse(
+        registre.exposition(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/profilage", tags=["Santé"], response_class=PlainTextResponse)
+async def profiler_worker(
+    duree: float = Query(10.0, gt=0, le=60, description="Durée du profil (secondes)"),
+    frequence: float = Query(100.0, gt=0, le=1000, description="Fréquence d'échantillonnage (Hz)"),
+    utilisateur_courant: TokenData = Depends(exiger_permission("profiler_application"))
+):
+    """
+    Profil par échantillonnage du worker qui reçoit la requête (threads et tâches asyncio)
+    Retourne un fichier "collapsed stacks" (flamegraph.pl, speedscope...)
+    Permission requise : profiler_application
+    """
+    try:
+        profil = await profileur.profiler(duree, frequence)
+    except ProfilEnCours:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Un profil est déjà en cours sur ce worker"
+        )
+    
+    return PlainTextResponse(
+        profil,
+        headers={"Content-Disposition": f'attachment; filename="profil-{os.getpid()}.folded"'}
+    )
+
+
+@app.get("/traces", tags=["Santé"])
+async def traces_recentes(
+    limite: int = Query(20, ge=1, le=200),
+    utilisateur_courant: TokenData = Depends(exiger_role("admin"))
+):
+    """
+    Dernières traces échantillonnées par ce worker (anneau mémoire)
+    Rôle requis : admin
+    """
+    return traceur.memoire.traces(limite)
+
+
+# Pré-enregistrement des histogrammes de latence (une déclinaison par route)
+enregistrer_routes(app.routes)
 
 
 # Point d'entrée pour lancer l'application
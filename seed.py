@@ -1,78 +1,200 @@
-from sqlmodel import Session, select
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 
-from app.database import moteur
+from sqlalchemy import insert, text, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, SQLModel, select
+
+from app.database import moteur, creer_tables
+from app.journalisation import arreter_journalisation, configurer_journalisation
 from app.modeles.role import Role
 from app.modeles.permission import Permission
 from app.modeles.role_permission import RolePermission
 from app.modeles.utilisateur import Utilisateur
 from app.modeles.canal import Canal
+from app.modeles.message import Message
+from app.modeles.empreinte import EmpreinteBase
 from app.services.securite import hacher_mot_de_passe
+from app.services.versions import TABLES_VERSIONNEES, registre_versions
 
 
-def initialiser_permissions(session: Session):
-    """Créer les permissions de base"""
-    permissions_base = [
-        # Permissions utilisateurs
-        {"code": "lire_utilisateurs", "nom": "Lire les utilisateurs", "categorie": "utilisateurs"},
-        {"code": "creer_utilisateurs", "nom": "Créer des utilisateurs", "categorie": "utilisateurs"},
-        {"code": "modifier_utilisateurs", "nom": "Modifier des utilisateurs", "categorie": "utilisateurs"},
-        {"code": "supprimer_utilisateurs", "nom": "Supprimer des utilisateurs", "categorie": "utilisateurs"},
-        
-        # Permissions rôles
-        {"code": "lire_roles", "nom": "Lire les rôles", "categorie": "roles"},
-        {"code": "gerer_roles", "nom": "Gérer les rôles", "categorie": "roles"},
-        
-        # Permissions permissions
-        {"code": "lire_permissions", "nom": "Lire les permissions", "categorie": "permissions"},
-        {"code": "gerer_permissions", "nom": "Gérer les permissions", "categorie": "permissions"},
-        
-        # Permissions canaux
-        {"code": "lire_canaux", "nom": "Lire les canaux", "categorie": "canaux"},
-        {"code": "creer_canaux", "nom": "Créer des canaux", "categorie": "canaux"},
-        {"code": "modifier_canaux", "nom": "Modifier des canaux", "categorie": "canaux"},
-        {"code": "supprimer_canaux", "nom": "Supprimer des canaux", "categorie": "canaux"},
-        
-        # Permissions messages
-        {"code": "lire_messages", "nom": "Lire les messages", "categorie": "messages"},
-        {"code": "envoyer_messages", "nom": "Envoyer des messages", "categorie": "messages"},
-        {"code": "modifier_messages", "nom": "Modifier des messages", "categorie": "messages"},
-        {"code": "supprimer_messages", "nom": "Supprimer des messages", "categorie": "messages"},
-    ]
+logger = logging.getLogger("app.seed")
+
+
+PERMISSIONS_BASE = [
+    # Permissions utilisateurs
+    {"code": "lire_utilisateurs", "nom": "Lire les utilisateurs", "categorie": "utilisateurs"},
+    {"code": "creer_utilisateurs", "nom": "Créer des utilisateurs", "categorie": "utilisateurs"},
+    {"code": "modifier_utilisateurs", "nom": "Modifier des utilisateurs", "categorie": "utilisateurs"},
+    {"code": "supprimer_utilisateurs", "nom": "Supprimer des utilisateurs", "categorie": "utilisateurs"},
     
-    permissions_creees = []
-    for perm_data in permissions_base:
-        # Vérifier si la permission existe déjà
-        statement = select(Permission).where(Permission.code == perm_data["code"])
-        perm_existante = session.exec(statement).first()
-        
-        if not perm_existante:
-            permission = Permission(**perm_data)
-            session.add(permission)
-            permissions_creees.append(perm_data["code"])
+    # Permissions rôles
+    {"code": "lire_roles", "nom": "Lire les rôles", "categorie": "roles"},
+    {"code": "gerer_roles", "nom": "Gérer les rôles", "categorie": "roles"},
+    
+    # Permissions permissions
+    {"code": "lire_permissions", "nom": "Lire les permissions", "categorie": "permissions"},
+    {"code": "gerer_permissions", "nom": "Gérer les permissions", "categorie": "permissions"},
+    
+    # Permissions canaux
+    {"code": "lire_canaux", "nom": "Lire les canaux", "categorie": "canaux"},
+    {"code": "creer_canaux", "nom": "Créer des canaux", "categorie": "canaux"},
+    {"code": "modifier_canaux", "nom": "Modifier des canaux", "categorie": "canaux"},
+    {"code": "supprimer_canaux", "nom": "Supprimer des canaux", "categorie": "canaux"},
+    
+    # Permissions messages
+    {"code": "lire_messages", "nom": "Lire les messages", "categorie": "messages"},
+    {"code": "envoyer_messages", "nom": "Envoyer des messages", "categorie": "messages"},
+    {"code": "modifier_messages", "nom": "Modifier des messages", "categorie": "messages"},
+    {"code": "supprimer_messages", "nom": "Supprimer des messages", "categorie": "messages"},
     
+    # Permissions supervision
+    {"code": "profiler_application", "nom": "Profiler l'application", "categorie": "supervision"},
+]
+
+ROLES_BASE = [
+    {"nom": "admin", "description": "Administrateur avec tous les droits", "rang": 100},
+    {"nom": "moderateur", "description": "Modérateur avec droits limités", "rang": 50},
+    {"nom": "utilisateur", "description": "Utilisateur standard", "rang": 10},
+    {"nom": "invite", "description": "Invité avec accès en lecture seule", "rang": 0},
+]
+
+# Permissions de chaque rôle ; le rôle admin reçoit toutes les permissions existantes
+# (associations seulement ajoutées : celles accordées ensuite par l'API sont conservées)
+ATTRIBUTIONS = {
+    "moderateur": [
+        "lire_utilisateurs",
+        "lire_roles",
+        "lire_permissions",
+        "lire_canaux",
+        "creer_canaux",
+        "modifier_canaux",
+        "lire_messages",
+        "envoyer_messages",
+        "modifier_messages",
+        "supprimer_messages",
+    ],
+    
+    "utilisateur": [
+        "lire_canaux",
+        "lire_messages",
+        "envoyer_messages",
+        "modifier_messages",  # Seulement ses propres messages
+    ],
+    
+    "invite": [
+        "lire_canaux",
+        "lire_messages",
+    ],
+}
+
+CANAUX_BASE = [
+    {"nom": "general", "description": "Canal général pour tous", "type_canal": "public", "role_minimum_requis": None},
+    {"nom": "support", "description": "Canal de support technique", "type_canal": "public", "role_minimum_requis": None},
+    {"nom": "admin", "description": "Canal réservé aux admins", "type_canal": "prive", "role_minimum_requis": "admin"},
+]
+
+ADMIN_PAR_DEFAUT = {
+    "nom_utilisateur": "admin",
+    "email": "admin@example.com",
+    "prenom": "Super",
+    "nom": "Admin",
+}
+MOT_DE_PASSE_ADMIN = "admin123"
+
+# Colonnes ajoutées au schéma après coup : sur les lignes existantes, complétées seulement
+# si elles sont encore vides ou à leur valeur par défaut (ALTER TABLE ... DEFAULT)
+# Les autres colonnes des lignes existantes ne sont jamais réécrites : les modifications faites par l'API sont conservées
+COLONNES_COMPLETEES_ROLES = ("rang",)
+
+# Clé du verrou consultatif PostgreSQL réservé à l'initialisation (valeur arbitraire, fixe)
+CLE_VERROU_SEED = 0x52424143
+
+
+def _inserer_si_absent(session: Session, modele, cle: str, lignes: list) -> list:
+    """
+    Insérer en une instruction les lignes dont `cle` n'existe pas encore
+    Une seule lecture des clés existantes ; ON CONFLICT DO NOTHING couvre une insertion concurrente
+    Retourne les clés insérées
+    """
+    colonne = getattr(modele, cle)
+    valeurs = [ligne[cle] for ligne in lignes]
+    existantes = set(session.exec(select(colonne).where(colonne.in_(valeurs))).all())
+    manquantes = [ligne for ligne in lignes if ligne[cle] not in existantes]
+    if not manquantes:
+        return []
+
+    dialecte = session.connection().dialect.name
+    if dialecte == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as insert_dialecte
+        instruction = insert_dialecte(modele.__table__).on_conflict_do_nothing()
+    elif dialecte == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as insert_dialecte
+        instruction = insert_dialecte(modele.__table__).on_conflict_do_nothing()
+    else:
+        instruction = insert(modele.__table__)
+
+    session.execute(instruction, manquantes)
+    return [ligne[cle] for ligne in manquantes]
+
+
+def _completer_colonnes(session: Session, modele, cle: str, lignes: list, colonnes: tuple) -> list:
+    """
+    Donner les valeurs du seed aux colonnes encore vides ou à leur valeur par défaut des lignes existantes
+    Une lecture pour toutes les lignes, une mise à jour seulement pour celles à compléter
+    Retourne les clés mises à jour
+    """
+    colonne_cle = getattr(modele, cle)
+    actuelles = {
+        ligne[0]: ligne[1:]
+        for ligne in session.exec(
+            select(colonne_cle, *(getattr(modele, colonne) for colonne in colonnes))
+            .where(colonne_cle.in_([ligne[cle] for ligne in lignes]))
+        ).all()
+    }
+    defauts = []
+    for colonne in colonnes:
+        defaut = modele.__table__.c[colonne].default
+        defauts.append(defaut.arg if defaut is not None and defaut.is_scalar else None)
+
+    mises_a_jour = []
+    for ligne in lignes:
+        if ligne[cle] not in actuelles:
+            continue
+        valeurs = {
+            colonne: ligne[colonne]
+            for colonne, actuelle, defaut in zip(colonnes, actuelles[ligne[cle]], defauts)
+            if actuelle in (None, defaut) and actuelle != ligne[colonne]
+        }
+        if valeurs:
+            session.execute(update(modele.__table__).where(colonne_cle == ligne[cle]).values(valeurs))
+            mises_a_jour.append(ligne[cle])
+    if mises_a_jour:
+        logger.info("%s complétés depuis le seed : %s", modele.__tablename__, ", ".join(mises_a_jour))
+    return mises_a_jour
+
+
+def initialiser_permissions(session: Session):
+    """Créer les permissions de base"""
+    permissions_creees = _inserer_si_absent(session, Permission, "code", PERMISSIONS_BASE)
     session.commit()
     return permissions_creees
 
 
 def initialiser_roles(session: Session):
     """Créer les rôles de base"""
-    roles_base = [
-        {"nom": "admin", "description": "Administrateur avec tous les droits"},
-        {"nom": "moderateur", "description": "Modérateur avec droits limités"},
-        {"nom": "utilisateur", "description": "Utilisateur standard"},
-        {"nom": "invite", "description": "Invité avec accès en lecture seule"},
-    ]
-    
-    roles_crees = []
-    for role_data in roles_base:
-        statement = select(Role).where(Role.nom == role_data["nom"])
-        role_existant = session.exec(statement).first()
-        
-        if not role_existant:
-            role = Role(**role_data)
-            session.add(role)
-            roles_crees.append(role_data["nom"])
-    
+    roles_crees = _inserer_si_absent(session, Role, "nom", ROLES_BASE)
+    # Les rôles existants (bases antérieures à la colonne rang) reçoivent aussi leur rang
+    _completer_colonnes(session, Role, "nom", ROLES_BASE, COLONNES_COMPLETEES_ROLES)
     session.commit()
     return roles_crees
 
@@ -80,70 +202,34 @@ def initialiser_roles(session: Session):
 def attribuer_permissions_aux_roles(session: Session):
     """Attribuer les permissions aux rôles"""
     # Récupérer tous les rôles et permissions
-    roles = {role.nom: role for role in session.exec(select(Role)).all()}
-    permissions = {perm.code: perm for perm in session.exec(select(Permission)).all()}
+    roles = dict(session.exec(select(Role.nom, Role.id)).all())
+    permissions = dict(session.exec(select(Permission.code, Permission.id)).all())
     
-    # Définir les permissions pour chaque rôle
-    attributions = {
-        "admin": list(permissions.keys()),  # Admin a toutes les permissions
-        
-        "moderateur": [
-            "lire_utilisateurs",
-            "lire_roles",
-            "lire_permissions",
-            "lire_canaux",
-            "creer_canaux",
-            "modifier_canaux",
-            "lire_messages",
-            "envoyer_messages",
-            "modifier_messages",
-            "supprimer_messages",
-        ],
-        
-        "utilisateur": [
-            "lire_canaux",
-            "lire_messages",
-            "envoyer_messages",
-            "modifier_messages",  # Seulement ses propres messages
-        ],
-        
-        "invite": [
-            "lire_canaux",
-            "lire_messages",
-        ],
+    attributions = {"admin": list(permissions.keys()), **ATTRIBUTIONS}
+    voulues = {
+        (roles[role_nom], permissions[perm_code])
+        for role_nom, permissions_codes in attributions.items() if role_nom in roles
+        for perm_code in permissions_codes if perm_code in permissions
     }
     
-    for role_nom, permissions_codes in attributions.items():
-        if role_nom not in roles:
-            continue
-        
-        role = roles[role_nom]
-        
-        for perm_code in permissions_codes:
-            if perm_code not in permissions:
-                continue
-            
-            permission = permissions[perm_code]
-            
-            # Vérifier si l'association existe déjà
-            statement = select(RolePermission).where(
-                RolePermission.role_id == role.id,
-                RolePermission.permission_id == permission.id
-            )
-            association_existante = session.exec(statement).first()
-            
-            if not association_existante:
-                association = RolePermission(role_id=role.id, permission_id=permission.id)
-                session.add(association)
+    # Associations existantes lues en une fois, les manquantes insérées en une instruction
+    existantes = set(session.exec(select(RolePermission.role_id, RolePermission.permission_id)).all())
+    manquantes = sorted(voulues - existantes)
+    if manquantes:
+        session.execute(insert(RolePermission.__table__), [
+            {"role_id": role_id, "permission_id": permission_id} for role_id, permission_id in manquantes
+        ])
     
     session.commit()
+    return len(manquantes)
 
 
 def creer_utilisateur_admin(session: Session):
     """Créer un utilisateur admin par défaut"""
-    statement = select(Utilisateur).where(Utilisateur.nom_utilisateur == "admin")
+    statement = select(Utilisateur.id).where(Utilisateur.nom_utilisateur == ADMIN_PAR_DEFAUT["nom_utilisateur"])
     admin_existant = session.exec(statement).first()
     
+    # Le hachage bcrypt (volontairement lent) n'est calculé que si l'admin doit être créé
     if not admin_existant:
         # Récupérer le rôle admin
         statement = select(Role).where(Role.nom == "admin")
@@ -151,11 +237,8 @@ def creer_utilisateur_admin(session: Session):
         
         if role_admin:
             admin = Utilisateur(
-                nom_utilisateur="admin",
-                email="admin@example.com",
-                mot_de_passe_hash=hacher_mot_de_passe("admin123"),
-                prenom="Super",
-                nom="Admin",
+                **ADMIN_PAR_DEFAUT,
+                mot_de_passe_hash=hacher_mot_de_passe(MOT_DE_PASSE_ADMIN),
                 role_id=role_admin.id,
                 est_actif=True,
                 est_verifie=True
@@ -169,74 +252,392 @@ def creer_utilisateur_admin(session: Session):
 
 def creer_canaux_par_defaut(session: Session):
     """Créer des canaux par défaut"""
-    canaux_base = [
-        {"nom": "general", "description": "Canal général pour tous", "type_canal": "public"},
-        {"nom": "support", "description": "Canal de support technique", "type_canal": "public"},
-        {"nom": "admin", "description": "Canal réservé aux admins", "type_canal": "prive", "role_minimum_requis": "admin"},
-    ]
-    
-    canaux_crees = []
-    for canal_data in canaux_base:
-        statement = select(Canal).where(Canal.nom == canal_data["nom"])
-        canal_existant = session.exec(statement).first()
-        
-        if not canal_existant:
-            canal = Canal(**canal_data)
-            session.add(canal)
-            canaux_crees.append(canal_data["nom"])
-    
+    canaux_crees = _inserer_si_absent(session, Canal, "nom", CANAUX_BASE)
     session.commit()
     return canaux_crees
 
 
 def executer_seed():
     """Exécuter tous les seeds"""
-    print("Démarrage du seed de la base de données...")
+    logger.info("Démarrage du seed de la base de données")
     
     with Session(moteur) as session:
         # 1. Créer les permissions
-        print("📝 Création des permissions...")
         permissions = initialiser_permissions(session)
-        if permissions:
-            print(f"   {len(permissions)} permissions créées")
-        else:
-            print("   Permissions déjà existantes")
+        logger.info("Permissions : %d créées", len(permissions))
         
         # 2. Créer les rôles
-        print("👥 Création des rôles...")
         roles = initialiser_roles(session)
-        if roles:
-            print(f"    {len(roles)} rôles créés")
-        else:
-            print("   ℹ  Rôles déjà existants")
+        logger.info("Rôles : %d créés", len(roles))
         
         # 3. Attribuer les permissions aux rôles
-        print("🔗 Attribution des permissions aux rôles...")
-        attribuer_permissions_aux_roles(session)
-        print("   ✅ Permissions attribuées")
+        attributions = attribuer_permissions_aux_roles(session)
+        logger.info("Permissions attribuées aux rôles : %d nouvelles associations", attributions)
         
         # 4. Créer l'utilisateur admin
-        print("👤 Création de l'utilisateur admin...")
-        admin_cree = creer_utilisateur_admin(session)
-        if admin_cree:
-            print("    Admin créé (login: admin, password: admin123)")
-        else:
-            print("   ℹ  Admin déjà existant")
+        if creer_utilisateur_admin(session):
+            logger.warning("Utilisateur admin créé avec le mot de passe par défaut : à changer en production")
         
         # 5. Créer les canaux par défaut
-        print("💬 Création des canaux par défaut...")
         canaux = creer_canaux_par_defaut(session)
-        if canaux:
-            print(f"    {len(canaux)} canaux créés")
-        else:
-            print("   ℹ  Canaux déjà existants")
+        logger.info("Canaux : %d créés", len(canaux))
+        
+        # 6. Nouvelles versions des tables de référence (ETags et caches des workers)
+        registre_versions.incrementer(session, *TABLES_VERSIONNEES)
+        session.commit()
     
-    print("\n Seed terminé avec succès!")
-    print("\n Informations de connexion admin:")
-    print("   Nom d'utilisateur: admin")
-    print("   Mot de passe: admin123")
-    print("   ⚠  Changez ce mot de passe en production!")
+    logger.info("Seed terminé")
+
+
+# ---------------------------------------------------------------------------
+# Démarrage rapide : empreinte du schéma et du seed, initialisation par un seul worker
+# ---------------------------------------------------------------------------
+
+def calculer_empreinte() -> str:
+    """SHA-256 de la description des tables (colonnes, types, index) et des données de base"""
+    schema = [
+        {
+            "table": table.name,
+            "colonnes": [
+                [colonne.name, str(colonne.type), colonne.nullable, colonne.primary_key, bool(colonne.unique)]
+                for colonne in table.columns
+            ],
+            "index": sorted(index.name for index in table.indexes)
+        }
+        for table in SQLModel.metadata.sorted_tables
+    ]
+    donnees = {
+        "schema": schema,
+        "permissions": PERMISSIONS_BASE,
+        "roles": ROLES_BASE,
+        "attributions": ATTRIBUTIONS,
+        "canaux": CANAUX_BASE,
+        "admin": ADMIN_PAR_DEFAUT
+    }
+    return hashlib.sha256(json.dumps(donnees, sort_keys=True).encode()).hexdigest()
+
+
+def lire_empreinte():
+    """Empreinte enregistrée, None si absente (y compris base vide sans la table)"""
+    try:
+        with Session(moteur) as session:
+            return session.exec(select(EmpreinteBase.empreinte).where(EmpreinteBase.cle == "seed")).first()
+    except SQLAlchemyError:
+        return None
+
+
+def enregistrer_empreinte(empreinte: str) -> None:
+    with Session(moteur) as session:
+        ligne = session.get(EmpreinteBase, "seed")
+        if ligne is None:
+            ligne = EmpreinteBase(cle="seed", empreinte=empreinte)
+        else:
+            ligne.empreinte = empreinte
+            ligne.date_modification = datetime.utcnow()
+        session.add(ligne)
+        session.commit()
+
+
+@contextmanager
+def verrou_initialisation():
+    """
+    Un seul worker initialise la base à la fois ; les autres attendent puis relisent l'empreinte
+    PostgreSQL : verrou consultatif de session ; SQLite : verrou de fichier à côté de la base
+    """
+    if moteur.dialect.name == "postgresql":
+        with moteur.connect() as connexion:
+            connexion.execute(text("SELECT pg_advisory_lock(:cle)"), {"cle": CLE_VERROU_SEED})
+            try:
+                yield
+            finally:
+                connexion.execute(text("SELECT pg_advisory_unlock(:cle)"), {"cle": CLE_VERROU_SEED})
+                connexion.commit()
+        return
+
+    fichier_base = moteur.url.database if moteur.dialect.name == "sqlite" else None
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if not fichier_base or fichier_base == ":memory:" or fcntl is None:
+        yield
+        return
+
+    with open(f"{fichier_base}.seed.lock", "w") as verrou:
+        fcntl.flock(verrou, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(verrou, fcntl.LOCK_UN)
+
+
+def initialiser_base() -> bool:
+    """
+    Création des tables et seed au démarrage, seulement si le schéma ou les données de base ont changé
+    Cas courant (empreinte inchangée) : une seule requête, aucun hachage bcrypt
+    Retourne True si l'initialisation a été exécutée par ce processus
+    """
+    empreinte = calculer_empreinte()
+    if lire_empreinte() == empreinte:
+        logger.info("Schéma et données de base à jour (empreinte %s), seed ignoré", empreinte[:12])
+        return False
+
+    with verrou_initialisation():
+        # Un autre worker a pu terminer l'initialisation pendant l'attente du verrou
+        if lire_empreinte() == empreinte:
+            logger.info("Base initialisée par un autre worker")
+            return False
+
+        creer_tables()
+        try:
+            executer_seed()
+        except Exception as e:
+            # Empreinte non enregistrée : le prochain démarrage retentera le seed
+            logger.warning("Seed interrompu : %s", e)
+            return True
+
+        enregistrer_empreinte(empreinte)
+        logger.info("Base initialisée (empreinte %s)", empreinte[:12])
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Générateur de données synthétiques (jeu de données à l'échelle de la production)
+# ---------------------------------------------------------------------------
+
+PRENOMS = [
+    "Camille", "Léa", "Manon", "Chloé", "Inès", "Jade", "Louise", "Emma", "Alice", "Lina",
+    "Lucas", "Hugo", "Louis", "Gabriel", "Arthur", "Jules", "Adam", "Raphaël", "Nathan", "Théo",
+    "Yanis", "Sarah", "Nour", "Moussa", "Awa", "Mehdi", "Sofia", "Tom", "Zoé", "Noah"
+]
+NOMS = [
+    "Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau",
+    "Simon", "Laurent", "Lefebvre", "Michel", "Garcia", "David", "Bertrand", "Roux", "Vincent", "Fournier",
+    "Diallo", "Nguyen", "Benali", "Traoré", "Mercier", "Blanc", "Guerin", "Faure", "Andre", "Chevalier"
+]
+MOTS = (
+    "bonjour merci le la les un une des de du et ou mais donc pour avec sans sur sous dans "
+    "projet réunion demain aujourd'hui hier version bug correctif déploiement serveur base "
+    "client ticket urgent question réponse idée proposition valider relire tester fusionner "
+    "je tu il nous vous ils est sont a ont fait faire voir pense crois peut doit va vais "
+    "bien super top ok d'accord parfait attention problème solution lien document fichier "
+    "page écran utilisateur canal message rôle permission accès compte mot passe connexion"
+).split()
+SUJETS_CANAUX = [
+    "general", "support", "dev", "ops", "produit", "design", "ventes", "marketing", "rh", "data",
+    "securite", "mobile", "web", "api", "infra", "qa", "juridique", "finance", "achats", "evenements"
+]
+
+# Mot de passe commun à tous les comptes générés (un seul hachage bcrypt pour tout le jeu)
+MOT_DE_PASSE_SYNTHETIQUE = "motdepasse123"
+
+# Date de fin des messages : fixe pour que le jeu soit reproductible d'un jour à l'autre
+DATE_FIN_SYNTHETIQUE = datetime(2025, 1, 1)
+
+
+def _poids_cumules(nombre: int, asymetrie: float) -> list:
+    """Poids cumulés d'une loi de Zipf : le rang i reçoit 1 / i^asymetrie"""
+    return list(itertools.accumulate(1.0 / (rang ** asymetrie) for rang in range(1, nombre + 1)))
+
+
+def _inserer_en_masse(session: Session, modele, colonnes: list, lignes) -> int:
+    """
+    Insertion par lots : COPY sur PostgreSQL, INSERT multi-lignes ailleurs
+    `lignes` est un itérable de tuples dans l'ordre de `colonnes`
+    """
+    lignes = list(lignes)
+    if not lignes:
+        return 0
+
+    connexion = session.connection()
+    if connexion.dialect.name == "postgresql":
+        tampon = io.StringIO()
+        csv.writer(tampon).writerows(
+            ["\\N" if valeur is None else valeur for valeur in ligne] for ligne in lignes
+        )
+        tampon.seek(0)
+        with connexion.connection.cursor() as curseur:
+            curseur.copy_expert(
+                f"COPY {modele.__tablename__} ({', '.join(colonnes)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                tampon
+            )
+    else:
+        session.execute(insert(modele.__table__), [dict(zip(colonnes, ligne)) for ligne in lignes])
+
+    return len(lignes)
+
+
+def _par_lots(iterable, taille: int):
+    iterateur = iter(iterable)
+    while True:
+        lot = list(itertools.islice(iterateur, taille))
+        if not lot:
+            return
+        yield lot
+
+
+def generer_donnees_synthetiques(
+    nb_utilisateurs: int,
+    nb_canaux: int,
+    messages_par_canal: int,
+    asymetrie: float = 1.1,
+    graine: int = 42,
+    taille_lot: int = 10000,
+    jours: int = 180
+):
+    """
+    Générer un jeu de données réaliste et reproductible (même graine = mêmes lignes)
+    Distribution asymétrique (Zipf) : quelques canaux et auteurs concentrent l'essentiel des messages
+    """
+    rng = random.Random(graine)
+    debut_generation = time.perf_counter()
+    prefixe = f"synth{graine}"
+
+    with Session(moteur) as session:
+        roles = {role.nom: role.id for role in session.exec(select(Role)).all()}
+        if not roles:
+            raise RuntimeError("Aucun rôle en base : exécuter d'abord le seed de base")
+
+        # 1. Utilisateurs : 88 % utilisateur, 8 % invité, 4 % modérateur
+        print(f"👤 Génération de {nb_utilisateurs} utilisateurs...")
+        hash_commun = hacher_mot_de_passe(MOT_DE_PASSE_SYNTHETIQUE)
+        noms_roles = ["utilisateur", "invite", "moderateur"]
+        poids_roles = [88, 8, 4]
+        colonnes = [
+            "nom_utilisateur", "email", "mot_de_passe_hash", "prenom", "nom", "est_actif",
+            "est_verifie", "role_id", "date_creation", "date_modification"
+        ]
+
+        def lignes_utilisateurs():
+            for i in range(nb_utilisateurs):
+                prenom, nom = rng.choice(PRENOMS), rng.choice(NOMS)
+                role = rng.choices(noms_roles, poids_roles)[0]
+                date = DATE_FIN_SYNTHETIQUE - timedelta(days=jours + rng.random() * 365)
+                yield (
+                    f"{prefixe}_{i:07d}", f"{prefixe}_{i:07d}@example.com", hash_commun, prenom, nom,
+                    rng.random() > 0.02, rng.random() > 0.3, roles.get(role), date, date
+                )
+
+        total = 0
+        for lot in _par_lots(lignes_utilisateurs(), taille_lot):
+            total += _inserer_en_masse(session, Utilisateur, colonnes, lot)
+        session.commit()
+        print(f"    {total} utilisateurs insérés")
+
+        ids_utilisateurs = list(session.exec(
+            select(Utilisateur.id).where(Utilisateur.nom_utilisateur.like(f"{prefixe}\\_%", escape="\\")).order_by(Utilisateur.id)
+        ).all())
+
+        # 2. Canaux : 85 % ouverts, 12 % réservés aux modérateurs, 3 % aux admins
+        print(f"💬 Génération de {nb_canaux} canaux...")
+        colonnes = [
+            "nom", "description", "type_canal", "role_minimum_requis", "est_actif",
+            "createur_id", "date_creation", "date_modification"
+        ]
+
+        def lignes_canaux():
+            for i in range(nb_canaux):
+                restriction = rng.choices([None, "moderateur", "admin"], [85, 12, 3])[0]
+                date = DATE_FIN_SYNTHETIQUE - timedelta(days=jours + rng.random() * 30)
+                yield (
+                    f"{prefixe}-{rng.choice(SUJETS_CANAUX)}-{i:05d}", f"Canal synthétique {i}",
+                    "prive" if restriction else "public", restriction, True,
+                    rng.choice(ids_utilisateurs) if ids_utilisateurs else None, date, date
+                )
+
+        total = 0
+        for lot in _par_lots(lignes_canaux(), taille_lot):
+            total += _inserer_en_masse(session, Canal, colonnes, lot)
+        registre_versions.incrementer(session, "canaux")
+        session.commit()
+        print(f"    {total} canaux insérés")
+
+        ids_canaux = list(session.exec(
+            select(Canal.id).where(Canal.nom.like(f"{prefixe}-%")).order_by(Canal.id)
+        ).all())
+
+        # 3. Messages : volume par canal et activité par auteur suivent une loi de Zipf
+        nb_messages = len(ids_canaux) * messages_par_canal
+        print(f"📝 Génération de {nb_messages} messages (asymétrie {asymetrie})...")
+        if not ids_canaux or not ids_utilisateurs or not nb_messages:
+            print("   ℹ  Aucun message à générer")
+            return
+
+        poids_canaux = _poids_cumules(len(ids_canaux), asymetrie)
+        volumes = [0] * len(ids_canaux)
+        for indice in rng.choices(range(len(ids_canaux)), cum_weights=poids_canaux, k=nb_messages):
+            volumes[indice] += 1
+
+        # Les auteurs les plus actifs sont répartis au hasard parmi les identifiants
+        auteurs = ids_utilisateurs[:]
+        rng.shuffle(auteurs)
+        poids_auteurs = _poids_cumules(len(auteurs), asymetrie)
+        duree_totale = jours * 86400
+        colonnes = [
+            "contenu", "auteur_id", "canal_id", "est_modifie", "est_supprime",
+            "type_message", "url_fichier", "date_creation", "date_modification"
+        ]
+
+        def lignes_messages():
+            for canal_id, volume in zip(ids_canaux, volumes):
+                if not volume:
+                    continue
+                # Horodatages croissants dans le canal : l'ordre des id suit l'ordre chronologique
+                decalages = sorted(rng.random() * duree_totale for _ in range(volume))
+                ids_auteurs = rng.choices(auteurs, cum_weights=poids_auteurs, k=volume)
+                for decalage, auteur_id in zip(decalages, ids_auteurs):
+                    longueur = min(60, max(1, int(rng.lognormvariate(2.0, 0.8))))
+                    contenu = " ".join(rng.choices(MOTS, k=longueur)).capitalize()
+                    date = DATE_FIN_SYNTHETIQUE - timedelta(seconds=duree_totale - decalage)
+                    est_modifie = rng.random() < 0.05
+                    yield (
+                        contenu, auteur_id, canal_id, est_modifie, rng.random() < 0.01, "texte", None,
+                        date, date + timedelta(minutes=5) if est_modifie else None
+                    )
+
+        total = 0
+        for lot in _par_lots(lignes_messages(), taille_lot):
+            total += _inserer_en_masse(session, Message, colonnes, lot)
+            session.commit()
+            if total % (taille_lot * 10) == 0:
+                print(f"   … {total}/{nb_messages}")
+        print(f"    {total} messages insérés")
+
+    print(f"\n Génération terminée en {time.perf_counter() - debut_generation:.1f} s")
+    print(f"   Comptes générés : {prefixe}_0000000 … (mot de passe : {MOT_DE_PASSE_SYNTHETIQUE})")
 
 
 if __name__ == "__main__":
-    executer_seed()
+    analyseur = argparse.ArgumentParser(description="Seed de la base et génération de données synthétiques")
+    analyseur.add_argument("--generer", action="store_true", help="Générer un jeu de données synthétique après le seed")
+    analyseur.add_argument("--utilisateurs", type=int, default=10000, help="Nombre d'utilisateurs générés")
+    analyseur.add_argument("--canaux", type=int, default=200, help="Nombre de canaux générés")
+    analyseur.add_argument("--messages-par-canal", type=int, default=500, help="Nombre moyen de messages par canal")
+    analyseur.add_argument("--asymetrie", type=float, default=1.1, help="Exposant de Zipf (0 = uniforme)")
+    analyseur.add_argument("--graine", type=int, default=42, help="Graine du générateur pseudo-aléatoire")
+    analyseur.add_argument("--taille-lot", type=int, default=10000, help="Lignes par insertion en masse")
+    analyseur.add_argument("--jours", type=int, default=180, help="Période couverte par les messages")
+    arguments = analyseur.parse_args()
+    
+    # Journaux du seed sur la sortie standard, comme dans l'application
+    configurer_journalisation()
+    
+    # Lancé seul (sans l'application), le script doit pouvoir partir d'une base vide
+    # Le seed complet est toujours rejoué ; l'empreinte enregistrée évite de le refaire au démarrage
+    with verrou_initialisation():
+        creer_tables()
+        executer_seed()
+        enregistrer_empreinte(calculer_empreinte())
+    # Journaux écrits avant la sortie console du générateur
+    arreter_journalisation()
+    
+    if arguments.generer:
+        generer_donnees_synthetiques(
+            nb_utilisateurs=arguments.utilisateurs,
+            nb_canaux=arguments.canaux,
+            messages_par_canal=arguments.messages_par_canal,
+            asymetrie=arguments.asymetrie,
+            graine=arguments.graine,
+            taille_lot=arguments.taille_lot,
+            jours=arguments.jours
+        )
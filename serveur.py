@@ -0,0 +1,200 @@
+"""
+Lanceur de production : N workers uvicorn qui partagent le même socket d'écoute
+Supervision (relance des workers arrêtés), redémarrage progressif sur SIGHUP, arrêt propre sur SIGTERM / SIGINT
+
+Exemple :
+    python serveur.py --workers 4
+    kill -HUP <pid du superviseur>     # redémarrer les workers un par un, sans coupure
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+
+logger = logging.getLogger("serveur")
+
+# Processus créés par "spawn" : chaque worker importe l'application (et crée son moteur) après le démarrage,
+# rien de ce qui est ouvert par le superviseur (connexions, threads) n'est hérité
+contexte = multiprocessing.get_context("spawn")
+
+
+def nombre_workers_par_defaut() -> int:
+    """WORKERS, sinon le nombre de cœurs réellement attribués au processus (cpuset du conteneur)"""
+    configure = int(os.environ.get("WORKERS", "0") or 0)
+    if configure > 0:
+        return configure
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class _ServeurSignale(uvicorn.Server):
+    """Serveur uvicorn qui signale au superviseur la fin de son démarrage (lifespan compris)"""
+
+    def __init__(self, config: uvicorn.Config, pret):
+        super().__init__(config)
+        self.pret = pret
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if not self.should_exit:
+            self.pret.set()
+
+    async def shutdown(self, sockets=None) -> None:
+        """
+        Uvicorn ferme les WebSockets sans préavis (code 1012) avant le lifespan de l'application :
+        on cesse d'accepter des connexions puis on les vide nous-mêmes avant de lui rendre la main
+        """
+        from app.config import parametres
+        from app.services.websocket import gestionnaire
+
+        for serveur in self.servers:
+            serveur.close()
+        await gestionnaire.drainer(parametres.WS_DRAIN_DELAI_SECONDES, parametres.WS_RECONNEXION_ETALEMENT_SECONDES)
+        await super().shutdown(sockets=sockets)
+
+
+def _executer_worker(options: dict, sockets: list, worker_id: str, pret) -> None:
+    # Groupe de processus propre : le Ctrl-C du terminal n'atteint que le superviseur, qui transmet
+    # un seul SIGTERM (un second signal ferait quitter uvicorn au milieu du vidage)
+    os.setpgrp()
+    # Lu par app.config à l'import de l'application : journaux et métriques portent l'identifiant
+    os.environ["WORKER_ID"] = worker_id
+    config = uvicorn.Config("main:app", **options)
+    _ServeurSignale(config, pret).run(sockets=sockets)
+
+
+class Worker:
+
+    def __init__(self, worker_id: str, processus, pret):
+        self.worker_id = worker_id
+        self.processus = processus
+        self.pret = pret
+        self.demarrage = time.monotonic()
+
+
+class Superviseur:
+
+    def __init__(self, nb_workers: int, hote: str, port: int, delai_arret: float):
+        self.nb_workers = nb_workers
+        self.delai_arret = delai_arret
+        self.options = {
+            "host": hote,
+            "port": port,
+            "proxy_headers": True,
+            "timeout_graceful_shutdown": delai_arret,
+        }
+        self.sockets = [uvicorn.Config("main:app", host=hote, port=port).bind_socket()]
+        self.workers: Dict[str, Worker] = {}
+        self.arret = False
+        self.redemarrage = False
+
+    def lancer(self, worker_id: str) -> Worker:
+        pret = contexte.Event()
+        processus = contexte.Process(
+            target=_executer_worker,
+            args=(self.options, self.sockets, worker_id, pret),
+            name=f"worker-{worker_id}"
+        )
+        processus.start()
+        logger.info("Worker %s démarré (pid %s)", worker_id, processus.pid)
+        return Worker(worker_id, processus, pret)
+
+    def arreter_worker(self, worker: Worker, signaler: bool = True) -> None:
+        """SIGTERM puis attente de l'arrêt propre ; au-delà du délai, le worker est tué"""
+        # Un second SIGTERM forcerait uvicorn à quitter sans attendre : un seul envoi par worker
+        if signaler and worker.processus.is_alive():
+            worker.processus.terminate()
+        worker.processus.join(self.delai_arret + 5)
+        if worker.processus.is_alive():
+            logger.warning("Worker %s toujours actif après %.0f s, arrêt forcé", worker.worker_id, self.delai_arret)
+            worker.processus.kill()
+            worker.processus.join()
+
+    def redemarrer_progressivement(self) -> None:
+        """Un worker à la fois : le remplaçant doit être prêt avant l'arrêt de l'ancien"""
+        logger.info("Redémarrage progressif de %d workers", len(self.workers))
+        for worker_id in sorted(self.workers):
+            if self.arret:
+                return
+            ancien = self.workers[worker_id]
+            nouveau = self.lancer(worker_id)
+            if not nouveau.pret.wait(60):
+                logger.error("Le remplaçant du worker %s n'a pas démarré, ancien worker conservé", worker_id)
+                self.arreter_worker(nouveau)
+                continue
+            self.workers[worker_id] = nouveau
+            self.arreter_worker(ancien)
+
+    def surveiller(self) -> None:
+        """Relancer les workers arrêtés (attente d'une seconde si le worker est mort au démarrage)"""
+        for worker_id, worker in list(self.workers.items()):
+            if worker.processus.is_alive() or self.arret:
+                continue
+            logger.warning("Worker %s arrêté (code %s), relance", worker_id, worker.processus.exitcode)
+            if time.monotonic() - worker.demarrage < 1:
+                time.sleep(1)
+            self.workers[worker_id] = self.lancer(worker_id)
+
+    def executer(self) -> None:
+        signal.signal(signal.SIGTERM, self._demander_arret)
+        signal.signal(signal.SIGINT, self._demander_arret)
+        signal.signal(signal.SIGHUP, self._demander_redemarrage)
+
+        logger.info(
+            "Superviseur démarré (pid %s), %d workers sur %s:%s",
+            os.getpid(), self.nb_workers, self.options["host"], self.options["port"]
+        )
+        for numero in range(self.nb_workers):
+            worker_id = str(numero)
+            self.workers[worker_id] = self.lancer(worker_id)
+
+        while not self.arret:
+            time.sleep(0.5)
+            if self.redemarrage:
+                self.redemarrage = False
+                self.redemarrer_progressivement()
+            self.surveiller()
+
+        logger.info("Arrêt des workers...")
+        for worker in self.workers.values():
+            if worker.processus.is_alive():
+                worker.processus.terminate()
+        for worker in self.workers.values():
+            self.arreter_worker(worker, signaler=False)
+        logger.info("Superviseur arrêté")
+
+    def _demander_arret(self, signum, frame) -> None:
+        self.arret = True
+
+    def _demander_redemarrage(self, signum, frame) -> None:
+        self.redemarrage = True
+
+
+def main(arguments: Optional[list] = None) -> None:
+    analyseur = argparse.ArgumentParser(description="Lanceur de production multi-workers")
+    analyseur.add_argument("--hote", default=os.environ.get("HOTE", "0.0.0.0"))
+    analyseur.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    analyseur.add_argument(
+        "--workers", type=int, default=nombre_workers_par_defaut(),
+        help="Nombre de workers (défaut : $WORKERS ou nombre de cœurs attribués)"
+    )
+    analyseur.add_argument(
+        "--delai-arret", type=float, default=float(os.environ.get("ARRET_DELAI_SECONDES", "30")),
+        help="Délai accordé à un worker pour s'arrêter proprement (secondes)"
+    )
+    options = analyseur.parse_args(arguments)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    Superviseur(max(options.workers, 1), options.hote, options.port, options.delai_arret).executer()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Fixtures des tests : base SQLite jetable initialisée par le lifespan, clients authentifiés
+La configuration est fixée avant l'import de l'application (lue une seule fois par app.config)
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+_DOSSIER = tempfile.mkdtemp(prefix="tests-chat-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DOSSIER}/tests.sqlite"
+os.environ["SECRET_KEY"] = "tests"
+os.environ["LOG_NIVEAU"] = "WARNING"
+# TestClient exécute bcrypt sur la boucle : le délestage prendrait ce retard pour une surcharge
+os.environ["DELESTAGE_ACTIF"] = "false"
+os.environ["LOGIN_MAX_TENTATIVES_IP"] = "100000"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+MOT_DE_PASSE = "motdepasse-tests"
+
+
+def connecter(client: TestClient, nom_utilisateur: str, mot_de_passe: str = MOT_DE_PASSE) -> dict:
+    reponse = client.post("/auth/login", data={"username": nom_utilisateur, "password": mot_de_passe})
+    assert reponse.status_code == 200, reponse.text
+    return reponse.json()
+
+
+def entetes(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def entetes_admin(client) -> dict:
+    return entetes(connecter(client, "admin", "admin123"))
+
+
+@pytest.fixture(scope="session")
+def roles(client, entetes_admin) -> dict:
+    """nom du rôle -> id"""
+    return {role["nom"]: role["id"] for role in client.get("/roles/", headers=entetes_admin).json()}
+
+
+@pytest.fixture
+def creer_utilisateur(client, entetes_admin, roles):
+    """Fabrique : crée un compte du rôle demandé et retourne (nom d'utilisateur, id)"""
+
+    def creer(role: str = "utilisateur", **champs) -> tuple:
+        nom = f"test-{uuid.uuid4().hex[:12]}"
+        reponse = client.post("/utilisateurs/", headers=entetes_admin, json={
+            "nom_utilisateur": nom,
+            "email": f"{nom}@example.com",
+            "mot_de_passe": MOT_DE_PASSE,
+            "role_id": roles[role],
+            **champs
+        })
+        assert reponse.status_code == 201, reponse.text
+        return nom, reponse.json()["id"]
+
+    return creer
+
+
+@pytest.fixture(scope="session")
+def canaux(client, entetes_admin) -> dict:
+    """nom du canal -> id (canaux du seed)"""
+    return {canal["nom"]: canal["id"] for canal in client.get("/canaux/", headers=entetes_admin).json()}
@@ -0,0 +1,103 @@
+"""
+Authentification : refresh tokens (rotation, réutilisation), déconnexion et révocation des tokens d'accès
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.database import moteur
+from app.services import auth
+from app.services.revocation import registre_revocations, revoquer_token_acces
+from tests.conftest import connecter, entetes
+
+
+def _rafraichir(client, refresh_token: str):
+    return client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+
+def test_rotation_du_refresh_token(client, creer_utilisateur):
+    nom, _ = creer_utilisateur()
+    tokens = connecter(client, nom)
+
+    reponse = _rafraichir(client, tokens["refresh_token"])
+    assert reponse.status_code == 200
+    nouveaux = reponse.json()
+    assert nouveaux["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/auth/moi", headers=entetes(nouveaux)).status_code == 200
+
+
+def test_reutilisation_revoque_toute_la_famille(client, creer_utilisateur):
+    nom, _ = creer_utilisateur()
+    tokens = connecter(client, nom)
+    nouveaux = _rafraichir(client, tokens["refresh_token"]).json()
+
+    # Rejeu de l'ancien token (vol présumé) : refusé, et le token légitime de la chaîne aussi
+    assert _rafraichir(client, tokens["refresh_token"]).status_code == 401
+    assert _rafraichir(client, nouveaux["refresh_token"]).status_code == 401
+
+
+def test_logout_revoque_token_acces_et_refresh(client, creer_utilisateur):
+    nom, _ = creer_utilisateur()
+    tokens = connecter(client, nom)
+
+    reponse = client.post("/auth/logout", headers=entetes(tokens), json={"refresh_token": tokens["refresh_token"]})
+    assert reponse.status_code == 200
+    assert client.get("/auth/moi", headers=entetes(tokens)).status_code == 401
+    assert _rafraichir(client, tokens["refresh_token"]).status_code == 401
+
+
+def test_logout_avec_token_acces_invalide_revoque_le_refresh(client, creer_utilisateur):
+    nom, _ = creer_utilisateur()
+    tokens = connecter(client, nom)
+
+    # Cas courant : token d'accès expiré (ici illisible) au moment de la déconnexion
+    reponse = client.post(
+        "/auth/logout", headers={"Authorization": "Bearer illisible"}, json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert reponse.status_code == 200
+    assert _rafraichir(client, tokens["refresh_token"]).status_code == 401
+
+
+def test_desactivation_coupe_les_sessions(client, entetes_admin, creer_utilisateur):
+    nom, utilisateur_id = creer_utilisateur()
+    tokens = connecter(client, nom)
+
+    assert client.patch(
+        f"/utilisateurs/{utilisateur_id}", headers=entetes_admin, json={"est_actif": False}
+    ).status_code == 200
+    assert client.get("/auth/moi", headers=entetes(tokens)).status_code == 401
+    assert _rafraichir(client, tokens["refresh_token"]).status_code in (401, 403)
+
+
+def test_revocation_appliquee_au_commit_seulement(client):
+    expiration = datetime.utcnow() + timedelta(minutes=5)
+    annule, valide = uuid.uuid4().hex, uuid.uuid4().hex
+    with Session(moteur) as session:
+        revoquer_token_acces(session, annule, expiration)
+        assert not registre_revocations.est_revoque(annule, None, None)
+        session.rollback()
+        revoquer_token_acces(session, valide, expiration)
+        session.commit()
+
+    assert not registre_revocations.est_revoque(annule, None, None)
+    assert registre_revocations.est_revoque(valide, None, None)
+
+
+def test_verification_du_mot_de_passe_hors_de_la_boucle(client, creer_utilisateur, monkeypatch):
+    # bcrypt bloquerait la boucle d'événements de tout le worker pendant le hachage
+    nom, _ = creer_utilisateur()
+    boucles = []
+    verifier = auth.verifier_mot_de_passe
+
+    def verifier_sans_boucle(mot_de_passe, mot_de_passe_hash):
+        try:
+            boucles.append(asyncio.get_running_loop())
+        except RuntimeError:
+            boucles.append(None)
+        return verifier(mot_de_passe, mot_de_passe_hash)
+
+    monkeypatch.setattr(auth, "verifier_mot_de_passe", verifier_sans_boucle)
+    connecter(client, nom)
+    assert boucles == [None]
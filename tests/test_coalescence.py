@@ -0,0 +1,56 @@
+"""
+Coalescence des lectures : une exécution par clé (chemin, paramètres, rôle, If-None-Match)
+"""
+import asyncio
+
+from app.middlewares.coalescence import MiddlewareCoalescence
+from tests.conftest import connecter
+
+
+def _scope(token: str, chemin: str = "/canaux/", query: bytes = b"") -> dict:
+    return {
+        "type": "http", "method": "GET", "path": chemin, "query_string": query,
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    }
+
+
+async def _executer(middleware, scopes):
+
+    async def recevoir():
+        return {"type": "http.request", "body": b""}
+
+    async def une(scope):
+        messages = []
+
+        async def envoyer(message):
+            messages.append(message)
+
+        await middleware(scope, recevoir, envoyer)
+        return b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+
+    return await asyncio.gather(*(une(scope) for scope in scopes))
+
+
+def test_une_execution_par_role(client, entetes_admin, creer_utilisateur):
+    admin = entetes_admin["Authorization"].split()[1]
+    admin_bis = connecter(client, "admin", "admin123")["access_token"]
+    nom, _ = creer_utilisateur("invite")
+    invite = connecter(client, nom)["access_token"]
+    executions = []
+
+    async def application(scope, receive, send):
+        executions.append(scope)
+        corps = f"execution-{len(executions)}".encode()
+        # Toutes les requêtes arrivent pendant l'exécution du meneur
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": corps})
+
+    corps = asyncio.run(_executer(MiddlewareCoalescence(application), [
+        _scope(admin), _scope(admin_bis), _scope(invite), _scope(admin, query=b"skip=10"),
+    ]))
+
+    assert len(executions) == 3
+    # Deux tokens du même rôle partagent la réponse, jamais un autre rôle ou d'autres paramètres
+    assert corps[0] == corps[1]
+    assert len({corps[0], corps[2], corps[3]}) == 3
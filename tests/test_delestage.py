@@ -0,0 +1,53 @@
+"""
+Délestage : signal de retard de la boucle
+"""
+import time
+
+from app.config import parametres
+from app.middlewares.delestage import SEUILS_CLASSES
+from app.surveillance_boucle import MoniteurBoucle
+
+
+def _moniteur() -> MoniteurBoucle:
+    moniteur = MoniteurBoucle()
+    # Sonde considérée comme démarrée, sans blocage en cours
+    moniteur.tache = object()
+    moniteur.battement = time.perf_counter()
+    return moniteur
+
+
+def test_pic_isole_ne_deleste_pas():
+    moniteur = _moniteur()
+    # Un login (bcrypt) bloque la boucle environ 0,2 s
+    moniteur._mesurer(0.2)
+    assert moniteur.dernier_retard == 0.2
+    niveau = moniteur.retard_recent() / parametres.DELESTAGE_RETARD_BOUCLE_SECONDES
+    assert niveau < SEUILS_CLASSES["basse"]
+
+
+def test_retard_soutenu_deleste():
+    moniteur = _moniteur()
+    for _ in range(10):
+        moniteur._mesurer(0.3)
+    niveau = moniteur.retard_recent() / parametres.DELESTAGE_RETARD_BOUCLE_SECONDES
+    assert niveau >= SEUILS_CLASSES["basse"]
+
+
+def test_retard_decroit_sans_mesure():
+    moniteur = _moniteur()
+    for _ in range(10):
+        moniteur._mesurer(0.3)
+    avant = moniteur.retard_recent()
+    moniteur._mise_a_jour -= MoniteurBoucle.CONSTANTE_TEMPS_SECONDES
+    assert moniteur.retard_recent() < avant / 2
+
+
+def test_refus_503_porte_les_entetes_cors(client, monkeypatch):
+    from app.middlewares import delestage
+
+    monkeypatch.setattr(parametres, "DELESTAGE_ACTIF", True)
+    monkeypatch.setattr(delestage, "niveau_surcharge", lambda: (5.0, "retard_boucle"))
+    reponse = client.get("/roles/", headers={"Origin": "https://front.exemple"})
+    assert reponse.status_code == 503
+    assert reponse.headers["retry-after"]
+    assert "access-control-allow-origin" in reponse.headers
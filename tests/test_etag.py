@@ -0,0 +1,54 @@
+"""
+Requêtes conditionnelles : ETag des listes de référence et des canaux
+"""
+import uuid
+
+from tests.conftest import connecter, entetes
+
+
+def test_liste_non_modifiee_puis_modifiee(client, entetes_admin):
+    premiere = client.get("/roles/", headers=entetes_admin)
+    etag = premiere.headers["etag"]
+    assert etag.startswith('W/"')
+
+    reponse = client.get("/roles/", headers={**entetes_admin, "If-None-Match": etag})
+    assert reponse.status_code == 304
+    assert reponse.content == b""
+    assert reponse.headers["etag"] == etag
+
+    creation = client.post("/roles/", headers=entetes_admin, json={"nom": f"role-{uuid.uuid4().hex[:8]}"})
+    assert creation.status_code == 201, creation.text
+
+    reponse = client.get("/roles/", headers={**entetes_admin, "If-None-Match": etag})
+    assert reponse.status_code == 200
+    assert reponse.headers["etag"] != etag
+    assert len(reponse.json()) == len(premiere.json()) + 1
+
+    assert client.delete(f"/roles/{creation.json()['id']}", headers=entetes_admin).status_code == 200
+
+
+def test_etag_propre_a_chaque_canal(client, entetes_admin, canaux):
+    general = client.get(f"/canaux/{canaux['general']}", headers=entetes_admin).headers["etag"]
+    support = client.get(f"/canaux/{canaux['support']}", headers=entetes_admin).headers["etag"]
+    assert general != support
+
+    reponse = client.get(f"/canaux/{canaux['support']}", headers={**entetes_admin, "If-None-Match": general})
+    assert reponse.status_code == 200
+    assert reponse.json()["nom"] == "support"
+
+
+def test_pas_de_304_pour_un_canal_inaccessible_ou_absent(client, creer_utilisateur, canaux):
+    nom, _ = creer_utilisateur("invite")
+    en_tetes = entetes(connecter(client, nom))
+
+    reponse = client.get(f"/canaux/{canaux['general']}", headers=en_tetes)
+    assert reponse.status_code == 200
+    etag = reponse.headers["etag"]
+    assert client.get(
+        f"/canaux/{canaux['general']}", headers={**en_tetes, "If-None-Match": etag}
+    ).status_code == 304
+
+    for valeur in (etag, "*"):
+        conditionnels = {**en_tetes, "If-None-Match": valeur}
+        assert client.get(f"/canaux/{canaux['admin']}", headers=conditionnels).status_code == 403
+        assert client.get("/canaux/999999", headers=conditionnels).status_code == 404
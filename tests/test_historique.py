@@ -0,0 +1,69 @@
+"""
+Cache de l'historique récent des canaux : ajout des nouveaux messages, invalidation à la modification et à la suppression
+"""
+import uuid
+
+from app.services.historique import cache_historique
+from tests.conftest import connecter, entetes
+
+
+def _historique(client, en_tetes, canal_id: int) -> list:
+    reponse = client.get(f"/messages/canal/{canal_id}", headers=en_tetes)
+    assert reponse.status_code == 200, reponse.text
+    return reponse.json()
+
+
+def _poster(client, en_tetes, canal_id: int, contenu: str) -> dict:
+    reponse = client.post("/messages/", headers=en_tetes, json={"canal_id": canal_id, "contenu": contenu})
+    assert reponse.status_code == 201, reponse.text
+    return reponse.json()
+
+
+def test_historique_en_cache_suit_les_ecritures(client, entetes_admin, canaux):
+    canal_id = canaux["general"]
+    marque = uuid.uuid4().hex[:8]
+    premier = _poster(client, entetes_admin, canal_id, f"premier {marque}")
+    second = _poster(client, entetes_admin, canal_id, f"second {marque}")
+
+    historique = _historique(client, entetes_admin, canal_id)
+    assert [m["id"] for m in historique[:2]] == [second["id"], premier["id"]]
+    assert historique[0]["auteur_nom_utilisateur"] == "admin"
+    assert canal_id in cache_historique.entrees
+
+    # Nouveau message ajouté en tête de l'entrée existante
+    troisieme = _poster(client, entetes_admin, canal_id, f"troisième {marque}")
+    assert canal_id in cache_historique.entrees
+    assert _historique(client, entetes_admin, canal_id)[0]["id"] == troisieme["id"]
+
+    modification = client.patch(f"/messages/{premier['id']}", headers=entetes_admin, json={"contenu": f"modifié {marque}"})
+    assert modification.status_code == 200, modification.text
+    contenus = {m["id"]: m["contenu"] for m in _historique(client, entetes_admin, canal_id)}
+    assert contenus[premier["id"]] == f"modifié {marque}"
+
+    assert client.delete(f"/messages/{second['id']}", headers=entetes_admin).status_code == 200
+    ids = [m["id"] for m in _historique(client, entetes_admin, canal_id)]
+    assert second["id"] not in ids
+    assert ids[:2] == [troisieme["id"], premier["id"]]
+
+
+def test_historique_invalide_a_la_modification_et_a_la_suppression_du_canal(client, entetes_admin, creer_utilisateur):
+    reponse = client.post("/canaux/", headers=entetes_admin, json={"nom": f"canal-{uuid.uuid4().hex[:8]}"})
+    assert reponse.status_code == 201, reponse.text
+    canal_id = reponse.json()["id"]
+
+    nom, _ = creer_utilisateur("utilisateur")
+    en_tetes = entetes(connecter(client, nom))
+    _historique(client, en_tetes, canal_id)
+    assert canal_id in cache_historique.entrees
+
+    # La copie du canal gardée pour le contrôle d'accès ne doit pas survivre à la modification
+    modification = client.patch(f"/canaux/{canal_id}", headers=entetes_admin, json={"role_minimum_requis": "admin"})
+    assert modification.status_code == 200, modification.text
+    assert canal_id not in cache_historique.entrees
+    assert client.get(f"/messages/canal/{canal_id}", headers=en_tetes).status_code == 403
+
+    _historique(client, entetes_admin, canal_id)
+    assert canal_id in cache_historique.entrees
+    assert client.delete(f"/canaux/{canal_id}", headers=entetes_admin).status_code == 200
+    assert canal_id not in cache_historique.entrees
+    assert client.get(f"/messages/canal/{canal_id}", headers=entetes_admin).status_code == 404
@@ -0,0 +1,70 @@
+"""
+Limitation de débit : tentatives de connexion et envois WebSocket
+"""
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.config import parametres
+from app.services import auth
+from app.services.limitation import BackendLimiteur, limiteur_connexion, limiteur_envoi
+from tests.conftest import MOT_DE_PASSE, connecter
+
+
+def test_backend_abstrait():
+    with pytest.raises(TypeError):
+        BackendLimiteur()
+
+
+def test_compte_bloque_avant_tout_hachage(client, creer_utilisateur, monkeypatch):
+    nom, _ = creer_utilisateur()
+    monkeypatch.setattr(limiteur_connexion, "limite_utilisateur", 3)
+    hachages = []
+    verifier = auth.verifier_mot_de_passe
+
+    def verifier_compte(mot_de_passe, mot_de_passe_hash):
+        hachages.append(mot_de_passe)
+        return verifier(mot_de_passe, mot_de_passe_hash)
+
+    monkeypatch.setattr(auth, "verifier_mot_de_passe", verifier_compte)
+    for _ in range(3):
+        reponse = client.post("/auth/login", data={"username": nom, "password": "mauvais"})
+        assert reponse.status_code == 401
+    assert len(hachages) == 3
+
+    # Le bon mot de passe est lui aussi refusé, sans hachage, tant que la fenêtre n'est pas écoulée
+    reponse = client.post("/auth/login", data={"username": nom, "password": MOT_DE_PASSE})
+    assert reponse.status_code == 429
+    assert int(reponse.headers["retry-after"]) >= 1
+    assert len(hachages) == 3
+
+
+def test_envois_websocket_limites(client, creer_utilisateur, canaux, monkeypatch):
+    monkeypatch.setattr(parametres, "WS_DEBIT_UTILISATEUR", 0.01)
+    monkeypatch.setattr(parametres, "WS_RAFALE_UTILISATEUR", 2)
+    nom, utilisateur_id = creer_utilisateur()
+    token = connecter(client, nom)["access_token"]
+    limiteur_envoi.seaux_utilisateurs.pop(utilisateur_id, None)
+
+    with client.websocket_connect(f"/ws/chat/{canaux['general']}?token={token}") as ws:
+        assert ws.receive_json()["type"] == "connexion"
+        for numero in range(3):
+            ws.send_json({"contenu": f"message {numero}"})
+
+        recus = []
+        with pytest.raises(WebSocketDisconnect) as fermeture:
+            while True:
+                recus.append(ws.receive_json())
+
+    assert fermeture.value.code == 1013
+    assert [trame["type"] for trame in recus if trame["type"] in ("message", "erreur")] == ["message", "message", "erreur"]
+    erreur = recus[-1]
+    assert erreur["portee"] == "utilisateur"
+    assert erreur["retry_after"] > 0
+
+
+def test_retry_after_arrondi_au_superieur(client, monkeypatch):
+    # Un délai inférieur à une seconde ne doit pas inviter à réessayer immédiatement
+    monkeypatch.setattr(limiteur_connexion, "verifier", lambda ip, nom_utilisateur: 0.4)
+    reponse = client.post("/auth/login", data={"username": "admin", "password": "admin123"})
+    assert reponse.status_code == 429
+    assert reponse.headers["retry-after"] == "1"
@@ -0,0 +1,122 @@
+"""
+Accès aux canaux selon le rang du rôle (role_minimum_requis)
+"""
+import uuid
+
+import pytest
+from sqlmodel import Session, select
+from starlette.websockets import WebSocketDisconnect
+
+from app.database import moteur
+from app.modeles.role import Role
+from app.services.rbac import index_rangs_roles
+from app.services.versions import registre_versions
+from seed import ROLES_BASE, initialiser_roles
+from tests.conftest import connecter, entetes
+
+
+def test_invite_exclu_du_canal_admin(client, creer_utilisateur, canaux):
+    nom, _ = creer_utilisateur("invite")
+    tokens = connecter(client, nom)
+
+    visibles = {canal["nom"] for canal in client.get("/canaux/", headers=entetes(tokens)).json()}
+    assert "general" in visibles
+    assert "admin" not in visibles
+
+    assert client.get(f"/canaux/{canaux['admin']}", headers=entetes(tokens)).status_code == 403
+    assert client.get(f"/messages/canal/{canaux['admin']}", headers=entetes(tokens)).status_code == 403
+    assert client.get(f"/messages/canal/{canaux['general']}", headers=entetes(tokens)).status_code == 200
+
+
+def test_invite_refuse_a_la_connexion_websocket(client, creer_utilisateur, canaux):
+    nom, _ = creer_utilisateur("invite")
+    tokens = connecter(client, nom)
+
+    with pytest.raises(WebSocketDisconnect) as refus:
+        with client.websocket_connect(f"/ws/chat/{canaux['admin']}?token={tokens['access_token']}") as ws:
+            ws.receive_json()
+    assert refus.value.code == 1008
+
+
+def test_seed_retablit_les_rangs_des_roles_existants(client, creer_utilisateur, canaux):
+    # Base migrée par ALTER TABLE ... DEFAULT 0 : tous les rôles au rang 0
+    with Session(moteur) as session:
+        for role in session.exec(select(Role)).all():
+            role.rang = 0
+            session.add(role)
+        session.commit()
+
+        initialiser_roles(session)
+        rangs = dict(session.exec(select(Role.nom, Role.rang)).all())
+    index_rangs_roles.invalider()
+
+    assert rangs == {role["nom"]: role["rang"] for role in ROLES_BASE}
+
+    nom, _ = creer_utilisateur("invite")
+    tokens = connecter(client, nom)
+    assert client.get(f"/messages/canal/{canaux['admin']}", headers=entetes(tokens)).status_code == 403
+
+
+def test_changement_de_rang_pris_en_compte_sans_delai(client, creer_utilisateur, canaux):
+    # Modification directe en base (autre worker, script) signalée par la version de la table roles
+    nom, _ = creer_utilisateur("invite")
+    tokens = connecter(client, nom)
+    assert client.get(f"/messages/canal/{canaux['admin']}", headers=entetes(tokens)).status_code == 403
+
+    rangs_base = {role["nom"]: role["rang"] for role in ROLES_BASE}
+
+    def changer_rang(rang: int):
+        with Session(moteur) as session:
+            invite = session.exec(select(Role).where(Role.nom == "invite")).one()
+            invite.rang = rang
+            session.add(invite)
+            registre_versions.incrementer(session, "roles")
+            session.commit()
+
+    changer_rang(rangs_base["admin"])
+    try:
+        assert client.get(f"/messages/canal/{canaux['admin']}", headers=entetes(tokens)).status_code == 200
+    finally:
+        changer_rang(rangs_base["invite"])
+    assert client.get(f"/messages/canal/{canaux['admin']}", headers=entetes(tokens)).status_code == 403
+
+
+def _fermeture_apres_envoi(ws) -> tuple:
+    """Envoyer un message et lire les trames jusqu'à la fermeture : (types reçus, code de fermeture)"""
+    ws.send_json({"contenu": "encore là ?"})
+    recus = []
+    with pytest.raises(WebSocketDisconnect) as fermeture:
+        while True:
+            recus.append(ws.receive_json()["type"])
+    return recus, fermeture.value.code
+
+
+def test_websocket_ferme_quand_le_canal_devient_inaccessible(client, entetes_admin, creer_utilisateur):
+    reponse = client.post("/canaux/", headers=entetes_admin, json={"nom": f"canal-{uuid.uuid4().hex[:8]}"})
+    assert reponse.status_code == 201, reponse.text
+    canal_id = reponse.json()["id"]
+    nom, _ = creer_utilisateur("utilisateur")
+    token = connecter(client, nom)["access_token"]
+
+    with client.websocket_connect(f"/ws/chat/{canal_id}?token={token}") as ws:
+        assert ws.receive_json()["type"] == "connexion"
+        modification = client.patch(f"/canaux/{canal_id}", headers=entetes_admin, json={"role_minimum_requis": "admin"})
+        assert modification.status_code == 200, modification.text
+        recus, code = _fermeture_apres_envoi(ws)
+
+    assert code == 1008
+    assert "message" not in recus
+
+
+def test_websocket_ferme_apres_changement_de_role(client, entetes_admin, roles, creer_utilisateur, canaux):
+    nom, utilisateur_id = creer_utilisateur("admin")
+    token = connecter(client, nom)["access_token"]
+
+    with client.websocket_connect(f"/ws/chat/{canaux['admin']}?token={token}") as ws:
+        assert ws.receive_json()["type"] == "connexion"
+        modification = client.patch(f"/utilisateurs/{utilisateur_id}", headers=entetes_admin, json={"role_id": roles["utilisateur"]})
+        assert modification.status_code == 200, modification.text
+        recus, code = _fermeture_apres_envoi(ws)
+
+    assert code == 1008
+    assert "message" not in recus
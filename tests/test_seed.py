@@ -0,0 +1,74 @@
+"""
+Initialisation de la base : empreinte, lignes de référence existantes conservées
+"""
+import copy
+
+from sqlmodel import Session, select
+
+import seed
+from app.database import moteur
+from app.modeles.canal import Canal
+from app.modeles.role import Role
+from app.services.rbac import index_rangs_roles
+
+
+def _lire_role(nom: str) -> tuple:
+    with Session(moteur) as session:
+        return session.exec(select(Role.description, Role.rang).where(Role.nom == nom)).one()
+
+
+def _lire_restriction(nom: str):
+    with Session(moteur) as session:
+        return session.exec(select(Canal.role_minimum_requis).where(Canal.nom == nom)).one()
+
+
+def _modifier(modele, cle: str, valeur: str, **champs) -> None:
+    with Session(moteur) as session:
+        ligne = session.exec(select(modele).where(getattr(modele, cle) == valeur)).one()
+        for champ, nouvelle in champs.items():
+            setattr(ligne, champ, nouvelle)
+        session.add(ligne)
+        session.commit()
+
+
+def test_empreinte_inchangee_seed_ignore(client):
+    assert seed.initialiser_base() is False
+
+
+def test_modifications_de_l_administrateur_conservees(client, monkeypatch):
+    # Modifications faites par l'API : canal restreint, rôle redécrit et reclassé
+    _modifier(Canal, "nom", "support", role_minimum_requis="moderateur")
+    _modifier(Role, "nom", "moderateur", description="Modération du support", rang=60)
+
+    # Nouvelle empreinte (changement du seed ou du schéma) : le seed est rejoué
+    roles = copy.deepcopy(seed.ROLES_BASE)
+    next(role for role in roles if role["nom"] == "utilisateur")["description"] = "Utilisateur (révisé)"
+    try:
+        monkeypatch.setattr(seed, "ROLES_BASE", roles)
+        assert seed.initialiser_base() is True
+
+        assert _lire_restriction("support") == "moderateur"
+        assert _lire_role("moderateur") == ("Modération du support", 60)
+        # Les lignes existantes ne reçoivent pas les nouvelles valeurs du seed
+        assert _lire_role("utilisateur") == ("Utilisateur standard", 10)
+
+        assert seed.initialiser_base() is False
+    finally:
+        monkeypatch.undo()
+        _modifier(Canal, "nom", "support", role_minimum_requis=None)
+        _modifier(Role, "nom", "moderateur", description="Modérateur avec droits limités", rang=50)
+        seed.initialiser_base()
+        index_rangs_roles.invalider()
+
+
+def test_rang_complete_seulement_a_la_valeur_par_defaut(client):
+    _modifier(Role, "nom", "moderateur", rang=0)
+    _modifier(Role, "nom", "utilisateur", rang=20)
+    try:
+        with Session(moteur) as session:
+            seed.initialiser_roles(session)
+        assert _lire_role("moderateur")[1] == 50
+        assert _lire_role("utilisateur")[1] == 20
+    finally:
+        _modifier(Role, "nom", "utilisateur", rang=10)
+        index_rangs_roles.invalider()